@@ -0,0 +1,195 @@
+"""
+端到端基准：在本地替身服务器（mock_em_server.py）上运行 main.py / login.py 的完整检查流程，
+统计各场景的耗时 p50/p95、每次检查的 CPU 时间（含 Chromium 进程树）、峰值内存、检查期间浏览器内存的峰值/平均值
+与替身服务器每次检查发送的字节数。
+每个 流程 × 场景 在独立的子进程与临时目录中运行，会话文件、历史库、发件箱互不干扰，也不会发送微信通知。
+场景：
+  warm-http     已有有效会话，走 HTTP 快速通道
+  warm-browser  已有有效会话，关闭快速通道，走浏览器
+  cold-browser  同 warm-browser，但每次检查前关闭浏览器（冷启动）；配合 --profile 对比持久化配置目录的缓存效果
+  cold-login    每次检查前清空会话，走浏览器登录（包含逐字输入的人类速度延迟）
+  error         已有有效会话，服务器按概率返回 500 错误页（重试间隔缩短为 1 秒）
+用法：uv run python benchmarks/bench_e2e.py [--flows main login] [--scenarios warm-http cold-login] [-n 10] [--profile] [--low-memory]
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import tempfile
+import importlib
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from statuspulse import proc_stats  # noqa: E402
+from mock_em_server import MockConfig, MockEditorialManager  # noqa: E402
+
+
+SCENARIOS = ("warm-http", "warm-browser", "cold-browser", "cold-login", "error")
+FLOWS = ("main", "login")
+RESULT_PREFIX = "BENCH_RESULT "
+
+
+def percentile(values, q):
+    """最近秩法的百分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+# ----------------------------------------------------------------------
+# 子进程：导入 main / login 模块并反复执行 check_journal_status
+# ----------------------------------------------------------------------
+def last_metrics_record(path):
+    try:
+        lines = Path(path).read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return {}
+    return json.loads(lines[-1]) if lines else {}
+
+
+def run_worker(flow, scenario, iterations):
+    module = importlib.import_module(f"statuspulse.{flow}")
+    if scenario == "error":
+        module.RETRY_BACKOFF_SECONDS = 1
+
+    samples = []
+    with proc_stats.RssSampler(interval=0.05, include_self=True) as sampler:
+        for _ in range(iterations):
+            if scenario == "cold-login":
+                module.session_store.save({"storage_state": None})
+            elif scenario == "cold-browser":
+                module.browser_manager.close()
+            cpu_started = proc_stats.tree_cpu_seconds()
+            started = time.perf_counter()
+            module.check_journal_status()
+            elapsed = time.perf_counter() - started
+            record = last_metrics_record(os.environ["METRICS_JSONL_FILE"])
+            browser_stats = module.browser_manager.last_check_stats if module.browser_manager.launch_count else None
+            samples.append({
+                "seconds": elapsed,
+                "cpu_seconds": proc_stats.tree_cpu_seconds() - cpu_started,
+                "outcome": record.get("outcome", "unknown"),
+                "phases": record.get("phases", {}),
+                "browser_rss_peak_mb": browser_stats["rss_peak_mb"] if browser_stats else None,
+                "browser_rss_mean_mb": browser_stats["rss_mean_mb"] if browser_stats else None,
+            })
+    module.browser_manager.close()
+    print(RESULT_PREFIX + json.dumps({"samples": samples, "peak_rss_bytes": sampler.peak_bytes}))
+
+
+# ----------------------------------------------------------------------
+# 父进程：启动替身服务器，按场景配置后逐个拉起子进程
+# ----------------------------------------------------------------------
+def configure(server, scenario, failure_rate):
+    server.config = MockConfig(latency=server.config.latency, latency_jitter=server.config.latency_jitter)
+    if scenario == "error":
+        server.config.failure_rate = failure_rate
+
+
+def run_case(server, flow, scenario, iterations, verbose, profile=False, low_memory=False):
+    workdir = tempfile.mkdtemp(prefix=f"bench-{flow}-{scenario}-")
+    config = server.config
+    env = dict(os.environ,
+               TARGET_URL=server.url, JOURNAL_USERNAME=config.username, JOURNAL_PASSWORD=config.password,
+               HTTP_FAST_PATH="0" if scenario in ("warm-browser", "cold-browser") else "1",
+               BROWSER_PROFILE="1" if profile else "0",
+               BROWSER_LOW_MEMORY="1" if low_memory else "0",
+               BROWSER_PROFILE_ROOT=os.path.join(workdir, "browser_profiles"),
+               METRICS_JSONL_FILE=os.path.join(workdir, "metrics.jsonl"),
+               METRICS_PROM_FILE=os.path.join(workdir, "metrics.prom"),
+               PYTHONPATH=str(ROOT), PYTHONUNBUFFERED="1")
+    if scenario != "cold-login":
+        storage_state = server.storage_state(server.mint_session())
+        Path(workdir, "journal_data.json").write_text(json.dumps({"storage_state": storage_state}), encoding="utf-8")
+
+    sent_before = server.stats.bytes_sent
+    proc = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--worker", flow, scenario, "-n", str(iterations)],
+        cwd=workdir, env=env, capture_output=True, text=True)
+    if verbose or proc.returncode:
+        sys.stdout.write(proc.stdout)
+        sys.stderr.write(proc.stderr)
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            result = json.loads(line[len(RESULT_PREFIX):])
+            result["server_bytes"] = server.stats.bytes_sent - sent_before
+            return result
+    raise RuntimeError(f"{flow}/{scenario} 子进程没有返回结果（退出码 {proc.returncode}）")
+
+
+def summarize(flow, scenario, result):
+    samples = result["samples"]
+    seconds = [s["seconds"] for s in samples]
+    cpu = [s["cpu_seconds"] for s in samples]
+    rss_peak = [s["browser_rss_peak_mb"] for s in samples if s.get("browser_rss_peak_mb") is not None]
+    rss_mean = [s["browser_rss_mean_mb"] for s in samples if s.get("browser_rss_mean_mb") is not None]
+    outcomes = {}
+    for s in samples:
+        outcomes[s["outcome"]] = outcomes.get(s["outcome"], 0) + 1
+    return {
+        "flow": flow, "scenario": scenario, "runs": len(samples),
+        "p50": percentile(seconds, 50), "p95": percentile(seconds, 95),
+        "cpu_mean": sum(cpu) / len(cpu) if cpu else None,
+        "peak_rss_mb": result["peak_rss_bytes"] / (1024 * 1024),
+        "check_rss_peak_mb": max(rss_peak) if rss_peak else None,
+        "check_rss_mean_mb": sum(rss_mean) / len(rss_mean) if rss_mean else None,
+        "server_kb": result["server_bytes"] / 1024 / len(samples) if samples else None,
+        "outcomes": outcomes,
+    }
+
+
+def print_table(rows):
+    print(f"\n{'流程':<6} {'场景':<13} {'次数':>4} {'p50(秒)':>8} {'p95(秒)':>8} {'CPU(秒)':>8} {'峰值内存':>9} {'下载/次':>9} {'检查内存(峰/均)':>15}  结果")
+    for r in rows:
+        outcomes = "，".join(f"{k} {v}" for k, v in sorted(r["outcomes"].items()))
+        check_rss = (f"{r['check_rss_peak_mb']:.0f}/{r['check_rss_mean_mb']:.0f}MB"
+                     if r["check_rss_peak_mb"] is not None else "-")
+        print(f"{r['flow']:<6} {r['scenario']:<13} {r['runs']:>4} {r['p50']:>8.2f} {r['p95']:>8.2f} "
+              f"{r['cpu_mean']:>8.2f} {r['peak_rss_mb']:>7.0f}MB {r['server_kb']:>7.0f}KB {check_rss:>15}  {outcomes}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="main.py / login.py 端到端基准")
+    parser.add_argument("--flows", nargs="+", choices=FLOWS, default=list(FLOWS))
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("-n", "--iterations", type=int, default=5, help="每个场景的检查次数")
+    parser.add_argument("--latency", type=float, default=0.02, help="替身服务器每个响应的延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.03, help="替身服务器的随机附加延迟上限（秒）")
+    parser.add_argument("--failure-rate", type=float, default=0.3, help="error 场景下返回 500 的概率")
+    parser.add_argument("--profile", action="store_true", help="浏览器使用持久化配置目录（BROWSER_PROFILE=1）")
+    parser.add_argument("--low-memory", action="store_true", help="浏览器使用低内存启动参数（BROWSER_LOW_MEMORY=1）")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出汇总结果")
+    parser.add_argument("-v", "--verbose", action="store_true", help="显示子进程的完整日志")
+    parser.add_argument("--worker", nargs=2, metavar=("FLOW", "SCENARIO"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker, args.iterations)
+        return
+
+    server = MockEditorialManager(MockConfig(latency=args.latency, latency_jitter=args.jitter)).start()
+    rows = []
+    try:
+        for flow in args.flows:
+            for scenario in args.scenarios:
+                configure(server, scenario, args.failure_rate)
+                print(f"  -> 运行 {flow} / {scenario}（{args.iterations} 次）...", flush=True)
+                result = run_case(server, flow, scenario, args.iterations, args.verbose, args.profile, args.low_memory)
+                rows.append(summarize(flow, scenario, result))
+    finally:
+        server.stop()
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+    else:
+        print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
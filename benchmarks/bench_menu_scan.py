@@ -0,0 +1,99 @@
+"""
+主菜单扫描基准：对比旧的逐项定位扫描与一次 evaluate 提取的 CDP 往返次数和耗时。
+用法：uv run python benchmarks/bench_menu_scan.py [菜单项数量 ...]
+"""
+import re
+import sys
+import time
+from pathlib import Path
+from playwright.sync_api import sync_playwright
+from playwright._impl import _connection
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from statuspulse import extraction  # noqa: E402
+from statuspulse import page_selectors as sel  # noqa: E402
+
+
+class RoundTripCounter:
+    """统计 Playwright 客户端发往驱动的协议消息数（即往返次数）；依赖 Playwright 内部 API，仅用于基准测试"""
+
+    def __init__(self):
+        self.count = 0
+        self._originals = {}
+
+    def __enter__(self):
+        for name in ("send", "send_return_as_dict"):
+            original = getattr(_connection.Channel, name, None)
+            if original is None:
+                continue
+            self._originals[name] = original
+
+            async def wrapper(channel, *args, _original=original, **kwargs):
+                self.count += 1
+                return await _original(channel, *args, **kwargs)
+
+            setattr(_connection.Channel, name, wrapper)
+        return self
+
+    def __exit__(self, *exc):
+        for name, original in self._originals.items():
+            setattr(_connection.Channel, name, original)
+
+
+def build_menu_html(n_items):
+    items = []
+    for i in range(n_items):
+        count = i % 3  # 每三个文件夹中有两个有投稿
+        tag = "a" if count else "span"
+        href = f' href="folder{i}.aspx"' if count else ""
+        items.append(f"<div><{tag} cssclass='main_menu_item_2'{href}>Folder {i}</{tag}>"
+                     f"<span class='count'>({count})</span></div>")
+    return "<html><body><h3>New Submissions</h3>" + "\n".join(items) + "</body></html>"
+
+
+def legacy_scan(frame):
+    """旧实现：每个菜单项 locator + is_visible + inner_text + text_content + evaluate"""
+    candidate_items = frame.locator(sel.MENU_ITEM)
+    candidate_items.count()
+    active_statuses, first_clickable_link = [], None
+    for item_locator in candidate_items.all():
+        count_span = item_locator.locator("xpath=./following-sibling::span[@class='count'][1]")
+        if count_span.is_visible():
+            match = re.search(r'\((\d+)\)', count_span.inner_text())
+            if match and int(match.group(1)) > 0:
+                active_statuses.append(f"{item_locator.text_content().strip()} ({match.group(1)})")
+                if item_locator.evaluate('element => element.tagName') == 'A' and not first_clickable_link:
+                    first_clickable_link = item_locator
+    return active_statuses
+
+
+def snapshot_scan(frame):
+    """新实现：一次 evaluate"""
+    snapshot = extraction.extract_snapshot(frame)
+    return [f"{item.label} ({item.count})" for item in snapshot.active_items]
+
+
+def measure(scan, frame):
+    with RoundTripCounter() as counter:
+        started = time.perf_counter()
+        result = scan(frame)
+        elapsed = time.perf_counter() - started
+    return result, counter.count, elapsed
+
+
+def main(sizes):
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        print(f"{'菜单项':>6} | {'旧实现往返':>10} {'旧实现耗时':>10} | {'新实现往返':>10} {'新实现耗时':>10}")
+        for n in sizes:
+            page.set_content(build_menu_html(n))
+            legacy, legacy_trips, legacy_time = measure(legacy_scan, page.main_frame)
+            fast, fast_trips, fast_time = measure(snapshot_scan, page.main_frame)
+            assert legacy == fast, "两种实现的扫描结果不一致"
+            print(f"{n:>6} | {legacy_trips:>10} {legacy_time * 1000:>8.1f}ms | {fast_trips:>10} {fast_time * 1000:>8.1f}ms")
+        browser.close()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [5, 20, 80])
@@ -0,0 +1,150 @@
+"""
+通知链路压测：把大量状态变化通知写入发件箱，由真实的 outbox.py / wechat.py 代码发送到本地微信接口替身，
+统计入队速度、发送吞吐、端到端投递延迟（入队 -> 发送成功）的 p50/p95/p99，以及 cgi-bin/token 的调用次数。
+替身可注入 token 提前失效、45009 限流、延迟与错误；发件箱的失败退避缩短为 --backoff 秒，便于在几十秒内跑完。
+用法：uv run python benchmarks/bench_notifications.py [-n 2000] [--recipients 50] [--rate-limit 200] [--token-ttl 20]
+"""
+import io
+import os
+import sys
+import json
+import math
+import time
+import sqlite3
+import argparse
+import tempfile
+import importlib
+import contextlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from mock_wechat_server import MockWechatConfig, MockWechatServer  # noqa: E402
+
+
+def percentile(values, q):
+    """最近秩法的百分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def load_modules(server, workdir):
+    """wechat / outbox 在导入时读取环境变量，必须先指向替身服务器与临时目录再导入"""
+    os.environ.update(
+        WECHAT_API_BASE=server.url, APPID=server.config.appid, APPSECRET=server.config.secret,
+        OPENID="bench-default-openid", STATUS_TEMPLATE_ID="bench-template",
+        WECHAT_TOKEN_FILE=os.path.join(workdir, "wechat_token.json"),
+        OUTBOX_DB=os.path.join(workdir, "outbox.db"),
+        METRICS_PROM_FILE=os.path.join(workdir, "metrics.prom"),
+        METRICS_JSONL_FILE=os.path.join(workdir, "metrics.jsonl"),
+    )
+    return importlib.import_module("statuspulse.wechat"), importlib.import_module("statuspulse.outbox")
+
+
+def drain(outbox, timeout):
+    """反复 flush 直到没有待发送的通知（或超时），返回耗时"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if outbox.flush():
+            continue
+        if not outbox.depth().get("pending"):
+            break
+        time.sleep(0.02)  # 剩余的通知都在退避中
+    return time.perf_counter() - started
+
+
+def delivery_latencies(db_path):
+    with contextlib.closing(sqlite3.connect(db_path)) as conn:
+        return [row[0] for row in conn.execute("SELECT sent_at - created_at FROM outbox WHERE state = 'sent'")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="通知发送链路压测")
+    parser.add_argument("-n", "--notifications", type=int, default=2000, help="状态变化通知数")
+    parser.add_argument("--recipients", type=int, default=50, help="收信人数量")
+    parser.add_argument("--concurrency", type=int, default=None, help="发件箱发送并发数（默认使用 outbox.SEND_CONCURRENCY）")
+    parser.add_argument("--latency", type=float, default=0.02, help="替身接口的响应延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.03, help="替身接口的随机附加延迟上限（秒）")
+    parser.add_argument("--rate-limit", type=int, default=200, help="发送接口每秒最多请求数，超出返回 45009，0 为不限")
+    parser.add_argument("--token-ttl", type=float, default=20, help="access_token 的实际有效期（秒），模拟提前失效")
+    parser.add_argument("--http-error-rate", type=float, default=0.005)
+    parser.add_argument("--busy-rate", type=float, default=0.01, help="返回 errcode -1（系统繁忙）的概率")
+    parser.add_argument("--backoff", type=float, default=0.5, help="发件箱失败退避的基数（秒）")
+    parser.add_argument("--timeout", type=float, default=600, help="等待全部发送完成的最长时间（秒）")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    parser.add_argument("-v", "--verbose", action="store_true", help="显示发件箱与发送日志")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-notify-")
+    server = MockWechatServer(MockWechatConfig(
+        token_ttl=args.token_ttl, rate_limit=args.rate_limit, latency=args.latency, latency_jitter=args.jitter,
+        http_error_rate=args.http_error_rate, busy_rate=args.busy_rate)).start()
+    wechat, outbox_module = load_modules(server, workdir)
+    outbox_module.BACKOFF_BASE = args.backoff
+    if args.concurrency:
+        outbox_module.SEND_CONCURRENCY = args.concurrency
+    outbox = outbox_module.Outbox(os.environ["OUTBOX_DB"])
+
+    logs = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        with logs:
+            # 每条通知使用不同的目标，避免被发件箱合并，模拟大量稿件/收信人同时变化
+            started = time.perf_counter()
+            for i in range(args.notifications):
+                outbox.enqueue(f"bench-{i}", "Under Review", "Required Reviews Completed",
+                               to_user=f"openid-{i % args.recipients}")
+            enqueue_seconds = time.perf_counter() - started
+            drain_seconds = drain(outbox, args.timeout)
+    finally:
+        server.stop()
+
+    latencies = delivery_latencies(outbox.path)
+    send_latencies = list(outbox.stats.latencies)
+    queue = outbox.depth()
+    stats = server.stats
+    result = {
+        "notifications": args.notifications,
+        "recipients": args.recipients,
+        "concurrency": outbox_module.SEND_CONCURRENCY,
+        "enqueue_per_second": args.notifications / enqueue_seconds if enqueue_seconds else None,
+        "drain_seconds": drain_seconds,
+        "sent": queue.get("sent", 0), "pending": queue.get("pending", 0), "dead": queue.get("dead", 0),
+        "throughput_per_second": queue.get("sent", 0) / drain_seconds if drain_seconds else None,
+        "delivery_p50": percentile(latencies, 50),
+        "delivery_p95": percentile(latencies, 95),
+        "delivery_p99": percentile(latencies, 99),
+        # outbox 只保留最近 500 次发送调用的耗时
+        "send_call_p50": percentile(send_latencies, 50),
+        "send_call_p99": percentile(send_latencies, 99),
+        "token_endpoint_calls": stats.token_calls,
+        "send_endpoint_calls": stats.send_calls,
+        "expired_token_rejections": stats.expired_tokens,
+        "rate_limited": stats.rate_limited,
+        "http_errors": stats.http_errors,
+        "busy": stats.busy,
+        "delivered_recipients": len(stats.recipients),
+    }
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return
+
+    def seconds(value):
+        return "-" if value is None else f"{value:.3f}s"
+
+    print(f"通知 {result['notifications']} 条 / 收信人 {result['recipients']} 个 / 并发 {result['concurrency']}")
+    print(f"  入队速度      {result['enqueue_per_second']:.0f} 条/秒")
+    print(f"  发送完成      {result['sent']} 条（待发送 {result['pending']}，放弃 {result['dead']}），"
+          f"耗时 {drain_seconds:.1f} 秒，吞吐 {result['throughput_per_second']:.1f} 条/秒")
+    print(f"  投递延迟      p50 {seconds(result['delivery_p50'])}  p95 {seconds(result['delivery_p95'])}  "
+          f"p99 {seconds(result['delivery_p99'])}")
+    print(f"  单次发送调用  p50 {seconds(result['send_call_p50'])}  p99 {seconds(result['send_call_p99'])}（最近 500 次）")
+    print(f"  接口调用      token {result['token_endpoint_calls']} 次，发送 {result['send_endpoint_calls']} 次；"
+          f"token 失效拒绝 {result['expired_token_rejections']}，限流 {result['rate_limited']}，"
+          f"HTTP 500 {result['http_errors']}，系统繁忙 {result['busy']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,303 @@
+"""
+本地 Editorial Manager 替身服务器：复现检查流程依赖的页面结构，用于基准测试与回归测试，不访问真实期刊网站。
+- 入口页 -> iframe#content（name="content"）-> 主应用文档；未登录时其中只有 iframe[name="login"]，
+  已登录时为主菜单（main_menu_item_2 + span.count），并嵌套一层 iframe[name="content"]（HTTP快速通道与 login.py 的路径）；
+- 登录表单 #username / #passwordTextbox / #emLoginButtonsDiv，提交后整页跳转并下发 EMSessionID；
+- 详情页 table#datatable（tr#row1 起），会话空闲超时后跳回登录页；
+- 每个页面引用 /static/app.js 与 /static/app.css（大小可配置，带 Cache-Control 与 ETag），用于衡量 HTTP 缓存的效果；
+- 可配置的响应延迟、500 错误与维护页注入。
+用法：uv run python benchmarks/mock_em_server.py [--port 8765] [--latency 0.05] [--failure-rate 0.1]
+"""
+import html
+import time
+import hashlib
+import random
+import secrets
+import argparse
+import threading
+from dataclasses import dataclass, field
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs, urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+SESSION_COOKIE = "EMSessionID"
+
+
+@dataclass
+class MockConfig:
+    username: str = "bench"
+    password: str = "secret"
+    # 每个响应的固定延迟与随机附加延迟（秒）
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    # 按概率返回 500 错误页 / 维护页（登录提交除外）
+    failure_rate: float = 0.0
+    maintenance_rate: float = 0.0
+    # 会话空闲超时（秒）
+    session_idle_timeout: float = 1800
+    # 每个静态资源（JS / CSS）的大小（KB），0 表示页面不引用静态资源
+    static_kb: int = 256
+    # 菜单文件夹：(名称, 稿件数)
+    folders: list = field(default_factory=lambda: [
+        ("Incomplete Submissions", 0),
+        ("Submissions Waiting for Author's Approval", 0),
+        ("Submissions Being Processed", 2),
+        ("Submissions Needing Revision", 1),
+        ("Revisions Sent Back to Author", 0),
+    ])
+    # 详情页表格：(稿件号, 标题, 当前状态)
+    manuscripts: list = field(default_factory=lambda: [
+        ("JMB-D-24-00123", "A Study of Things", "Under Review"),
+        ("JMB-D-24-00456", "Another Study", "With Editor"),
+    ])
+
+
+@dataclass
+class MockStats:
+    requests: int = 0
+    failures: int = 0
+    maintenance: int = 0
+    logins: int = 0
+    expired: int = 0
+    bytes_sent: int = 0
+    static_requests: int = 0
+    not_modified: int = 0
+
+
+ENTRY_PAGE = """<html><head><title>Editorial Manager</title></head><body>
+<iframe id="content" name="content" src="/app" style="width:1000px;height:700px;border:0"></iframe>
+</body></html>"""
+
+LOGIN_SHELL = """<html><body><h2>Editorial Manager</h2>
+<iframe name="login" src="/login" style="width:600px;height:300px;border:0"></iframe>
+</body></html>"""
+
+LOGIN_FORM = """<html><body>
+<form id="loginForm" method="post" action="/login" target="_top">
+  <input id="username" name="username" type="text">
+  <input id="passwordTextbox" name="password" type="password">
+  <div id="emLoginButtonsDiv">
+    <input type="button" value="Author Login" onclick="document.getElementById('loginForm').submit()">
+    <input type="button" value="Reviewer Login">
+  </div>
+</form></body></html>"""
+
+STATIC_TAGS = '<link rel="stylesheet" href="/static/app.css"><script src="/static/app.js"></script>'
+STATIC_TYPES = {"app.js": "application/javascript", "app.css": "text/css"}
+
+MAINTENANCE_PAGE = "<html><body><h1>This site is down for scheduled maintenance.</h1></body></html>"
+ERROR_PAGE = "<html><body><h1>Server Error in '/' Application.</h1></body></html>"
+
+
+class MockEditorialManager:
+    """在后台线程中运行的替身服务器；可在运行中修改 config 切换场景"""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or MockConfig()
+        self.stats = MockStats()
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-em", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # ------------------------------------------------------------------
+    # 会话
+    # ------------------------------------------------------------------
+    def mint_session(self):
+        """直接创建一个有效会话（跳过登录表单），返回 Cookie 值"""
+        session_id = secrets.token_hex(16)
+        with self._lock:
+            self._sessions[session_id] = time.time()
+        return session_id
+
+    def storage_state(self, session_id):
+        """Playwright storage_state 格式的会话，用于预置热会话"""
+        host = self._server.server_address[0]
+        return {"cookies": [{"name": SESSION_COOKIE, "value": session_id, "domain": host, "path": "/",
+                             "expires": -1, "httpOnly": True, "secure": False, "sameSite": "Lax"}],
+                "origins": []}
+
+    def expire_sessions(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def _session_valid(self, session_id):
+        """会话有效时刷新空闲计时"""
+        now = time.time()
+        with self._lock:
+            last_seen = self._sessions.get(session_id)
+            if last_seen is None:
+                return False
+            if now - last_seen > self.config.session_idle_timeout:
+                del self._sessions[session_id]
+                self.stats.expired += 1
+                return False
+            self._sessions[session_id] = now
+            return True
+
+    # ------------------------------------------------------------------
+    # 页面
+    # ------------------------------------------------------------------
+    def menu_html(self):
+        """有稿件的文件夹是链接（其中 'Submissions Being Processed' 即 login.py 点击的链接），否则为 span"""
+        items = []
+        for index, (label, count) in enumerate(self.config.folders):
+            tag, href = ("a", f' href="/detail?folder={index}"') if count else ("span", "")
+            items.append(f"<div><{tag} cssclass='main_menu_item_2'{href}>{html.escape(label)}</{tag}>"
+                         f"<span class='count'>({count})</span></div>")
+        return "<h3>New Submissions</h3>" + "\n".join(items)
+
+    def static_asset(self, name):
+        """返回 (内容, ETag)；内容只取决于文件名与大小，ETag 跨进程稳定"""
+        comment = f"/* {name} padding */\n"
+        body = (comment * (self.config.static_kb * 1024 // len(comment) + 1))[:self.config.static_kb * 1024]
+        return body, '"' + hashlib.sha1(body.encode("utf-8")).hexdigest()[:16] + '"'
+
+    def detail_html(self):
+        headers = ["Action", "Manuscript Number", "Title", "Initial Date Submitted", "Status Date", "Current Status"]
+        rows = [
+            f"<tr id='row{i}'><td>Action Links</td><td>{html.escape(number)}</td><td>{html.escape(title)}</td>"
+            f"<td>Jan 01, 2024</td><td>Feb 01, 2024</td><td>{html.escape(status)}</td></tr>"
+            for i, (number, title, status) in enumerate(self.config.manuscripts, start=1)
+        ]
+        return ("<html><body><table id='datatable'><tr>" + "".join(f"<th>{h}</th>" for h in headers) + "</tr>" +
+                "".join(rows) + "</table></body></html>")
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, headers=None, content_type="text/html; charset=utf-8"):
+                if server.config.static_kb and content_type.startswith("text/html") and "<body>" in body:
+                    body = body.replace("<body>", "<body>" + STATIC_TAGS, 1)
+                payload = body.encode("utf-8")
+                server.stats.bytes_sent += len(payload)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _session_id(self):
+                cookie = SimpleCookie(self.headers.get("Cookie", ""))
+                return cookie[SESSION_COOKIE].value if SESSION_COOKIE in cookie else None
+
+            def _delay(self):
+                config = server.config
+                if config.latency or config.latency_jitter:
+                    time.sleep(config.latency + random.uniform(0, config.latency_jitter))
+
+            def do_GET(self):
+                server.stats.requests += 1
+                self._delay()
+                config = server.config
+                path = urlparse(self.path).path
+                if path == "/favicon.ico":
+                    return self._send(404, "")
+                if path.startswith("/static/") and path[len("/static/"):] in STATIC_TYPES:
+                    return self._send_static(path[len("/static/"):])
+                if random.random() < config.failure_rate:
+                    server.stats.failures += 1
+                    return self._send(500, ERROR_PAGE)
+                if random.random() < config.maintenance_rate:
+                    server.stats.maintenance += 1
+                    return self._send(200, MAINTENANCE_PAGE)
+
+                if path == "/":
+                    return self._send(200, ENTRY_PAGE)
+                if path == "/login":
+                    return self._send(200, LOGIN_FORM)
+                logged_in = server._session_valid(self._session_id())
+                if path == "/app":
+                    if not logged_in:
+                        return self._send(200, LOGIN_SHELL)
+                    # main.py 直接在 iframe#content 中扫描菜单；HTTP快速通道与 login.py 再深入一层 iframe[name="content"]
+                    return self._send(200, "<html><body>" + server.menu_html() +
+                                      '<iframe name="content" src="/menu" style="width:900px;height:400px;border:0">'
+                                      "</iframe></body></html>")
+                if path in ("/menu", "/detail"):
+                    if not logged_in:
+                        return self._send(200, LOGIN_SHELL)
+                    body = server.detail_html() if path == "/detail" else \
+                        "<html><body>" + server.menu_html() + "</body></html>"
+                    return self._send(200, body)
+                return self._send(404, "<html><body>Not Found</body></html>")
+
+            def _send_static(self, name):
+                server.stats.static_requests += 1
+                body, etag = server.static_asset(name)
+                headers = {"Cache-Control": "public, max-age=86400", "ETag": etag}
+                if self.headers.get("If-None-Match") == etag:
+                    server.stats.not_modified += 1
+                    self.send_response(304)
+                    for key, value in headers.items():
+                        self.send_header(key, value)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self._send(200, body, headers, content_type=STATIC_TYPES[name])
+
+            def do_POST(self):
+                server.stats.requests += 1
+                self._delay()
+                length = int(self.headers.get("Content-Length", 0) or 0)
+                form = parse_qs(self.rfile.read(length).decode("utf-8"))
+                if urlparse(self.path).path != "/login":
+                    return self._send(404, "")
+                config = server.config
+                headers = {"Location": "/"}
+                if form.get("username", [""])[0] == config.username and form.get("password", [""])[0] == config.password:
+                    server.stats.logins += 1
+                    headers["Set-Cookie"] = f"{SESSION_COOKIE}={server.mint_session()}; Path=/; HttpOnly"
+                self._send(303, "", headers)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 Editorial Manager 替身服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="每个响应的固定延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="每个响应的随机附加延迟上限（秒）")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="返回 500 错误页的概率")
+    parser.add_argument("--maintenance-rate", type=float, default=0.0, help="返回维护页的概率")
+    parser.add_argument("--idle-timeout", type=float, default=1800, help="会话空闲超时（秒）")
+    args = parser.parse_args()
+
+    config = MockConfig(latency=args.latency, latency_jitter=args.jitter, failure_rate=args.failure_rate,
+                        maintenance_rate=args.maintenance_rate, session_idle_timeout=args.idle_timeout)
+    server = MockEditorialManager(config, host=args.host, port=args.port).start()
+    print(f"替身服务器已启动：{server.url}（用户名 {config.username} / 密码 {config.password}），Ctrl+C 退出。")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+"""
+本地微信公众号接口替身：cgi-bin/token 与 cgi-bin/message/template/send，用于通知链路的压测。
+- access_token 的实际有效期（token_ttl）可以短于返回的 expires_in，模拟提前失效（42001）；
+  重新获取 token 后旧 token 在 rotation_grace 秒内仍可用，与微信的行为一致；
+- 发送接口按每秒请求数限流，超出返回 errcode 45009；
+- 可配置的响应延迟，以及按概率返回 HTTP 500 / errcode -1（系统繁忙）。
+用法：uv run python benchmarks/mock_wechat_server.py [--port 8766] [--rate-limit 200] [--token-ttl 60]
+      然后设置 WECHAT_API_BASE=http://127.0.0.1:8766
+"""
+import json
+import time
+import random
+import secrets
+import argparse
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from urllib.parse import parse_qs, urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+@dataclass
+class MockWechatConfig:
+    appid: str = "bench-appid"
+    secret: str = "bench-secret"
+    # 返回给客户端的 expires_in 与 token 实际有效期（秒）
+    expires_in: int = 7200
+    token_ttl: float = 7200
+    rotation_grace: float = 300
+    # 发送接口每秒最多处理的请求数，0 表示不限流
+    rate_limit: int = 0
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    # 按概率返回 HTTP 500 / errcode -1
+    http_error_rate: float = 0.0
+    busy_rate: float = 0.0
+
+
+@dataclass
+class MockWechatStats:
+    token_calls: int = 0
+    send_calls: int = 0
+    delivered: int = 0
+    expired_tokens: int = 0
+    rate_limited: int = 0
+    http_errors: int = 0
+    busy: int = 0
+    recipients: dict = field(default_factory=dict)
+
+
+class MockWechatServer:
+    """在后台线程中运行的微信接口替身"""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or MockWechatConfig()
+        self.stats = MockWechatStats()
+        # token -> (签发时间, 被新 token 取代的时间)
+        self._tokens = {}
+        self._current_token = None
+        self._recent_sends = deque()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name="mock-wechat", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # ------------------------------------------------------------------
+    # 接口逻辑
+    # ------------------------------------------------------------------
+    def issue_token(self, appid, secret):
+        config = self.config
+        with self._lock:
+            self.stats.token_calls += 1
+            if appid != config.appid or secret != config.secret:
+                return {"errcode": 40013, "errmsg": "invalid appid"}
+            now = time.time()
+            if self._current_token:
+                issued_at, _ = self._tokens[self._current_token]
+                self._tokens[self._current_token] = (issued_at, now)
+            token = secrets.token_hex(24)
+            self._tokens[token] = (now, None)
+            self._current_token = token
+        return {"access_token": token, "expires_in": config.expires_in}
+
+    def _token_error(self, token, now):
+        """token 有效返回 None，否则返回微信的错误码"""
+        entry = self._tokens.get(token)
+        if entry is None:
+            return {"errcode": 40001, "errmsg": "invalid credential, access_token is invalid or not latest"}
+        issued_at, replaced_at = entry
+        if now - issued_at > self.config.token_ttl or (replaced_at and now - replaced_at > self.config.rotation_grace):
+            self.stats.expired_tokens += 1
+            return {"errcode": 42001, "errmsg": "access_token expired"}
+        return None
+
+    def _rate_limited(self, now):
+        if not self.config.rate_limit:
+            return False
+        while self._recent_sends and now - self._recent_sends[0] > 1.0:
+            self._recent_sends.popleft()
+        if len(self._recent_sends) >= self.config.rate_limit:
+            return True
+        self._recent_sends.append(now)
+        return False
+
+    def send_template(self, token, payload):
+        """返回 (HTTP状态码, 响应JSON)"""
+        config = self.config
+        now = time.time()
+        with self._lock:
+            self.stats.send_calls += 1
+            if random.random() < config.http_error_rate:
+                self.stats.http_errors += 1
+                return 500, {"errcode": -1, "errmsg": "internal error"}
+            error = self._token_error(token, now)
+            if error:
+                return 200, error
+            if self._rate_limited(now):
+                self.stats.rate_limited += 1
+                return 200, {"errcode": 45009, "errmsg": "reach max api daily quota limit"}
+            if random.random() < config.busy_rate:
+                self.stats.busy += 1
+                return 200, {"errcode": -1, "errmsg": "system error"}
+            to_user = payload.get("touser")
+            if not to_user:
+                return 200, {"errcode": 40003, "errmsg": "invalid openid"}
+            self.stats.delivered += 1
+            self.stats.recipients[to_user] = self.stats.recipients.get(to_user, 0) + 1
+            return 200, {"errcode": 0, "errmsg": "ok", "msgid": self.stats.delivered}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, body):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _delay(self):
+                config = server.config
+                if config.latency or config.latency_jitter:
+                    time.sleep(config.latency + random.uniform(0, config.latency_jitter))
+
+            def do_GET(self):
+                self._delay()
+                url = urlparse(self.path)
+                if url.path != "/cgi-bin/token":
+                    return self._send_json(404, {"errcode": 404, "errmsg": "not found"})
+                query = parse_qs(url.query)
+                self._send_json(200, server.issue_token(query.get("appid", [""])[0], query.get("secret", [""])[0]))
+
+            def do_POST(self):
+                self._delay()
+                url = urlparse(self.path)
+                length = int(self.headers.get("Content-Length", 0) or 0)
+                body = self.rfile.read(length)
+                if url.path != "/cgi-bin/message/template/send":
+                    return self._send_json(404, {"errcode": 404, "errmsg": "not found"})
+                try:
+                    payload = json.loads(body or b"{}")
+                except ValueError:
+                    return self._send_json(200, {"errcode": 47001, "errmsg": "data format error"})
+                token = parse_qs(url.query).get("access_token", [""])[0]
+                self._send_json(*server.send_template(token, payload))
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地微信接口替身服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--token-ttl", type=float, default=7200, help="access_token 的实际有效期（秒）")
+    parser.add_argument("--rate-limit", type=int, default=0, help="发送接口每秒最多请求数，0 为不限")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--http-error-rate", type=float, default=0.0)
+    parser.add_argument("--busy-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = MockWechatConfig(token_ttl=args.token_ttl, rate_limit=args.rate_limit, latency=args.latency,
+                              latency_jitter=args.jitter, http_error_rate=args.http_error_rate,
+                              busy_rate=args.busy_rate)
+    server = MockWechatServer(config, host=args.host, port=args.port).start()
+    print(f"微信接口替身已启动：WECHAT_API_BASE={server.url}（APPID={config.appid} / APPSECRET={config.secret}），Ctrl+C 退出。")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+"""期刊投稿状态检查（命令行入口见 statuspulse.cli）"""
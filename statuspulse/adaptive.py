@@ -0,0 +1,116 @@
+import os
+import re
+import time
+import datetime
+import threading
+
+from . import status_diff
+
+
+# 自适应轮询的上下限与基准周期（分钟）
+POLL_FLOOR_MINUTES = float(os.getenv("POLL_FLOOR_MINUTES", "15"))
+POLL_CEILING_MINUTES = float(os.getenv("POLL_CEILING_MINUTES", "720"))
+POLL_BASE_MINUTES = 60
+# 每个期刊站点每天最多检查的次数（所有账号合计），0 表示不限
+DAILY_BUDGET = int(os.getenv("DAILY_BUDGET", "48"))
+# 目标：每次检查时“稿件恰好发生变化”的概率，变化概率高时缩短周期、低时拉长周期
+TARGET_CHANGE_PROBABILITY = 0.1
+# 某状态的已结束停留样本少于该数量时，不做估计，使用基准周期
+MIN_SAMPLES = 5
+# 停留时长模型的刷新间隔（秒）
+MODEL_REFRESH_SECONDS = 3600
+# 终态：不会再变化，按上限周期检查
+TERMINAL_STATUS_PATTERNS = [p for p in os.getenv(
+    "TERMINAL_STATUS_PATTERNS", r"^Completed\b|Final Decision|Withdrawn|Reject|Accept").split("|") if p]
+
+
+class AdaptivePoller:
+    """
+    根据历史库中各状态的停留时长分布，决定下一次检查的间隔：
+    对每篇稿件，估计“已经在当前状态停留了 e 秒，在接下来一个基准周期内发生变化”的条件概率 p，
+    间隔 = 基准周期 × 目标概率 / p（取所有稿件中最短的），再限制在上下限之间；
+    终态稿件按上限检查。同一站点每天的检查次数不超过预算，剩余预算在当天剩余时间内均匀分配。
+    """
+
+    def __init__(self, store, floor_minutes=POLL_FLOOR_MINUTES, ceiling_minutes=POLL_CEILING_MINUTES,
+                 base_minutes=POLL_BASE_MINUTES, daily_budget=DAILY_BUDGET,
+                 target_probability=TARGET_CHANGE_PROBABILITY, terminal_patterns=None):
+        self.store = store
+        self.floor = floor_minutes * 60
+        self.ceiling = ceiling_minutes * 60
+        self.base = base_minutes * 60
+        self.daily_budget = daily_budget
+        self.target_probability = target_probability
+        self.terminal = [re.compile(p, re.I) for p in (terminal_patterns or TERMINAL_STATUS_PATTERNS)]
+        self._samples = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _model(self):
+        with self._lock:
+            if time.time() - self._loaded_at > MODEL_REFRESH_SECONDS:
+                self._samples = {status: sorted(values) for status, values in self.store.dwell_samples().items()}
+                self._loaded_at = time.time()
+            return self._samples
+
+    def is_terminal(self, status):
+        return any(p.search(status or "") for p in self.terminal)
+
+    def change_probability(self, status, elapsed, window=None):
+        """
+        已停留 elapsed 秒后，在接下来 window 秒内离开该状态的条件概率；样本不足时返回 None。
+        先在上限周期这一较长区间内做经验估计，再按恒定风险率折算到 window，避免样本稀疏时得到 0。
+        """
+        window = window or self.base
+        survivors = [d for d in self._model().get(status, []) if d > elapsed]
+        if len(survivors) < MIN_SAMPLES:
+            return None
+        horizon = max(self.ceiling, window)
+        leave_within_horizon = sum(1 for d in survivors if d <= elapsed + horizon) / len(survivors)
+        return 1 - (1 - leave_within_horizon) ** (window / horizon)
+
+    def _interval_for_manuscript(self, status, elapsed):
+        if self.is_terminal(status):
+            return self.ceiling, None
+        p = self.change_probability(status, elapsed)
+        if p is None:
+            return self.base, None
+        if p <= 0:
+            return self.ceiling, p
+        return self.base * self.target_probability / p, p
+
+    def _budget_interval(self, site_targets, now):
+        """当天剩余预算平均分配到当天剩余时间，得到的最短间隔；预算用完时等到次日"""
+        if not self.daily_budget:
+            return 0.0
+        midnight = datetime.datetime.fromtimestamp(now).replace(hour=0, minute=0, second=0, microsecond=0)
+        used = self.store.count_checks(site_targets, midnight.timestamp())
+        remaining_seconds = (midnight + datetime.timedelta(days=1)).timestamp() - now
+        remaining_checks = self.daily_budget - used
+        if remaining_checks <= 0:
+            return remaining_seconds
+        # 同一站点的多个账号共享预算
+        return remaining_seconds / remaining_checks * len(site_targets)
+
+    def next_interval(self, target, site_targets=None, now=None):
+        """下一次检查 target 前应等待的秒数"""
+        now = now or time.time()
+        site_targets = list(site_targets or [target])
+        interval, reason = self.base, "没有稿件记录，使用基准周期"
+        manuscripts = [m for m in self.store.latest(target) if m["status"] and m["status"] != status_diff.NOT_LISTED]
+        if manuscripts:
+            interval, reason = self.ceiling, "所有稿件处于终态或近期不太可能变化"
+            for m in manuscripts:
+                candidate, p = self._interval_for_manuscript(m["status"], now - m["since"])
+                if candidate < interval:
+                    interval = candidate
+                    elapsed_days = (now - m["since"]) / 86400
+                    reason = (f"[{m['manuscript']}] '{m['status']}' 已停留 {elapsed_days:.1f} 天，" +
+                              (f"一个基准周期内变化概率 {p:.0%}" if p is not None else "样本不足"))
+        interval = min(max(interval, self.floor), self.ceiling)
+
+        budget_interval = self._budget_interval(site_targets, now)
+        if budget_interval > interval:
+            interval, reason = budget_interval, reason + f"；受每日预算 {self.daily_budget} 次限制"
+        print(f"  -> [自适应轮询] {target}：{reason}，下次检查间隔 {interval / 60:.0f} 分钟。")
+        return interval
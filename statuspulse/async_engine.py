@@ -0,0 +1,576 @@
+import argparse
+import dataclasses
+import functools
+import time
+import random
+import asyncio
+import datetime
+import threading
+import concurrent.futures
+import requests
+
+from . import http_checker
+from . import extraction
+from . import page_state
+from . import proc_stats
+from . import status_diff
+from . import menu_fingerprint
+from . import page_selectors as sel
+from .outbox import get_outbox
+from .history import get_history
+from .session_store import SessionStore
+from .browser_manager import DEFAULT_USER_AGENT, DEFAULT_MAX_USES, DRIVER_SPAWN_LOCK, default_launch_args, viewport_options
+from .check_watchdog import kill_process_tree
+from .resource_policy import ResourcePolicy
+from .targets import load_config
+from .scheduler import Scheduler
+from .adaptive import AdaptivePoller
+from .metrics import metrics
+from .coordination import get_coordinator
+from . import retry
+
+
+MAX_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 20
+resource_policy = ResourcePolicy.from_env()
+history = get_history()
+# 最近一次检查各目标的结果（outcome 与耗时），供一次性命令行模式输出
+check_results = {}
+
+
+# ==============================================================================
+#                        【每个目标独立的会话文件 + 共用的状态历史库】
+# ==============================================================================
+_session_stores = {}
+
+
+def session_store(target):
+    """每个目标一个会话文件存储（进程内复用，以便记住上次写入内容的哈希）"""
+    if target.name not in _session_stores:
+        _session_stores[target.name] = SessionStore(target.state_file)
+    return _session_stores[target.name]
+
+
+def load_state(target, dry_run=False):
+    """
+    读取目标的会话Cookies（目标自己的状态文件）以及历史库中的上次状态与快照。
+    多实例部署时以协调库中的共享状态为准，接管目标的实例不会与本机过期的快照对比。
+    旧版状态文件中的上次状态会迁移到历史库；dry_run 时不迁移，直接使用文件中的内容。
+    """
+    data = session_store(target).load() or {}
+    coordinator = get_coordinator()
+    shared = coordinator.load_state(target.name) if coordinator else None
+    if shared is not None:
+        return {"last_status": shared["last_status"], "storage_state": shared["storage_state"] or data.get("storage_state"),
+                "snapshot": shared["snapshot"], "version": shared["version"]}
+    saved = history.load_target(target.name)
+    if "last_status" in data and saved is None:
+        if dry_run:
+            return {"last_status": data["last_status"], "storage_state": data.get("storage_state"),
+                    "snapshot": data.get("snapshot")}
+        history.record_check(target.name, data["last_status"], data.get("snapshot"), baseline=bool(data.get("snapshot")))
+        saved = history.load_target(target.name)
+    if saved is None:
+        return {"last_status": "首次运行", "storage_state": data.get("storage_state"), "snapshot": None}
+    return {"last_status": saved["last_status"], "storage_state": data.get("storage_state"), "snapshot": saved["snapshot"],
+            "version": saved["version"]}
+
+
+def save_state(target, status, storage_state, snapshot=None, changes=(), baseline=False, version=None):
+    """
+    最新状态与变化追加到历史库，会话Cookies保存到目标自己的状态文件（无变化时不写盘）；
+    多实例部署时同时写入协调库，供下一个持有租约的实例读取。
+    """
+    history.record_check(target.name, status, snapshot, changes, baseline)
+    coordinator = get_coordinator()
+    if coordinator:
+        coordinator.save_state(target.name, status, snapshot, storage_state, version, changed=bool(changes))
+    try:
+        session_store(target).save({"storage_state": storage_state})
+    except OSError as e:
+        log(target, f"[错误] 保存会话到 {target.state_file} 失败: {e}")
+
+
+def log(target, message):
+    print(f"  -> [{target.name}] {message}")
+
+
+# ==============================================================================
+#                        【站点级限流】
+# ==============================================================================
+class DomainLimiter:
+    """同一站点的并发上限 + 相邻两次检查开始的最小间隔，避免对同一个期刊站点集中请求"""
+
+    def __init__(self, limit, interval):
+        self.limit = limit
+        self.interval = interval
+        self._semaphores = {}
+        self._locks = {}
+        self._last_start = {}
+
+    async def acquire(self, domain):
+        semaphore = self._semaphores.setdefault(domain, asyncio.Semaphore(self.limit))
+        await semaphore.acquire()
+        try:
+            # 串行化同一站点的“开始时间”，保证间隔
+            async with self._locks.setdefault(domain, asyncio.Lock()):
+                wait = self._last_start.get(domain, 0) + self.interval - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._last_start[domain] = time.monotonic()
+        except BaseException:
+            # 等锁或等间隔时被取消：调用方不会再 release，这里必须归还名额
+            semaphore.release()
+            raise
+
+    def release(self, domain):
+        self._semaphores[domain].release()
+
+
+# ==============================================================================
+#                        【单个目标的异步检查流程】
+# ==============================================================================
+async def type_like_human(locator, text_to_type):
+    """模拟真人逐字输入（非阻塞版本）"""
+    await locator.hover()
+    await asyncio.sleep(random.uniform(0.5, 1.0))
+    for char in text_to_type:
+        await locator.press(char)
+        await asyncio.sleep(random.uniform(0.08, 0.25))
+
+
+async def read_detail_page(op_frame):
+    await op_frame.locator(sel.DETAIL_FIRST_ROW).wait_for(state="attached", timeout=20000)
+    return await extraction.extract_snapshot_async(op_frame)
+
+
+def _result(saved, detail_page=None, menu_page=None, status=None):
+    """返回 (首行/汇总状态, 逐稿件快照)，快照中记录本次的菜单指纹"""
+    if status is None:
+        status = (detail_page.first_row_status or "") if detail_page else ""
+    fingerprint = menu_fingerprint.menu_fingerprint(menu_page) if menu_page else None
+    snapshot = menu_fingerprint.record_full_check(
+        status_diff.build_status_snapshot(detail_page, menu_page), saved.get("snapshot"), fingerprint)
+    menu_fingerprint.report(snapshot, skipped=False)
+    return status, snapshot
+
+
+async def scrape_status(target, context, saved):
+    """与 main.py 相同的策略：识别主菜单/详情页/登录页，必要时登录，然后扫描主菜单。返回 (状态, 快照)"""
+    from playwright.async_api import Error as PlaywrightError
+    page = await context.new_page()
+    metrics.mark_startup("first_navigation")
+    with metrics.span("goto"):
+        await page.goto(target.target_url, wait_until="domcontentloaded", timeout=45000)
+
+    with metrics.span("frame_attach"):
+        main_app_iframe_locator = page.locator(sel.MAIN_APP_IFRAME)
+        await main_app_iframe_locator.wait_for(state="attached", timeout=20000)
+        main_app_frame_object = main_app_iframe_locator.content_frame
+        content_frame_locator = page.locator(sel.CONTENT_IFRAME)
+        await content_frame_locator.wait_for(state="attached", timeout=15000)
+        op_frame = content_frame_locator.content_frame
+
+    with metrics.span("detect"):
+        detection = await page_state.detect_page_state_async(page, timeout=12000)
+    if detection.state == page_state.MAINTENANCE:
+        raise page_state.SiteMaintenance("站点处于维护或错误页面。")
+    if detection.state == page_state.DETAIL_PAGE:
+        with metrics.span("detail_page"):
+            return _result(saved, await read_detail_page(op_frame))
+    login_is_required = detection.state in (page_state.LOGIN_PAGE, page_state.UNKNOWN)
+
+    if login_is_required:
+        log(target, "会话无效，执行登录操作...")
+        with metrics.span("login"):
+            login_iframe_locator = main_app_frame_object.locator(sel.LOGIN_IFRAME)
+            await login_iframe_locator.wait_for(state="attached", timeout=15000)
+            login_form_frame_object = login_iframe_locator.content_frame
+            await type_like_human(login_form_frame_object.locator(sel.USERNAME_INPUT), target.username)
+            await type_like_human(login_form_frame_object.locator(sel.PASSWORD_INPUT), target.password)
+            async with page.expect_navigation(wait_until="domcontentloaded", timeout=45000):
+                await login_form_frame_object.locator(sel.LOGIN_BUTTON).click()
+            if (await page_state.detect_page_state_async(page, timeout=12000)).state == page_state.LOGIN_PAGE:
+                raise retry.LoginRejected("提交登录后仍停留在登录页，请检查账号密码")
+            content_frame_locator = page.locator(sel.CONTENT_IFRAME)
+            await content_frame_locator.wait_for(state="attached", timeout=15000)
+            op_frame = content_frame_locator.content_frame
+
+    with metrics.span("menu_scan"):
+        try:
+            await op_frame.locator(sel.MENU_ITEM).first.wait_for(state="attached", timeout=5000)
+        except PlaywrightError:
+            log(target, "等待超时，在5秒内未找到任何菜单项。")
+        menu_page = await extraction.extract_snapshot_async(op_frame)
+    if not menu_page.active_items:
+        return _result(saved, menu_page=menu_page, status="无在处理的投稿")
+    first_clickable_item = menu_page.first_clickable
+    if not first_clickable_item:
+        return _result(saved, menu_page=menu_page, status=menu_page.aggregated_status())
+    fingerprint = menu_fingerprint.menu_fingerprint(menu_page)
+    if menu_fingerprint.can_skip_detail(saved.get("snapshot"), fingerprint):
+        snapshot = menu_fingerprint.reuse_snapshot(saved["snapshot"], menu_page, fingerprint)
+        menu_fingerprint.report(snapshot, skipped=True)
+        return saved.get("last_status", ""), snapshot
+    with metrics.span("detail_page"):
+        await extraction.menu_item_locator(op_frame, first_clickable_item).click()
+        op_frame = page.frame(name=sel.CONTENT_FRAME_NAME)
+        if not op_frame:
+            raise retry.FrameMissing("点击链接后无法重新定位核心框架！")
+        return _result(saved, await read_detail_page(op_frame), menu_page)
+
+
+async def notify_if_changed(target, saved, current_status, storage_state, status_snapshot, dry_run=False):
+    """逐稿件比对（没有上次快照时按首行状态比对）；有变化时通知该目标自己的收信人。dry_run 时只比对不写入"""
+    last_status = saved.get("last_status", "")
+    previous_snapshot = saved.get("snapshot")
+    changes = []
+
+    if previous_snapshot:
+        status_snapshot = status_diff.merge_snapshots(previous_snapshot, status_snapshot)
+        changes = status_diff.diff_snapshots(previous_snapshot, status_snapshot)
+        for change in changes:
+            log(target, f"!!! 稿件状态发生变化 {change.describe()}")
+        queued = dry_run or not changes or await asyncio.to_thread(
+            get_outbox().enqueue_changes, target.name, changes, target.openid, saved.get("version"))
+    elif current_status and current_status != last_status:
+        log(target, f"!!! 状态发生变化 ({last_status} -> {current_status})，写入发件箱 !!!")
+        queued = dry_run or await asyncio.to_thread(
+            get_outbox().enqueue, target.name, last_status, current_status, target.openid, None, saved.get("version"))
+    else:
+        log(target, f"状态无变化：'{current_status}'")
+        queued = True
+
+    if dry_run:
+        log(target, "[演练] 不写入状态，也不发送通知。")
+        return
+    if queued:
+        save_state(target, current_status or last_status, storage_state, status_snapshot,
+                   changes=changes, baseline=not previous_snapshot and bool(status_snapshot), version=saved.get("version"))
+    else:
+        save_state(target, last_status, storage_state, previous_snapshot, version=saved.get("version"))
+
+
+async def close_context(context, resource_stats):
+    """关闭一次尝试的上下文并记录资源统计；浏览器已崩溃时关闭失败是正常的"""
+    if context is not None:
+        from playwright.async_api import Error as PlaywrightError
+        try:
+            await context.close()
+        except PlaywrightError:
+            pass
+    if resource_stats is not None:
+        resource_stats.report()
+        metrics.inc("transferred_bytes_total", resource_stats.transferred_bytes, help="浏览器放行请求的传输字节数")
+
+
+async def check_target(target, browser, config, global_limit, domain_limiter, coordinator=None):
+    """
+    检查单个目标：随机延迟 -> 获取并发配额 -> 获取租约（多实例部署时）-> HTTP快速通道 -> 浏览器流程（带重试）。
+    browser 为 LazyBrowser。租约在排队结束、真正开始检查时才获取，有效期只需覆盖检查本身。
+    """
+    delay = random.uniform(*config.initial_delay)
+    log(target, f"将随机延迟 {delay:.1f} 秒后开始检查...")
+    await asyncio.sleep(delay)
+
+    breaker = retry.get_breaker(target.domain)
+    if not breaker.allow():
+        log(target, f"[熔断] {breaker.describe()}，本次跳过。")
+        metrics.inc("checks_total", help="检查次数", target=target.name, outcome="circuit_open")
+        check_results[target.name] = {"outcome": "circuit_open", "seconds": 0.0}
+        return None
+
+    async with global_limit:
+        await domain_limiter.acquire(target.domain)
+        if coordinator and not await asyncio.to_thread(coordinator.acquire, target.name, config.check_timeout + 60):
+            domain_limiter.release(target.domain)
+            return None
+        started = time.perf_counter()
+        outcome = "failed"
+        try:
+            # 读取本地文件 / 协调库是阻塞 I/O，放到线程中执行，不卡住事件循环
+            with metrics.span("load_state"):
+                saved = await asyncio.to_thread(load_state, target, config.dry_run)
+            try:
+                metrics.mark_startup("first_request")
+                with metrics.span("http_fast_path"):
+                    current_status, storage_state, status_snapshot = await asyncio.to_thread(
+                        http_checker.check_menu_status, target.target_url, saved.get("storage_state"), target.name,
+                        saved.get("snapshot"))
+                current_status = current_status if current_status is not None else saved.get("last_status")
+                with metrics.span("persist_and_notify"):
+                    await notify_if_changed(target, saved, current_status, storage_state, status_snapshot, config.dry_run)
+                breaker.record_success()
+                outcome = "http"
+                return current_status
+            except (http_checker.LoginRequired, http_checker.PageStructureError, requests.RequestException) as e:
+                log(target, f"HTTP快速通道不可用（{e}），使用浏览器。")
+                failure = retry.classify(e)
+                if failure.site_fault:
+                    breaker.record_failure(failure.kind)
+
+            for attempt in range(MAX_RETRIES):
+                policy = resource_policy.as_diagnostic() if attempt == MAX_RETRIES - 1 else resource_policy
+                context = resource_stats = None
+                delay = None
+                try:
+                    # 每次尝试重新获取：浏览器崩溃或被看门狗结束后由 LazyBrowser 重新启动；
+                    # 启动浏览器、新建上下文失败也按失败类型分类重试
+                    shared_browser = await browser.get()
+                    context = await shared_browser.new_context(
+                        user_agent=DEFAULT_USER_AGENT, storage_state=saved.get("storage_state"), **viewport_options())
+                    resource_stats = await policy.install_async(context)
+                    current_status, status_snapshot = await scrape_status(target, context, saved)
+                    with metrics.span("storage_state"):
+                        storage_state = await context.storage_state()
+                    with metrics.span("persist_and_notify"):
+                        await notify_if_changed(target, saved, current_status, storage_state, status_snapshot, config.dry_run)
+                    breaker.record_success()
+                    outcome = "browser"
+                    return current_status
+                except Exception as e:
+                    failure = retry.classify(e)
+                    log(target, f"[操作异常] 第 {attempt + 1}/{MAX_RETRIES} 次尝试失败（{failure.kind}）: {type(e).__name__} - {str(e).splitlines()[0] if str(e) else ''}")
+                    metrics.inc("check_failures_total", help="按类型统计的检查失败次数", target=target.name, kind=failure.kind)
+                    breaker.record_failure(failure.kind, failure.site_fault)
+                    if failure.recovery == retry.GIVE_UP:
+                        log(target, f"[重试] 失败类型 {failure.kind} 重试无益，本轮放弃。")
+                        return None
+                    if attempt < MAX_RETRIES - 1:
+                        # 每次尝试都会新建上下文，共享浏览器由 LazyBrowser 管理，这里只按失败类型退避
+                        metrics.inc("retries_total", help="浏览器流程的重试次数", target=target.name, recovery=failure.recovery)
+                        delay = failure.delay(attempt, RETRY_BACKOFF_SECONDS)
+                finally:
+                    await close_context(context, resource_stats)
+                if delay is not None:
+                    await asyncio.sleep(delay)
+            log(target, "已达到最大重试次数，本轮放弃。")
+            return None
+        finally:
+            domain_limiter.release(target.domain)
+            if coordinator:
+                await asyncio.to_thread(coordinator.release, target.name)
+            elapsed = time.perf_counter() - started
+            check_results[target.name] = {"outcome": outcome, "seconds": round(elapsed, 3)}
+            # 并发的检查共用一个线程，不使用按线程记录阶段的 metrics.check()：各阶段耗时只进 phase_duration_seconds 直方图
+            metrics.observe("check_duration_seconds", elapsed, help="单次检查总耗时（秒）", target=target.name, outcome=outcome)
+            metrics.inc("checks_total", help="检查次数", target=target.name, outcome=outcome)
+            log(target, f"检查结束，耗时 {elapsed:.1f} 秒。")
+
+
+class LazyBrowser:
+    """
+    第一个需要浏览器的检查才导入 Playwright 并启动 Chromium；全部走HTTP快速通道时不启动浏览器。
+    浏览器断开后在下一次 get() 时重新启动；常驻模式下服务满 max_uses 次检查、且没有检查在使用时重启以回收内存。
+    """
+
+    def __init__(self, max_uses=DEFAULT_MAX_USES):
+        self.max_uses = max_uses
+        self._playwright = None
+        self._browser = None
+        self._driver_pids = set()
+        self._killed = False
+        self._uses = 0
+        self._lock = asyncio.Lock()
+
+    def _recycle_reason(self):
+        if self._browser is None:
+            return None
+        if self._killed or not self._browser.is_connected():
+            return "浏览器已崩溃或断开连接"
+        if self.max_uses and self._uses >= self.max_uses and not self._browser.contexts:
+            return f"已服务 {self._uses} 次检查"
+        return None
+
+    async def get(self):
+        async with self._lock:
+            reason = self._recycle_reason()
+            if reason:
+                print(f"  -> [浏览器] 需要重启浏览器：{reason}。")
+                await self._shutdown()
+            if self._browser is None:
+                from playwright.async_api import async_playwright
+                started = time.perf_counter()
+                await asyncio.to_thread(DRIVER_SPAWN_LOCK.acquire)
+                try:
+                    before = set(proc_stats.children())
+                    self._playwright = await async_playwright().start()
+                    self._driver_pids = set(proc_stats.children()) - before
+                finally:
+                    DRIVER_SPAWN_LOCK.release()
+                self._browser = await self._playwright.chromium.launch(headless=True, args=default_launch_args())
+                self._uses = 0
+                self._killed = False
+                metrics.mark_startup("browser_launched")
+                metrics.inc("browser_launches_total", help="Chromium 冷启动次数")
+                print(f"  -> [浏览器] Chromium 已启动，耗时 {time.perf_counter() - started:.2f} 秒。")
+            self._uses += 1
+            return self._browser
+
+    def kill(self):
+        """
+        强制结束共享浏览器的进程树（驱动 + Chromium），返回结束的进程数。可在任意线程调用，不调用 Playwright API；
+        卡住的检查会因连接断开而失败，仍在进行的其他检查在下一次尝试时通过 get() 拿到重启后的浏览器。
+        """
+        self._killed = True
+        return kill_process_tree(proc_stats.tree_pids(self._driver_pids))
+
+    async def _shutdown(self):
+        browser, playwright, self._browser, self._playwright = self._browser, self._playwright, None, None
+        self._driver_pids = set()
+        try:
+            if browser:
+                await browser.close()
+            if playwright:
+                await playwright.stop()
+        except Exception as e:
+            print(f"  -> [信息] 关闭浏览器时发生错误（浏览器崩溃后这是正常现象）: {e}")
+
+    async def close(self):
+        async with self._lock:
+            await self._shutdown()
+
+
+async def run_sweep(config):
+    """在同一个浏览器上并发检查所有目标，总耗时约等于最慢的那个目标"""
+    coordinator = get_coordinator()
+    if coordinator:
+        # 多实例部署：只检查按存活实例分片后分给本实例的目标，其余目标不启动浏览器
+        owned = coordinator.shard(config.targets)
+        if len(owned) < len(config.targets):
+            print(f"  -> [协调] {len(config.targets)} 个目标中有 {len(owned)} 个分给本实例 {coordinator.instance_id}。")
+        config = dataclasses.replace(config, targets=owned)
+        if not owned:
+            return {}
+    print(f"\n【{time.strftime('%Y-%m-%d %H:%M:%S')}】 开始并发检查 {len(config.targets)} 个目标"
+          f"（并发 {config.concurrency}，单站点并发 {config.per_domain_limit}）...")
+    started = time.perf_counter()
+    global_limit = asyncio.Semaphore(config.concurrency)
+    domain_limiter = DomainLimiter(config.per_domain_limit, config.per_domain_interval)
+
+    browser = LazyBrowser()
+    try:
+        results = await asyncio.gather(
+            *(check_target(t, browser, config, global_limit, domain_limiter, coordinator) for t in config.targets),
+            return_exceptions=True,
+        )
+    finally:
+        await browser.close()
+
+    summary = {t.name: (r if not isinstance(r, BaseException) else f"异常: {r}") for t, r in zip(config.targets, results)}
+    print(f"--- 并发检查完成，共耗时 {time.perf_counter() - started:.1f} 秒 ---")
+    metrics.flush()
+    for name, status in summary.items():
+        print(f"  -> {name}: {status}")
+    return summary
+
+
+class CheckRunner:
+    """
+    常驻模式的检查执行器：一个后台事件循环线程加一个长驻的共享浏览器（LazyBrowser）。
+    各目标的调度任务在自己的工作线程中调用 run()，把检查提交到这个事件循环并等待结果；
+    每次检查使用自己的 BrowserContext，浏览器跨检查、跨目标复用，不再每次检查都冷启动 Chromium。
+    随机延迟与静默时段已由调度器处理，这里不再延迟。
+    """
+
+    def __init__(self, config):
+        self.config = dataclasses.replace(config, initial_delay=(0, 0))
+        self.browser = LazyBrowser()
+        self.global_limit = asyncio.Semaphore(config.concurrency)
+        self.domain_limiter = DomainLimiter(config.per_domain_limit, config.per_domain_interval)
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="check-loop", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    async def _check(self, target):
+        coordinator = get_coordinator()
+        if coordinator and not coordinator.owns(target.name):
+            log(target, "[协调] 目标当前分给其他实例，本实例跳过。")
+            return None
+        try:
+            return await check_target(target, self.browser, self.config, self.global_limit, self.domain_limiter,
+                                      coordinator)
+        finally:
+            metrics.flush()
+
+    def run(self, target):
+        """在调度器的工作线程中调用：提交一次检查并等待结束，超过 check_timeout 时取消"""
+        future = asyncio.run_coroutine_threadsafe(self._check(target), self.loop)
+        try:
+            return future.result(timeout=self.config.check_timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            # 与同步流程的看门狗一致：结束浏览器进程树，卡在 Playwright 调用里的协程随连接断开而退出
+            killed = self.browser.kill()
+            print(f"  -> [看门狗] [{target.name}] 检查超过 {self.config.check_timeout} 秒硬时限，已取消并结束浏览器进程树"
+                  f"（{killed} 个进程）。")
+            metrics.inc("watchdog_timeouts_total", help="检查超过硬时限被终止的次数", target=target.name)
+            metrics.inc("watchdog_killed_processes_total", killed, help="看门狗结束的浏览器进程数", target=target.name)
+            return None
+
+    def close(self, timeout=30):
+        if self._thread.is_alive():
+            try:
+                asyncio.run_coroutine_threadsafe(self.browser.close(), self.loop).result(timeout=timeout)
+            except Exception as e:
+                print(f"  -> [信息] 关闭共享浏览器失败: {e}")
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def join_coordination(path=None, instance_id=None):
+    """配置了协调库（参数或 COORD_DB）时加入多实例协调，并让发件箱跨实例去重通知"""
+    coordinator = get_coordinator(path, instance_id)
+    if coordinator:
+        get_outbox().dedup = coordinator
+        print(f"  -> [协调] 已加入协调库 {coordinator.backend.path}，本实例 {coordinator.instance_id}。")
+    return coordinator
+
+
+def serve(config):
+    """
+    常驻模式：每个目标按自己的 interval_minutes / jitter 独立调度，同周期的目标在周期内均匀错开。
+    开启自适应轮询时，interval_minutes 作为基准周期，实际间隔由稿件状态的历史停留时长决定。
+    所有目标共用 CheckRunner 中长驻的浏览器。
+    """
+    runner = CheckRunner(config).start()
+    scheduler = Scheduler()
+    for target in config.targets:
+        interval_func = None
+        if config.adaptive:
+            poller = AdaptivePoller(history, floor_minutes=config.poll_floor_minutes,
+                                    ceiling_minutes=config.poll_ceiling_minutes,
+                                    base_minutes=target.interval_minutes, daily_budget=config.daily_budget)
+            site_targets = [t.name for t in config.targets if t.domain == target.domain]
+            interval_func = functools.partial(poller.next_interval, target.name, site_targets)
+        scheduler.add_job(target.name, functools.partial(runner.run, target),
+                          interval_minutes=target.interval_minutes, jitter=target.jitter or config.initial_delay,
+                          timeout=config.check_timeout, quiet_hours=config.quiet_hours, interval_func=interval_func)
+    coordinator = get_coordinator()
+    if coordinator:
+        coordinator.start()
+    get_outbox().start()
+    try:
+        scheduler.run_forever()
+    finally:
+        runner.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="多目标并发检查")
+    parser.add_argument("config", nargs="?", help="目标配置文件，默认 targets.json")
+    parser.add_argument("--serve", action="store_true", help="常驻运行，按各目标的周期调度")
+    parser.add_argument("--coord", help="多实例协调用的共享 SQLite 库（默认读取 COORD_DB，不设置则不协调）")
+    parser.add_argument("--instance-id", help="本实例在协调库中的标识，默认 主机名-进程号")
+    args = parser.parse_args()
+    print(f"[{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 多目标并发检查启动。")
+    config = load_config(args.config)
+    join_coordination(args.coord, args.instance_id)
+    if args.serve:
+        serve(config)
+    else:
+        asyncio.run(run_sweep(config))
+        # 扫描结束后把本轮入队的通知发完再退出
+        get_outbox().drain()
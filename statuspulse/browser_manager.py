@@ -0,0 +1,344 @@
+import os
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+
+from . import proc_stats
+from .check_watchdog import kill_process_tree
+from .metrics import metrics
+
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
+DEFAULT_LAUNCH_ARGS = ["--start-maximized", "--disable-blink-features=AutomationControlled"]
+
+# 小内存主机（与其他服务共用 512 MB 左右）设置 BROWSER_LOW_MEMORY=1：
+# 限制渲染进程数、关闭站点隔离（iframe 与主页面共用渲染进程）、关闭 GPU/扩展/后台网络，限制 V8 堆，使用较小的固定视口
+BROWSER_LOW_MEMORY = os.getenv("BROWSER_LOW_MEMORY", "0") == "1"
+BROWSER_JS_HEAP_MB = int(os.getenv("BROWSER_JS_HEAP_MB", "128"))
+LOW_MEMORY_LAUNCH_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    "--renderer-process-limit=1",
+    "--process-per-site",
+    "--disable-site-isolation-trials",
+    "--disable-features=site-per-process,IsolateOrigins,Translate,MediaRouter,OptimizationHints,BackForwardCache",
+    "--disable-gpu",
+    "--disable-software-rasterizer",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-component-extensions-with-background-pages",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+    f"--js-flags=--max-old-space-size={BROWSER_JS_HEAP_MB}",
+]
+LOW_MEMORY_VIEWPORT = {"width": 1024, "height": 768}
+
+# 检查期间浏览器进程树常驻内存的预算（MB，0 表示不限制）与超出后的处理：
+# recycle 让本次检查跑完后立即关闭浏览器；abort 立即结束浏览器进程树，本次检查按浏览器崩溃处理
+BROWSER_RSS_BUDGET_MB = int(os.getenv("BROWSER_RSS_BUDGET_MB", "0"))
+BROWSER_RSS_BUDGET_ACTION = os.getenv("BROWSER_RSS_BUDGET_ACTION", "recycle")
+RSS_SAMPLE_INTERVAL = 0.25
+
+# 同一个 Chromium 实例最多服务的检查次数，超过后主动重启以回收内存
+DEFAULT_MAX_USES = 48
+# 浏览器进程树常驻内存上限（MB），超过后在下一次检查前重启
+DEFAULT_MAX_RSS_MB = 600
+
+# 启动 Playwright 驱动时串行化，通过比较启动前后本进程的直接子进程确定驱动的pid
+DRIVER_SPAWN_LOCK = threading.Lock()
+
+
+def start_driver(start):
+    """调用 start() 启动 Playwright 驱动，返回 (start() 的返回值, 新启动的驱动进程pid集合)"""
+    with DRIVER_SPAWN_LOCK:
+        before = set(proc_stats.children())
+        result = start()
+        return result, set(proc_stats.children()) - before
+
+
+def default_launch_args(low_memory=BROWSER_LOW_MEMORY):
+    return list(LOW_MEMORY_LAUNCH_ARGS if low_memory else DEFAULT_LAUNCH_ARGS)
+
+
+def viewport_options(low_memory=BROWSER_LOW_MEMORY):
+    """上下文的视口参数：低内存模式使用固定的小视口，否则跟随窗口大小"""
+    return {"viewport": dict(LOW_MEMORY_VIEWPORT)} if low_memory else {"no_viewport": True}
+
+
+class BrowserManager:
+    """
+    长驻的 Chromium 管理器。
+    只在首次使用、浏览器崩溃、使用次数或内存超限时才(重新)启动浏览器，
+    每次检查通过 new_context() 分配一个全新的 BrowserContext（由保存的 storage_state 初始化）。
+    传入 profile（browser_profile.BrowserProfile）时改用 launch_persistent_context：
+    各次检查复用同一个持久化上下文，HTTP 磁盘缓存跨检查、跨进程保留，Cookies 仍以 storage_state 为准。
+    每次检查期间采样浏览器进程树的内存，记录峰值与平均值；超过 rss_budget_mb 时按 budget_action 回收或中止。
+    注意：Playwright 同步API的对象只能在创建它的线程中使用。调度器放弃卡住的工作线程后，下一轮在新线程中运行：
+    此时不再调用旧线程上的 Playwright 对象，而是直接结束旧的浏览器进程树，在新线程中重新启动。
+    """
+
+    def __init__(self, headless=True, launch_args=None, user_agent=DEFAULT_USER_AGENT,
+                 max_uses=DEFAULT_MAX_USES, max_rss_mb=DEFAULT_MAX_RSS_MB, profile=None,
+                 low_memory=BROWSER_LOW_MEMORY, rss_budget_mb=BROWSER_RSS_BUDGET_MB,
+                 budget_action=BROWSER_RSS_BUDGET_ACTION):
+        if budget_action not in ("recycle", "abort"):
+            raise ValueError(f"未知的内存预算处理方式：{budget_action}（可选 recycle、abort）")
+        self.headless = headless
+        self.low_memory = low_memory
+        self.launch_args = launch_args or default_launch_args(low_memory)
+        self.user_agent = user_agent
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self.profile = profile
+        self.rss_budget_mb = rss_budget_mb
+        self.budget_action = budget_action
+
+        self._playwright = None
+        self._browser = None
+        # 持久化模式下的长驻上下文（此时 _browser 为 None）
+        self._persistent = None
+        # 本实例启动的 Playwright 驱动进程pid，Chromium 是它们的后代
+        self._driver_pids = set()
+        self._uses = 0
+        self._crashed = False
+        # 启动浏览器的线程（Playwright 同步API对象只能在该线程中使用）
+        self._owner_thread = None
+        self.launch_count = 0
+        self.last_check_stats = None
+        # 本次检查期间超出内存预算时记录的内存（MB），由采样线程写入
+        self._over_budget = None
+        atexit.register(self.close)
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+    def _launch(self):
+        """冷启动 Playwright 驱动与 Chromium（Playwright 在第一次启动时才导入）"""
+        from playwright.sync_api import sync_playwright
+        self.close()
+        started = time.perf_counter()
+        self._playwright, self._driver_pids = start_driver(sync_playwright().start)
+        if self.profile and not self.profile.in_use():
+            self._launch_persistent()
+        else:
+            if self.profile:
+                print(f"  -> [配置目录] {self.profile.path} 正被其他 Chromium 进程使用，本次使用临时上下文。")
+            self._browser = self._playwright.chromium.launch(headless=self.headless, args=self.launch_args)
+            self._browser.on("disconnected", self._on_disconnected)
+        self._uses = 0
+        self._crashed = False
+        self._owner_thread = threading.get_ident()
+        self.launch_count += 1
+        mode = f"持久化配置目录 {self.profile.path}" if self._persistent else "临时上下文"
+        print(f"  -> [浏览器] Chromium 已冷启动（第 {self.launch_count} 次，{mode}），耗时 {time.perf_counter() - started:.2f} 秒。")
+
+    def _launch_persistent(self):
+        """以持久化配置目录启动；目录损坏导致启动失败时换用全新目录重试一次"""
+        self.profile.prepare()
+        args = self.launch_args + self.profile.launch_args()
+        for attempt in range(2):
+            try:
+                self._persistent = self._playwright.chromium.launch_persistent_context(
+                    str(self.profile.path), headless=self.headless, args=args,
+                    user_agent=self.user_agent, **viewport_options(self.low_memory))
+                break
+            except Exception as e:
+                if attempt:
+                    raise
+                self.profile.reset(f"启动失败：{str(e).splitlines()[0] if str(e) else type(e).__name__}")
+        self._persistent.on("close", self._on_disconnected)
+
+    def _on_disconnected(self, _target):
+        self._crashed = True
+
+    def browser_pids(self):
+        """本实例的浏览器进程树：Playwright 驱动及其拉起的 Chromium 进程"""
+        return proc_stats.tree_pids(self._driver_pids)
+
+    def kill(self):
+        """
+        强制结束本实例的浏览器进程树（Playwright 驱动 + Chromium），返回结束的进程数。供看门狗在其他线程中调用，
+        因此不调用任何 Playwright API；卡住的调用会因连接断开而抛出异常，下一次 ensure_browser() 重新启动浏览器。
+        不影响本进程的其他子进程（例如其他 BrowserManager 或异步引擎的浏览器）。
+        """
+        self._crashed = True
+        return kill_process_tree(self.browser_pids())
+
+    def browser_rss_mb(self):
+        """本实例浏览器进程树（Playwright 驱动 + Chromium）的常驻内存，单位 MB"""
+        return sum(proc_stats.process_rss_bytes(pid) for pid in self.browser_pids()) / (1024 * 1024)
+
+    def _check_budget(self, rss_bytes):
+        """采样线程的回调：检查期间内存超出预算时记录，abort 模式下立即结束浏览器进程树（不调用 Playwright API）"""
+        rss_mb = rss_bytes / (1024 * 1024)
+        if not self.rss_budget_mb or rss_mb <= self.rss_budget_mb or self._over_budget is not None:
+            return
+        self._over_budget = rss_mb
+        metrics.inc("browser_rss_budget_exceeded_total", help="检查期间浏览器内存超出预算的次数", action=self.budget_action)
+        if self.budget_action == "abort":
+            killed = self.kill()
+            print(f"  -> [内存] 浏览器内存 {rss_mb:.0f} MB 超出预算 {self.rss_budget_mb} MB，"
+                  f"已中止本次检查并结束浏览器进程树（{killed} 个进程）。")
+
+    def is_healthy(self):
+        """浏览器是否仍然可用（未崩溃、连接未断开）"""
+        from playwright.sync_api import Error as PlaywrightError
+        if self._persistent is not None:
+            return not self._crashed
+        if not self._browser or self._crashed:
+            return False
+        try:
+            return self._browser.is_connected()
+        except PlaywrightError:
+            return False
+
+    def _recycle_reason(self):
+        """判断是否需要重启浏览器，返回原因（无需重启时返回 None）"""
+        if not self._browser and self._persistent is None:
+            return "首次启动"
+        if self._owner_thread != threading.get_ident():
+            return "工作线程已更换（上一个线程卡住后被调度器放弃）"
+        if not self.is_healthy():
+            return "浏览器已崩溃或断开连接"
+        if self.max_uses and self._uses >= self.max_uses:
+            return f"已服务 {self._uses} 次检查"
+        if self.max_rss_mb:
+            rss_mb = self.browser_rss_mb()
+            if rss_mb > self.max_rss_mb:
+                return f"内存占用 {rss_mb:.0f} MB 超过上限 {self.max_rss_mb} MB"
+        return None
+
+    def ensure_browser(self):
+        """返回一个健康的浏览器实例，必要时重启。第二个返回值表示本次是否为冷启动"""
+        reason = self._recycle_reason()
+        if reason:
+            if self._browser or self._persistent is not None:
+                print(f"  -> [浏览器] 需要重启浏览器：{reason}。")
+            self._launch()
+            return self._browser, True
+        return self._browser, False
+
+    def close(self):
+        """
+        关闭浏览器与 Playwright 驱动（可重复调用）。
+        在启动浏览器以外的线程中调用时不能使用 Playwright API，改为结束浏览器进程树并丢弃旧对象。
+        """
+        if self._owner_thread is not None and self._owner_thread != threading.get_ident():
+            killed = kill_process_tree(self.browser_pids())
+            print(f"  -> [浏览器] 浏览器由其他线程启动，已直接结束其进程树（{killed} 个进程）。")
+            self._browser = self._persistent = self._playwright = None
+            self._driver_pids = set()
+            self._owner_thread = None
+            return
+        if self._persistent is not None:
+            try:
+                self._persistent.close()
+            except Exception as e:
+                print(f"  -> [信息] 关闭持久化上下文时发生错误（浏览器崩溃后这是正常现象）: {e}")
+        if self._browser:
+            try:
+                self._browser.close()
+            except Exception as e:
+                print(f"  -> [信息] 关闭浏览器时发生错误（浏览器崩溃后这是正常现象）: {e}")
+        if self._playwright:
+            try:
+                self._playwright.stop()
+            except Exception:
+                pass
+        self._browser = None
+        self._persistent = None
+        self._playwright = None
+        self._driver_pids = set()
+        self._owner_thread = None
+
+    # ------------------------------------------------------------------
+    # 每次检查使用的上下文
+    # ------------------------------------------------------------------
+    @contextmanager
+    def new_context(self, storage_state=None, resource_policy=None, **context_options):
+        """
+        分配一个全新的 BrowserContext，退出时自动关闭，并统计本次检查的耗时与CPU消耗。
+        传入 resource_policy 时在该上下文上安装请求拦截（见 resource_policy.py）。
+        持久化模式下返回长驻的持久化上下文：Cookies 重置为 storage_state，只统计请求不拦截（拦截会绕过缓存），
+        context_options 不生效，退出时只关闭本次打开的页面。
+        用法：with manager.new_context(storage_state=...) as context: ...
+        """
+        from playwright.sync_api import Error as PlaywrightError
+        started = time.perf_counter()
+        cpu_started = proc_stats.tree_cpu_seconds()
+        browser, cold_start = self.ensure_browser()
+
+        persistent = self._persistent
+        if persistent is not None:
+            context = persistent
+            pages_before = set(context.pages)
+            # 会话失效（storage_state 为 None）时清空 Cookies，与临时上下文一样走登录流程
+            context.clear_cookies()
+            if storage_state and storage_state.get("cookies"):
+                context.add_cookies(storage_state["cookies"])
+            resource_stats = resource_policy.install(context, intercept=False) if resource_policy else None
+        else:
+            options = {"user_agent": self.user_agent, **viewport_options(self.low_memory)}
+            options.update(context_options)
+            context = browser.new_context(storage_state=storage_state, **options)
+            resource_stats = resource_policy.install(context) if resource_policy else None
+        self._uses += 1
+        self._over_budget = None
+        sampler = proc_stats.RssSampler(RSS_SAMPLE_INTERVAL, on_sample=self._check_budget, pids=self.browser_pids).start()
+        try:
+            yield context
+        finally:
+            try:
+                if persistent is not None:
+                    if resource_stats:
+                        resource_stats.detach()
+                    for page in context.pages:
+                        if page not in pages_before:
+                            page.close()
+                else:
+                    context.close()
+            except PlaywrightError:
+                pass
+            sampler.stop()
+            self.last_check_stats = {
+                "cold_start": cold_start,
+                "elapsed_seconds": round(time.perf_counter() - started, 3),
+                "cpu_seconds": round(proc_stats.tree_cpu_seconds() - cpu_started, 3),
+                "browser_rss_mb": round(self.browser_rss_mb(), 1),
+                "rss_peak_mb": round(sampler.peak_bytes / (1024 * 1024), 1),
+                "rss_mean_mb": round(sampler.mean_bytes / (1024 * 1024), 1),
+                "rss_samples": sampler.samples,
+                "over_budget": self._over_budget is not None,
+                "uses": self._uses,
+                "resources": resource_stats.as_dict() if resource_stats else None,
+            }
+            if resource_stats:
+                resource_stats.report()
+                metrics.inc("transferred_bytes_total", resource_stats.transferred_bytes, help="浏览器放行请求的传输字节数")
+                metrics.inc("blocked_requests_total", resource_stats.blocked_requests, help="被资源策略拦截的请求数")
+            metrics.set("browser_rss_mb", self.last_check_stats["browser_rss_mb"], help="浏览器进程树常驻内存（MB）")
+            metrics.set("browser_rss_peak_mb", self.last_check_stats["rss_peak_mb"], help="最近一次检查期间浏览器内存峰值（MB）")
+            metrics.set("browser_rss_mean_mb", self.last_check_stats["rss_mean_mb"], help="最近一次检查期间浏览器内存平均值（MB）")
+            metrics.inc("browser_cpu_seconds_total", self.last_check_stats["cpu_seconds"], help="检查期间浏览器进程树的CPU时间")
+            if cold_start:
+                metrics.inc("browser_launches_total", help="Chromium 冷启动次数")
+            self.report_last_check()
+            if self._over_budget is not None and self.budget_action == "recycle":
+                print(f"  -> [内存] 本次检查浏览器内存峰值 {self.last_check_stats['rss_peak_mb']:.0f} MB "
+                      f"超出预算 {self.rss_budget_mb} MB，关闭浏览器以回收内存。")
+                self.close()
+
+    def report_last_check(self):
+        """打印最近一次检查的性能数据，便于对比冷启动与热启动"""
+        stats = self.last_check_stats
+        if not stats:
+            return
+        mode = "冷启动" if stats["cold_start"] else "热启动"
+        print(f"  -> [性能] 本次检查({mode}) 耗时 {stats['elapsed_seconds']:.2f} 秒，"
+              f"CPU {stats['cpu_seconds']:.2f} 秒，浏览器内存 {stats['browser_rss_mb']:.0f} MB"
+              f"（检查期间峰值 {stats['rss_peak_mb']:.0f} MB，平均 {stats['rss_mean_mb']:.0f} MB），"
+              f"该实例已服务 {stats['uses']} 次检查。")
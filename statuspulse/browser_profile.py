@@ -0,0 +1,133 @@
+import os
+import json
+import shutil
+import socket
+from pathlib import Path
+
+from .metrics import metrics
+
+
+# 设置 BROWSER_PROFILE=1 后，每个目标使用 BROWSER_PROFILE_ROOT/<目标名> 下的持久化 Chromium 配置目录，
+# 跨检查、跨进程保留 HTTP 磁盘缓存，冷启动时不必重新下载门户的 JS/CSS
+BROWSER_PROFILE = os.getenv("BROWSER_PROFILE", "0") == "1"
+BROWSER_PROFILE_ROOT = Path(os.getenv("BROWSER_PROFILE_ROOT", "browser_profiles"))
+# HTTP 磁盘缓存上限（MB，交给 Chromium 的 --disk-cache-size）与整个配置目录的上限（MB）
+PROFILE_CACHE_MB = int(os.getenv("PROFILE_CACHE_MB", "64"))
+PROFILE_MAX_MB = int(os.getenv("PROFILE_MAX_MB", "256"))
+
+# 对检查没有价值的目录，每次启动前清理：GPU/着色器缓存、崩溃报告、标签页恢复、Service Worker 缓存
+DISPOSABLE_DIRS = [
+    "GrShaderCache", "ShaderCache", "GraphiteDawnCache", "Crashpad", "BrowserMetrics",
+    "Default/GPUCache", "Default/DawnCache", "Default/DawnGraphiteCache", "Default/Sessions",
+    "Default/Session Storage", "Default/blob_storage", "Default/Service Worker/CacheStorage",
+]
+# 配置目录超过上限时再清理的缓存目录（会话Cookies与登录状态不受影响）
+CACHE_DIRS = ["Default/Cache", "Default/Code Cache"]
+# 被强制结束的 Chromium 留下的单实例锁
+SINGLETON_FILES = ["SingletonLock", "SingletonSocket", "SingletonCookie"]
+# Chromium 启动时解析的 JSON 文件，损坏时整个配置目录重建
+JSON_FILES = ["Local State", "Default/Preferences"]
+
+
+def dir_size(path):
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class BrowserProfile:
+    """
+    一个目标的持久化 Chromium 配置目录：启动前清理锁文件与无用目录、超过上限时清空缓存，
+    配置文件损坏或启动失败时把目录移走并换用全新的配置目录。
+    Chromium 运行期间不修改目录内容。
+    """
+
+    def __init__(self, name, root=BROWSER_PROFILE_ROOT, cache_mb=PROFILE_CACHE_MB, max_mb=PROFILE_MAX_MB):
+        self.name = name
+        self.path = Path(root) / name
+        self.cache_mb = cache_mb
+        self.max_mb = max_mb
+
+    def launch_args(self):
+        return [f"--disk-cache-size={self.cache_mb * 1024 * 1024}"]
+
+    # ------------------------------------------------------------------
+    # 启动前的维护
+    # ------------------------------------------------------------------
+    def _lock_owner(self):
+        """SingletonLock 指向 “主机名-进程号”，持有者仍在运行时返回其进程号"""
+        try:
+            target = os.readlink(self.path / "SingletonLock")
+        except OSError:
+            return None
+        host, _, pid = target.rpartition("-")
+        if host != socket.gethostname() or not pid.isdigit() or int(pid) == os.getpid():
+            return None
+        return int(pid) if Path(f"/proc/{pid}").exists() else None
+
+    def in_use(self):
+        return self._lock_owner() is not None
+
+    def _corrupted(self):
+        for name in JSON_FILES:
+            path = self.path / name
+            if not path.exists():
+                continue
+            try:
+                json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                return f"{name} 无法解析（{e}）"
+        return None
+
+    def prepare(self):
+        """启动前调用：修复或重建配置目录并清理，返回启动前的目录大小（字节）"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        reason = self._corrupted()
+        if reason:
+            self.reset(reason)
+        # 看门狗或 OOM 结束的 Chromium 不会删除锁文件，留着会让下一次启动失败
+        for name in SINGLETON_FILES:
+            try:
+                (self.path / name).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"  -> [配置目录] 删除 {name} 失败: {e}")
+        return self.prune()
+
+    def prune(self):
+        """删除无用目录；仍超过 max_mb 时清空 HTTP 缓存与代码缓存"""
+        for name in DISPOSABLE_DIRS:
+            shutil.rmtree(self.path / name, ignore_errors=True)
+        size = dir_size(self.path)
+        if size > self.max_mb * 1024 * 1024:
+            for name in CACHE_DIRS:
+                shutil.rmtree(self.path / name, ignore_errors=True)
+            pruned = dir_size(self.path)
+            print(f"  -> [配置目录] {self.path} 占用 {size / 1048576:.0f} MB，超过上限 {self.max_mb} MB，"
+                  f"已清空缓存（剩余 {pruned / 1048576:.0f} MB）。")
+            size = pruned
+        metrics.set("browser_profile_bytes", size, help="持久化浏览器配置目录大小（字节）", profile=self.name)
+        return size
+
+    def reset(self, reason):
+        """把当前配置目录移走（保留一份用于排查，旧的覆盖），换用全新的配置目录"""
+        print(f"  -> [配置目录] {self.path} 不可用（{reason}），改用全新的配置目录。")
+        broken = self.path.with_name(f"{self.path.name}.broken")
+        shutil.rmtree(broken, ignore_errors=True)
+        try:
+            self.path.rename(broken)
+        except OSError:
+            shutil.rmtree(self.path, ignore_errors=True)
+        self.path.mkdir(parents=True, exist_ok=True)
+        metrics.inc("browser_profile_resets_total", help="持久化浏览器配置目录重建次数", profile=self.name)
+
+
+def profile_for(name):
+    """开启 BROWSER_PROFILE 时返回目标的持久化配置目录，否则返回 None（使用临时上下文）"""
+    return BrowserProfile(name) if BROWSER_PROFILE else None
@@ -0,0 +1,101 @@
+import os
+import time
+import signal
+import threading
+
+from . import proc_stats
+from .metrics import metrics
+
+
+# SIGTERM 之后等待进程自行退出的时间（秒），超时后 SIGKILL
+KILL_GRACE_SECONDS = 5
+
+# kill_process_tree 结束过的、不是本进程直接子进程的pid（驱动退出后被过继给本进程的 Chromium）。
+# 直接子进程（Playwright 驱动）由 asyncio 的子进程监视器 waitpid，这里不能抢先回收
+_reapable = set()
+_reapable_lock = threading.Lock()
+
+
+def kill_process_tree(pids, grace=KILL_GRACE_SECONDS):
+    """先向所有进程发送 SIGTERM，grace 秒后仍存活的发送 SIGKILL，返回收到信号的进程数"""
+    signalled = []
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+            signalled.append(pid)
+        except ProcessLookupError:
+            pass
+        except PermissionError as e:
+            print(f"  -> [看门狗] 无权结束进程 {pid}: {e}")
+    direct = set(proc_stats.children())
+    with _reapable_lock:
+        _reapable.update(pid for pid in signalled if pid not in direct)
+    deadline = time.monotonic() + grace
+    alive = list(signalled)
+    while alive and time.monotonic() < deadline:
+        time.sleep(0.1)
+        alive = [pid for pid in alive if proc_stats.process_state(pid) not in (None, "Z")]
+    for pid in alive:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    reap_zombies()
+    return len(signalled)
+
+
+def reap_zombies():
+    """
+    回收已退出但未被 wait 的子进程，返回回收数。
+    容器中本进程是 PID 1 时，被结束的 Playwright 驱动留下的孤儿 Chromium 会挂到本进程下。
+    只回收 kill_process_tree 结束过的进程，其余子进程（包括 Playwright 驱动）留给创建它的代码或 asyncio 回收。
+    """
+    reaped = 0
+    with _reapable_lock:
+        for pid in proc_stats.zombie_children():
+            if pid not in _reapable:
+                continue
+            try:
+                if os.waitpid(pid, os.WNOHANG)[0]:
+                    reaped += 1
+                    _reapable.discard(pid)
+            except ChildProcessError:
+                _reapable.discard(pid)
+        # 已经消失的进程不再记录，避免pid复用后误回收
+        _reapable.difference_update([pid for pid in _reapable if proc_stats.process_state(pid) is None])
+    return reaped
+
+
+class CheckWatchdog:
+    """
+    检查任务的硬超时处理，作为调度器任务的 on_timeout 回调（在监控线程中调用）：
+    - 结束浏览器进程树（Playwright 驱动 + Chromium），卡住的 Playwright 调用会因连接断开而抛出异常，
+      检查线程随之退出，内存被回收，下一次检查自动重启浏览器；
+    - 设置取消标志，检查流程看到后不再重试；
+    - 记录超时次数、结束的进程数到 metrics。
+    """
+
+    def __init__(self, name, browser_manager=None):
+        self.name = name
+        self.browser_manager = browser_manager
+        self._cancelled = threading.Event()
+        self.timeouts = 0
+        self.killed_processes = 0
+
+    def begin(self):
+        """每次检查开始时调用"""
+        self._cancelled.clear()
+
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def on_timeout(self, job):
+        self._cancelled.set()
+        self.timeouts += 1
+        killed = self.browser_manager.kill() if self.browser_manager else 0
+        self.killed_processes += killed
+        print(f"  -> [看门狗] 任务 '{job.name}' 超过 {job.timeout:.0f} 秒硬时限，已结束浏览器进程树（{killed} 个进程），"
+              f"累计超时 {self.timeouts} 次。")
+        metrics.inc("watchdog_timeouts_total", help="检查超过硬时限被终止的次数", target=self.name)
+        metrics.inc("watchdog_killed_processes_total", killed, help="看门狗结束的浏览器进程数", target=self.name)
+        metrics.flush()
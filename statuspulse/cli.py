@@ -0,0 +1,129 @@
+"""
+命令行入口（pyproject.toml 中的 papaxia 脚本），一次性模式与常驻模式共用 async_engine 的检查核心：
+  papaxia check --once [--target NAME ...] [--dry-run] [--json]   检查一次后退出，适合 cron / systemd timer
+  papaxia check                                                   常驻运行，按各目标的周期调度
+本模块只导入标准库，参数错误与 --help 不加载任何检查代码；执行 check 时才导入 async_engine，
+连同HTTP快速通道需要的 requests、bs4 以及发件箱用到的 wechat 一起加载（约 0.2 秒）。
+playwright 只在HTTP快速通道失败、需要启动浏览器时才导入。
+
+以下功能目前只在同步流程（python -m statuspulse.main）中生效，papaxia check 不使用：
+会话保活（SESSION_IDLE_TIMEOUT_MINUTES）、失败诊断截图（DIAG_*）、持久化浏览器配置（BROWSER_PROFILE）、
+浏览器内存预算（BROWSER_RSS_BUDGET_MB）。各阶段耗时（phase_duration_seconds）两条流程都记录，
+但 papaxia check 并发检查多个目标，不写按检查的 metrics.jsonl 记录。
+"""
+import sys
+import json
+import time
+import argparse
+import contextlib
+
+
+STARTUP_LABELS = {
+    "imports": "导入完成",
+    "first_request": "首次请求",
+    "browser_launched": "浏览器启动",
+    "first_navigation": "首次导航",
+}
+
+SYNC_ONLY_NOTE = """\
+注意：会话保活、失败诊断截图（DIAG_*）、持久化浏览器配置（BROWSER_PROFILE=1）
+与浏览器内存预算（BROWSER_RSS_BUDGET_MB）只在同步流程 python -m statuspulse.main 中生效，
+本命令会忽略这些设置。"""
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="papaxia", description="期刊投稿状态检查")
+    commands = parser.add_subparsers(dest="command", required=True)
+    check = commands.add_parser(
+        "check", help="检查投稿状态", formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=SYNC_ONLY_NOTE)
+    check.add_argument("--once", action="store_true", help="检查一次后退出（默认常驻运行）")
+    check.add_argument("--target", action="append", metavar="NAME", help="只检查指定目标，可重复；默认全部")
+    check.add_argument("--config", help="目标配置文件，默认 targets.json（不存在时使用 .env 中的单账号配置）")
+    check.add_argument("--dry-run", action="store_true", help="只检查与比对，不写入状态、不发送通知")
+    check.add_argument("--json", action="store_true", help="以 JSON 输出结果（日志改写到标准错误）")
+    check.add_argument("--coord", help="多实例协调用的共享 SQLite 库（默认读取 COORD_DB）")
+    check.add_argument("--instance-id", help="本实例在协调库中的标识，默认 主机名-进程号")
+    return parser
+
+
+def select_targets(config, names):
+    if not names:
+        return config
+    known = {t.name: t for t in config.targets}
+    missing = [name for name in names if name not in known]
+    if missing:
+        raise SystemExit(f"未知的目标：{', '.join(missing)}（可选：{', '.join(known)}）")
+    config.targets = [known[name] for name in names]
+    return config
+
+
+def run_once(args, config):
+    """检查一次，返回 (结果, 退出码)；任一目标检查失败时退出码为 1（熔断跳过、分给其他实例的目标不算失败）"""
+    import asyncio
+    from . import async_engine
+    from . import retry
+    from .metrics import metrics
+
+    # 一次性模式由 cron / timer 控制触发时间，不再随机延迟
+    config.initial_delay = (0, 0)
+    config.dry_run = args.dry_run
+    if args.dry_run:
+        retry.set_read_only()
+    started = time.perf_counter()
+    summary = asyncio.run(async_engine.run_sweep(config))
+    if not args.dry_run:
+        # 退出前把本轮入队的通知发完
+        async_engine.get_outbox().drain()
+    targets = {}
+    for name, status in summary.items():
+        result = dict(async_engine.check_results.get(name, {"outcome": "skipped"}))
+        result["status"] = status
+        targets[name] = result
+    failed = [name for name, r in targets.items() if r["outcome"] not in ("http", "browser", "skipped", "circuit_open")]
+    return {
+        "targets": targets,
+        "dry_run": args.dry_run,
+        "seconds": round(time.perf_counter() - started, 3),
+        "startup": dict(metrics.startup),
+    }, 1 if failed else 0
+
+
+def print_startup(startup):
+    parts = [f"{label} {startup[phase]:.2f} 秒" for phase, label in STARTUP_LABELS.items() if phase in startup]
+    if parts:
+        print(f"  -> [启动] 自进程启动：{'，'.join(parts)}。")
+
+
+def check(args):
+    output = contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext()
+    with output:
+        from . import async_engine
+        from .targets import load_config
+        from .metrics import metrics
+
+        metrics.mark_startup("imports")
+        config = select_targets(load_config(args.config), args.target)
+        async_engine.join_coordination(args.coord, args.instance_id)
+        if not args.once:
+            if args.dry_run or args.json:
+                raise SystemExit("--dry-run 与 --json 只能与 --once 一起使用")
+            async_engine.serve(config)
+            return 0
+        result, code = run_once(args, config)
+        if not args.json:
+            print_startup(result["startup"])
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    return code
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "check":
+        return check(args)
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,345 @@
+import os
+import json
+import time
+import atexit
+import socket
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+
+from .metrics import metrics
+
+
+# 多实例协调使用的共享库；未设置时不做协调，单实例行为与以前一致
+COORD_DB = os.getenv("COORD_DB")
+INSTANCE_ID = os.getenv("INSTANCE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+# 心跳间隔（秒）；超过 INSTANCE_TTL 秒没有心跳的实例视为已下线，它的目标由其余实例接管
+HEARTBEAT_INTERVAL = 15
+INSTANCE_TTL = 60
+# 同一次观测到的 (目标, 稿件, 状态变化) 在该时间窗口内只通知一次（秒）
+NOTIFY_DEDUP_WINDOW = 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS instances (
+    instance_id TEXT PRIMARY KEY,
+    host TEXT,
+    pid INTEGER,
+    started_at REAL NOT NULL,
+    heartbeat_at REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS leases (
+    target TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    acquired_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS target_state (
+    target TEXT PRIMARY KEY,
+    last_status TEXT,
+    snapshot TEXT,
+    storage_state TEXT,
+    version INTEGER NOT NULL DEFAULT 0,
+    owner TEXT NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS notifications (
+    key TEXT PRIMARY KEY,
+    target TEXT NOT NULL,
+    manuscript TEXT,
+    old_status TEXT,
+    new_status TEXT,
+    owner TEXT NOT NULL,
+    at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def notification_key(target, manuscript, old_status, new_status, observation=None):
+    raw = "\x1f".join(str(part) for part in (target, manuscript, old_status, new_status, observation))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def rendezvous_owner(target, instance_ids):
+    """最高随机权重（rendezvous）哈希：实例增减时只有落在该实例上的目标会迁移"""
+    if not instance_ids:
+        return None
+    return max(instance_ids, key=lambda i: hashlib.sha1(f"{i}\x1f{target}".encode("utf-8")).digest())
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")) if value else None
+
+
+class SqliteLeaseBackend:
+    """
+    基于 SQLite 的共享租约库，依赖 SQLite 自身的文件锁，适用于同一台主机上的多个实例（多进程、多容器共用一个本地卷）。
+    NFS、SMB 等网络文件系统上的文件锁不可靠，跨主机部署应换用 Redis、etcd 等后端，实现同样的方法即可替换。
+    每次操作一个 IMMEDIATE 事务。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # 实例
+    # ------------------------------------------------------------------
+    def heartbeat(self, instance_id, now):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO instances (instance_id, host, pid, started_at, heartbeat_at) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(instance_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at",
+                (instance_id, socket.gethostname(), os.getpid(), now, now))
+            # 长时间没有心跳的实例记录与它遗留的租约一并清理
+            conn.execute("DELETE FROM instances WHERE heartbeat_at < ?", (now - 10 * INSTANCE_TTL,))
+            conn.execute("DELETE FROM leases WHERE expires_at < ?", (now,))
+
+    def live_instances(self, now):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT instance_id FROM instances WHERE heartbeat_at >= ? ORDER BY instance_id",
+                                (now - INSTANCE_TTL,)).fetchall()
+        return [row[0] for row in rows]
+
+    def leave(self, instance_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM leases WHERE owner = ?", (instance_id,))
+            conn.execute("DELETE FROM instances WHERE instance_id = ?", (instance_id,))
+
+    # ------------------------------------------------------------------
+    # 租约
+    # ------------------------------------------------------------------
+    def try_acquire(self, target, owner, ttl, now):
+        """无人持有、已过期或持有者已下线时获得租约；返回 (是否获得, 当前持有者)"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT l.owner, l.expires_at, i.heartbeat_at FROM leases l"
+                " LEFT JOIN instances i ON i.instance_id = l.owner WHERE l.target = ?", (target,)).fetchone()
+            if row and row[0] != owner and row[1] > now and (row[2] or 0) >= now - INSTANCE_TTL:
+                return False, row[0]
+            conn.execute(
+                "INSERT INTO leases (target, owner, acquired_at, expires_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(target) DO UPDATE SET owner = excluded.owner, acquired_at = excluded.acquired_at,"
+                " expires_at = excluded.expires_at",
+                (target, owner, now, now + ttl))
+        return True, owner
+
+    def release(self, target, owner):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM leases WHERE target = ? AND owner = ?", (target, owner))
+
+    # ------------------------------------------------------------------
+    # 目标状态（上次状态、逐稿件快照、会话），随租约在实例之间交接
+    # ------------------------------------------------------------------
+    def load_state(self, target):
+        with self._connect() as conn:
+            row = conn.execute("SELECT last_status, snapshot, storage_state, version FROM target_state WHERE target = ?",
+                               (target,)).fetchone()
+        if row is None:
+            return None
+        return {"last_status": row[0], "snapshot": json.loads(row[1]) if row[1] else None,
+                "storage_state": json.loads(row[2]) if row[2] else None, "version": row[3]}
+
+    def save_state(self, target, owner, last_status, snapshot, storage_state, version, changed, now):
+        """租约已被其他实例接管时不写入并返回 False，避免过期的检查结果覆盖新持有者的状态"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT owner FROM leases WHERE target = ?", (target,)).fetchone()
+            if row and row[0] != owner:
+                return False
+            conn.execute(
+                "INSERT INTO target_state (target, last_status, snapshot, storage_state, version, owner, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(target) DO UPDATE SET last_status = excluded.last_status, snapshot = excluded.snapshot,"
+                " storage_state = excluded.storage_state, owner = excluded.owner, updated_at = excluded.updated_at,"
+                " version = target_state.version + (CASE WHEN ? OR target_state.last_status IS NOT excluded.last_status"
+                " THEN 1 ELSE 0 END)",
+                (target, last_status, _dumps(snapshot), _dumps(storage_state), (version or 0) + 1, owner, now, changed))
+        return True
+
+    # ------------------------------------------------------------------
+    # 通知去重
+    # ------------------------------------------------------------------
+    def claim_notification(self, key, target, manuscript, old_status, new_status, owner, window, now):
+        """第一次（或去重窗口之外）认领这次状态变化时返回 True"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO notifications (key, target, manuscript, old_status, new_status, owner, at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, at = excluded.at WHERE notifications.at < ?",
+                (key, target, manuscript, old_status, new_status, owner, now, now - window))
+            conn.execute("DELETE FROM notifications WHERE at < ?", (now - 2 * window,))
+            return cursor.rowcount == 1
+
+    def forget_notification(self, key, owner):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM notifications WHERE key = ? AND owner = ?", (key, owner))
+
+
+class Coordinator:
+    """
+    多实例协调：各实例通过共享后端登记心跳，目标按存活实例做 rendezvous 哈希分片，
+    每个实例只检查分到自己的目标；检查前再取得该目标的租约，分片视图短暂不一致时也不会重复抓取。
+    实例下线（心跳超时）后，它的目标在下一次调度时由其余实例接管。
+    目标的上次状态、逐稿件快照与会话保存在共享库中，接管的实例与上一个持有者对比同一份快照。
+    同一次观测到的 (目标, 稿件, 状态变化) 的通知由第一个认领的实例发送，其余实例跳过。
+    """
+
+    def __init__(self, backend, instance_id=INSTANCE_ID, heartbeat_interval=HEARTBEAT_INTERVAL):
+        self.backend = backend
+        self.instance_id = instance_id
+        self.heartbeat_interval = heartbeat_interval
+        self._members = [instance_id]
+        self._stop = threading.Event()
+        self._thread = None
+        self.beat()
+
+    # ------------------------------------------------------------------
+    # 心跳与成员
+    # ------------------------------------------------------------------
+    def beat(self):
+        now = time.time()
+        try:
+            self.backend.heartbeat(self.instance_id, now)
+            members = self.backend.live_instances(now)
+        except sqlite3.Error as e:
+            print(f"  -> [协调] 心跳写入失败: {e}")
+            return
+        if members != self._members:
+            print(f"  -> [协调] 存活实例变化：{', '.join(members)}（本实例 {self.instance_id}）。")
+        self._members = members
+        metrics.set("coordination_live_instances", len(members), help="协调库中心跳正常的实例数")
+
+    def _run(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            self.beat()
+
+    def start(self):
+        """启动后台心跳线程（重复调用无副作用）"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="coordination-heartbeat", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止心跳并主动退出，其余实例立即接管本实例的目标"""
+        self._stop.set()
+        try:
+            self.backend.leave(self.instance_id)
+        except sqlite3.Error as e:
+            print(f"  -> [协调] 退出协调库失败: {e}")
+
+    # ------------------------------------------------------------------
+    # 分片与租约
+    # ------------------------------------------------------------------
+    def owns(self, target):
+        """按当前的存活实例视图，目标是否分给本实例"""
+        members = self._members if self.instance_id in self._members else self._members + [self.instance_id]
+        return rendezvous_owner(target, members) == self.instance_id
+
+    def shard(self, targets):
+        owned = [t for t in targets if self.owns(t.name)]
+        metrics.set("coordination_owned_targets", len(owned), help="分到本实例的目标数")
+        return owned
+
+    def acquire(self, target, ttl):
+        """目标分给本实例且租约可用时返回 True；ttl 应覆盖一次检查的最长时间"""
+        if not self.owns(target):
+            return False
+        try:
+            acquired, holder = self.backend.try_acquire(target, self.instance_id, ttl, time.time())
+        except sqlite3.Error as e:
+            print(f"  -> [协调] 获取 {target} 的租约失败: {e}")
+            return False
+        if not acquired:
+            print(f"  -> [协调] {target} 正由实例 {holder} 检查，本实例跳过。")
+            metrics.inc("coordination_lease_conflicts_total", help="租约被其他实例持有而跳过的检查次数", target=target)
+        return acquired
+
+    def release(self, target):
+        try:
+            self.backend.release(target, self.instance_id)
+        except sqlite3.Error as e:
+            print(f"  -> [协调] 释放 {target} 的租约失败: {e}")
+
+    # ------------------------------------------------------------------
+    # 共享的目标状态
+    # ------------------------------------------------------------------
+    def load_state(self, target):
+        """共享库中目标的状态；没有记录（尚未迁移）或读取失败时返回 None，调用方退回本机的历史库"""
+        try:
+            return self.backend.load_state(target)
+        except sqlite3.Error as e:
+            print(f"  -> [协调] 读取 {target} 的共享状态失败: {e}")
+            return None
+
+    def save_state(self, target, last_status, snapshot, storage_state, version=None, changed=False):
+        try:
+            saved = self.backend.save_state(target, self.instance_id, last_status, snapshot, storage_state, version,
+                                            bool(changed), time.time())
+        except sqlite3.Error as e:
+            print(f"  -> [协调] 保存 {target} 的共享状态失败: {e}")
+            return False
+        if not saved:
+            print(f"  -> [协调] {target} 的租约已由其他实例接管，本次结果不写入共享状态。")
+        return saved
+
+    # ------------------------------------------------------------------
+    # 通知去重（供 outbox 调用）
+    # ------------------------------------------------------------------
+    def claim_notification(self, target, manuscript, old_status, new_status, observation=None):
+        key = notification_key(target, manuscript, old_status, new_status, observation)
+        try:
+            claimed = self.backend.claim_notification(key, target, manuscript, old_status, new_status,
+                                                      self.instance_id, NOTIFY_DEDUP_WINDOW, time.time())
+        except sqlite3.Error as e:
+            # 协调库不可用时宁可重复通知，也不丢通知
+            print(f"  -> [协调] 通知去重失败（{e}），照常发送。")
+            return True
+        if not claimed:
+            metrics.inc("coordination_duplicate_notifications_total", help="已由其他实例通知而跳过的状态变化数")
+        return claimed
+
+    def forget_notification(self, target, manuscript, old_status, new_status, observation=None):
+        """入队失败时撤销认领，下一次检查可以重新通知"""
+        try:
+            self.backend.forget_notification(notification_key(target, manuscript, old_status, new_status, observation),
+                                             self.instance_id)
+        except sqlite3.Error as e:
+            print(f"  -> [协调] 撤销通知认领失败: {e}")
+
+
+_default_coordinator = None
+_default_lock = threading.Lock()
+
+
+def get_coordinator(path=None, instance_id=None):
+    """进程内共享的协调器；未配置共享库（参数或 COORD_DB）时返回 None。退出时自动注销本实例"""
+    global _default_coordinator
+    with _default_lock:
+        path = path or COORD_DB
+        if _default_coordinator is None and path:
+            _default_coordinator = Coordinator(SqliteLeaseBackend(path), instance_id=instance_id or INSTANCE_ID)
+            atexit.register(_default_coordinator.stop)
+        return _default_coordinator
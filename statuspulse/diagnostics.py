@@ -0,0 +1,198 @@
+import os
+import io
+import re
+import json
+import time
+import queue
+import atexit
+import zipfile
+import datetime
+import tempfile
+import threading
+from pathlib import Path
+
+from .metrics import metrics
+
+
+DIAG_DIR = os.getenv("DIAG_DIR", "diagnostics")
+# 诊断目录的总大小上限（MB）与最多保留的份数，超出后删除最旧的
+DIAG_MAX_MB = float(os.getenv("DIAG_MAX_MB", "50"))
+DIAG_MAX_FILES = int(os.getenv("DIAG_MAX_FILES", "100"))
+DIAG_JPEG_QUALITY = int(os.getenv("DIAG_JPEG_QUALITY", "60"))
+# 置为 1 时为每次尝试录制 Playwright trace（只含 DOM 快照，不含截图与源码），失败时一并保存
+DIAG_TRACE = os.getenv("DIAG_TRACE", "0") == "1"
+# 在检查线程中抓取截图/DOM 的超时（毫秒）；压缩、写盘与清理在后台线程完成
+CAPTURE_TIMEOUT = 5000
+# 后台待写入的诊断份数上限，写盘跟不上时丢弃新的诊断，不阻塞检查
+QUEUE_SIZE = 8
+# 单个 frame 的 DOM 最多保留的字符数
+MAX_DOM_CHARS = 2_000_000
+
+
+def _slug(text):
+    return re.sub(r"[^0-9A-Za-z_.-]+", "_", str(text or "")).strip("_")[:40] or "unknown"
+
+
+class Diagnostics:
+    """
+    失败现场的诊断信息：各 frame 的 DOM、视口 JPEG 截图，以及可选的 Playwright trace。
+    检查线程只做必要的 Playwright 调用（只能在创建它的线程中使用），
+    压缩打包、写入按时间命名的环形目录、按大小清理旧文件都交给后台线程，不拖慢重试。
+    """
+
+    def __init__(self, directory=DIAG_DIR, max_bytes=DIAG_MAX_MB * 1024 * 1024, max_files=DIAG_MAX_FILES,
+                 jpeg_quality=DIAG_JPEG_QUALITY, trace=DIAG_TRACE):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.jpeg_quality = jpeg_quality
+        self.trace = trace
+        self._traced_context = None
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 检查线程
+    # ------------------------------------------------------------------
+    def begin(self, context):
+        """每次尝试开始时调用：开启 trace 时为本次尝试开始新的 trace 分段，只保留失败的那一次"""
+        if not self.trace:
+            return
+        try:
+            if context is not self._traced_context:
+                context.tracing.start(snapshots=True, screenshots=False, sources=False)
+                self._traced_context = context
+            else:
+                context.tracing.stop_chunk()
+            context.tracing.start_chunk()
+        except Exception as e:
+            print(f"  -> [诊断] 开启 trace 失败: {e}")
+            self._traced_context = None
+
+    def capture(self, page, target, reason, error=None, attempt=None):
+        """抓取失败现场并交给后台线程保存，返回诊断文件路径（抓取失败或被丢弃时返回 None）"""
+        if page is None or page.is_closed():
+            return None
+        started = time.perf_counter()
+        captured_at = datetime.datetime.now()
+        artifacts = {}
+        meta = {
+            "target": target, "reason": reason, "attempt": attempt,
+            "captured_at": captured_at.isoformat(timespec="seconds"),
+            "error": f"{type(error).__name__}: {error}" if error else None,
+            "url": page.url, "frames": [],
+        }
+        try:
+            artifacts["viewport.jpg"] = page.screenshot(type="jpeg", quality=self.jpeg_quality, timeout=CAPTURE_TIMEOUT)
+        except Exception as e:
+            meta["screenshot_error"] = str(e).splitlines()[0] if str(e) else type(e).__name__
+        for index, frame in enumerate(page.frames):
+            info = {"index": index, "name": frame.name, "url": frame.url}
+            try:
+                dom = frame.content()
+                info["truncated"] = len(dom) > MAX_DOM_CHARS
+                artifacts[f"dom/{index:02d}-{_slug(frame.name or 'main')}.html"] = dom[:MAX_DOM_CHARS].encode("utf-8")
+            except Exception as e:
+                info["error"] = str(e).splitlines()[0] if str(e) else type(e).__name__
+            meta["frames"].append(info)
+        trace_path = None
+        if self.trace and self._traced_context is page.context:
+            try:
+                fd, trace_path = tempfile.mkstemp(suffix=".zip", prefix="trace-")
+                os.close(fd)
+                page.context.tracing.stop_chunk(path=trace_path)
+                page.context.tracing.start_chunk()
+            except Exception as e:
+                meta["trace_error"] = str(e).splitlines()[0] if str(e) else type(e).__name__
+                if trace_path:
+                    Path(trace_path).unlink(missing_ok=True)
+                trace_path = None
+        metrics.observe("diagnostics_capture_seconds", time.perf_counter() - started, help="检查线程中抓取诊断信息的耗时（秒）")
+
+        name = f"{captured_at:%Y%m%d-%H%M%S}-{captured_at.microsecond // 1000:03d}-{_slug(target)}-{_slug(reason)}.zip"
+        path = self.directory / name
+        try:
+            self._queue.put_nowait((path, meta, artifacts, trace_path))
+        except queue.Full:
+            print("  -> [诊断] 后台写入积压，丢弃本次诊断信息。")
+            metrics.inc("diagnostics_dropped_total", help="因写入积压被丢弃的诊断次数")
+            if trace_path:
+                Path(trace_path).unlink(missing_ok=True)
+            return None
+        self._ensure_worker()
+        print(f"  -> [诊断] 失败现场（视口截图 + {len(meta['frames'])} 个 frame 的 DOM"
+              f"{' + trace' if trace_path else ''}）将保存至 {path}")
+        return path
+
+    # ------------------------------------------------------------------
+    # 后台线程
+    # ------------------------------------------------------------------
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="diagnostics-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                self._write(*item)
+            except Exception as e:
+                print(f"  -> [诊断] 保存诊断信息失败: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, path, meta, artifacts, trace_path):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        buffer = io.BytesIO()
+        try:
+            with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+                archive.writestr("meta.json", json.dumps(meta, ensure_ascii=False, indent=2))
+                for name, data in artifacts.items():
+                    # JPEG 与 trace 本身已压缩，直接存储
+                    compress = zipfile.ZIP_STORED if name.endswith(".jpg") else zipfile.ZIP_DEFLATED
+                    archive.writestr(name, data, compress_type=compress)
+                if trace_path:
+                    archive.write(trace_path, "trace.zip", compress_type=zipfile.ZIP_STORED)
+        finally:
+            if trace_path:
+                Path(trace_path).unlink(missing_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(buffer.getvalue())
+        os.replace(tmp_path, path)
+        metrics.inc("diagnostics_captures_total", help="保存的诊断信息份数")
+        metrics.inc("diagnostics_bytes_total", buffer.tell(), help="保存的诊断信息字节数")
+        self.prune()
+
+    def prune(self):
+        """按文件名（即时间）从旧到新删除，直到份数与总大小都不超过上限"""
+        files = sorted(self.directory.glob("*.zip"))
+        sizes = {f: f.stat().st_size for f in files}
+        total = sum(sizes.values())
+        while files and (len(files) > self.max_files or total > self.max_bytes):
+            oldest = files.pop(0)
+            total -= sizes[oldest]
+            oldest.unlink(missing_ok=True)
+        metrics.set("diagnostics_dir_bytes", total, help="诊断目录当前大小（字节）")
+
+    def wait(self, timeout=10):
+        """等待后台写入完成（进程退出前调用）"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+
+_default_diagnostics = None
+_default_lock = threading.Lock()
+
+
+def get_diagnostics():
+    """进程内共享的诊断实例"""
+    global _default_diagnostics
+    with _default_lock:
+        if _default_diagnostics is None:
+            _default_diagnostics = Diagnostics()
+            atexit.register(_default_diagnostics.wait)
+        return _default_diagnostics
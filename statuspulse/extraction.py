@@ -0,0 +1,113 @@
+import re
+from dataclasses import dataclass, field
+
+from . import page_selectors as sel
+
+
+# 在页面内一次性收集主菜单与稿件表格，整个扫描只需一次 CDP 往返
+EXTRACT_JS = r"""
+(cfg) => {
+    const isVisible = (el) => !!el && !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length)
+        && getComputedStyle(el).visibility !== 'hidden';
+    const text = (el) => (el && el.textContent || '').trim();
+
+    const menu = [];
+    document.querySelectorAll(cfg.menuItem).forEach((item, index) => {
+        let countSpan = item.nextElementSibling;
+        while (countSpan && !(countSpan.tagName === 'SPAN' && countSpan.classList.contains(cfg.countClass))) {
+            countSpan = countSpan.nextElementSibling;
+        }
+        menu.push({
+            index: index,
+            label: text(item),
+            tag: item.tagName,
+            href: item.getAttribute('href'),
+            count_text: countSpan && isVisible(countSpan) ? countSpan.innerText : null,
+        });
+    });
+
+    const table = document.querySelector(cfg.table);
+    const headerRow = table ? Array.from(table.querySelectorAll('tr')).find(tr => tr.querySelector('th')) : null;
+    const headers = headerRow ? Array.from(headerRow.querySelectorAll('th')).map(text) : [];
+    const rows = Array.from(document.querySelectorAll(cfg.rows)).map(tr => ({
+        id: tr.id,
+        cells: Array.from(tr.querySelectorAll('td')).map(text),
+    }));
+    return {menu: menu, headers: headers, rows: rows, has_table: !!table};
+}
+"""
+
+
+@dataclass
+class MenuItem:
+    """主菜单中的一个文件夹"""
+    index: int
+    label: str
+    count: int
+    tag: str
+    href: str = None
+
+    @property
+    def clickable(self):
+        return self.tag == "A"
+
+
+@dataclass
+class PageSnapshot:
+    """一次提取得到的页面快照：主菜单条目 + 稿件表格"""
+    menu_items: list = field(default_factory=list)
+    headers: list = field(default_factory=list)
+    rows: list = field(default_factory=list)
+    has_table: bool = False
+
+    @property
+    def active_items(self):
+        """计数大于 0 的文件夹"""
+        return [item for item in self.menu_items if item.count > 0]
+
+    @property
+    def first_clickable(self):
+        return next((item for item in self.active_items if item.clickable), None)
+
+    @property
+    def first_row_status(self):
+        """row1 的状态列（与原先 tr#row1 td:nth(5) 的读取方式一致）"""
+        for row in self.rows:
+            if row["id"] == "row1" and len(row["cells"]) > sel.STATUS_COLUMN_INDEX:
+                return row["cells"][sel.STATUS_COLUMN_INDEX]
+        return None
+
+    def aggregated_status(self):
+        return ", ".join(f"{item.label} ({item.count})" for item in self.active_items)
+
+
+def _parse_count(count_text):
+    if not count_text:
+        return 0
+    match = re.search(r'\((\d+)\)', count_text)
+    return int(match.group(1)) if match else 0
+
+
+def build_snapshot(raw):
+    """把页面脚本返回的原始数据转换为 PageSnapshot"""
+    items = [
+        MenuItem(index=m["index"], label=m["label"], count=_parse_count(m["count_text"]), tag=m["tag"], href=m["href"])
+        for m in raw.get("menu", [])
+    ]
+    return PageSnapshot(menu_items=items, headers=raw.get("headers", []), rows=raw.get("rows", []),
+                        has_table=raw.get("has_table", False))
+
+
+def extract_snapshot(frame):
+    """同步API：一次 evaluate 取回整个菜单与表格"""
+    return build_snapshot(frame.evaluate(EXTRACT_JS, sel.extraction_config()))
+
+
+async def extract_snapshot_async(frame):
+    """异步API版本"""
+    return build_snapshot(await frame.evaluate(EXTRACT_JS, sel.extraction_config()))
+
+
+def menu_item_locator(frame, item):
+    """按快照中的序号重新定位菜单条目（仅在需要点击时才用到）"""
+    return frame.locator(sel.MENU_ITEM).nth(item.index)
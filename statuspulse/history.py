@@ -0,0 +1,307 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import datetime
+import threading
+from contextlib import contextmanager
+
+from . import status_diff
+
+
+HISTORY_DB = os.getenv("HISTORY_DB", "history.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    target TEXT NOT NULL,
+    checked_at REAL NOT NULL,
+    status TEXT,
+    manuscripts INTEGER NOT NULL DEFAULT 0,
+    changes INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_checks_target ON checks(target, checked_at);
+
+CREATE TABLE IF NOT EXISTS transitions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    target TEXT NOT NULL,
+    manuscript TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    old_status TEXT,
+    new_status TEXT,
+    at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transitions_manuscript ON transitions(target, manuscript, at);
+CREATE INDEX IF NOT EXISTS idx_transitions_at ON transitions(at);
+
+CREATE TABLE IF NOT EXISTS manuscripts (
+    target TEXT NOT NULL,
+    manuscript TEXT NOT NULL,
+    title TEXT,
+    status TEXT,
+    since REAL NOT NULL,
+    PRIMARY KEY (target, manuscript)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS targets (
+    target TEXT PRIMARY KEY,
+    last_status TEXT,
+    snapshot TEXT,
+    checked_at REAL,
+    checks INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+"""
+
+
+def format_time(ts):
+    return datetime.datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S") if ts else "-"
+
+
+def parse_time(text):
+    """命令行时间参数：YYYY-MM-DD 或 YYYY-MM-DD HH:MM"""
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.datetime.strptime(text, fmt).timestamp()
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"无法识别的时间：{text}")
+
+
+class HistoryStore:
+    """
+    状态历史库（SQLite，只追加）。
+    checks 记录每一次检查，transitions 记录每一次稿件/文件夹状态变化；
+    targets、manuscripts 两张表按主键保存最新状态，读取“当前状态”无需扫描历史。
+    每次检查的写入量为常数（一行 checks + 一行 targets），只有发生变化的稿件才额外写入。
+    targets.version 在记录到状态变化时加一，作为“从哪个状态出发观测到的变化”的标识，供通知去重使用。
+    """
+
+    def __init__(self, path=HISTORY_DB):
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(targets)")]
+            if "version" not in columns:
+                conn.execute("ALTER TABLE targets ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+    @contextmanager
+    def _connect(self):
+        """短连接：每次操作一个事务，结束后提交并关闭（可跨线程使用）"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+    def record_check(self, target, status, snapshot=None, changes=(), baseline=False):
+        """
+        记录一次检查。changes 为 status_diff.Change 列表；
+        baseline=True 表示首次建立快照，此时把快照中的全部稿件写入最新状态表。
+        """
+        now = time.time()
+        manuscripts = (snapshot or {}).get("manuscripts") or {}
+        try:
+            with self._connect() as conn:
+                conn.execute("INSERT INTO checks (target, checked_at, status, manuscripts, changes) VALUES (?, ?, ?, ?, ?)",
+                             (target, now, status, len(manuscripts), len(changes)))
+                conn.execute(
+                    "INSERT INTO targets (target, last_status, snapshot, checked_at, checks) VALUES (?, ?, ?, ?, 1)"
+                    " ON CONFLICT(target) DO UPDATE SET"
+                    " version = version + (CASE WHEN ? OR last_status IS NOT excluded.last_status THEN 1 ELSE 0 END),"
+                    " last_status = excluded.last_status,"
+                    " snapshot = excluded.snapshot, checked_at = excluded.checked_at, checks = checks + 1",
+                    (target, status, json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")) if snapshot else None, now,
+                     bool(changes)))
+                if baseline:
+                    # 首次看到的稿件记为一条 baseline 变化，停留时长从此刻开始计算
+                    changes = list(changes) + [status_diff.Change(key, None, entry.get("status"), "baseline")
+                                               for key, entry in manuscripts.items()]
+                for change in changes:
+                    conn.execute(
+                        "INSERT INTO transitions (target, manuscript, kind, old_status, new_status, at) VALUES (?, ?, ?, ?, ?, ?)",
+                        (target, change.key, change.kind, change.old, change.new, now))
+                    if change.kind == "folder":
+                        continue
+                    title = (manuscripts.get(change.key) or {}).get("title")
+                    conn.execute(
+                        "INSERT INTO manuscripts (target, manuscript, title, status, since) VALUES (?, ?, ?, ?, ?)"
+                        " ON CONFLICT(target, manuscript) DO UPDATE SET status = excluded.status, since = excluded.since,"
+                        " title = COALESCE(excluded.title, title)",
+                        (target, change.key, title, change.new, now))
+        except sqlite3.Error as e:
+            print(f"  -> [错误] 写入状态历史 {self.path} 失败: {e}")
+            return False
+        return True
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    def load_target(self, target):
+        """目标的最新状态、快照与状态版本（按主键读取），没有记录时返回 None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT last_status, snapshot, checked_at, version FROM targets WHERE target = ?",
+                               (target,)).fetchone()
+        if row is None:
+            return None
+        return {"last_status": row[0], "snapshot": json.loads(row[1]) if row[1] else None, "checked_at": row[2],
+                "version": row[3]}
+
+    def latest(self, target=None):
+        """每篇稿件的最新状态及进入该状态的时间"""
+        sql = "SELECT target, manuscript, title, status, since FROM manuscripts"
+        args = ()
+        if target:
+            sql, args = sql + " WHERE target = ?", (target,)
+        with self._connect() as conn:
+            rows = conn.execute(sql + " ORDER BY target, since DESC", args).fetchall()
+        return [dict(zip(("target", "manuscript", "title", "status", "since"), row)) for row in rows]
+
+    def transitions(self, target=None, manuscript=None, since=None, until=None, limit=None):
+        """时间范围内的状态变化，按时间先后排列"""
+        clauses, args = [], []
+        for column, op, value in (("target", "=", target), ("manuscript", "=", manuscript),
+                                  ("at", ">=", since), ("at", "<", until)):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                args.append(value)
+        sql = "SELECT target, manuscript, kind, old_status, new_status, at FROM transitions"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY at, id"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._connect() as conn:
+            rows = conn.execute(sql, args).fetchall()
+        return [dict(zip(("target", "manuscript", "kind", "old_status", "new_status", "at"), row)) for row in rows]
+
+    def time_in_states(self, target, manuscript, now=None):
+        """某篇稿件在各状态停留的时长（秒）；最后一个状态计算到当前时间，开始监控前的停留时间无从得知"""
+        now = now or time.time()
+        rows = [t for t in self.transitions(target=target, manuscript=manuscript) if t["kind"] != "folder"]
+        durations = {}
+        for current, following in zip(rows, rows[1:] + [None]):
+            status = current["new_status"]
+            if status == status_diff.NOT_LISTED:
+                continue
+            end = following["at"] if following else now
+            durations[status] = durations.get(status, 0.0) + max(0.0, end - current["at"])
+        return durations
+
+    def dwell_samples(self, since=None):
+        """
+        所有已结束的停留时长 {状态: [秒, ...]}：同一稿件相邻两次变化之间的时间。
+        仍停留在当前状态的（尚未结束）不计入。
+        """
+        sql = ("SELECT new_status, next_at - at FROM ("
+               " SELECT new_status, at, LEAD(at) OVER (PARTITION BY target, manuscript ORDER BY at, id) AS next_at"
+               " FROM transitions WHERE kind != 'folder'"
+               + (" AND at >= ?" if since else "") +
+               ") WHERE next_at IS NOT NULL")
+        with self._connect() as conn:
+            rows = conn.execute(sql, (since,) if since else ()).fetchall()
+        samples = {}
+        for status, seconds in rows:
+            if status and status != status_diff.NOT_LISTED:
+                samples.setdefault(status, []).append(seconds)
+        return samples
+
+    def count_checks(self, targets, since):
+        """若干目标自 since 以来的检查次数（用于按站点统计每日请求预算）"""
+        targets = list(targets)
+        if not targets:
+            return 0
+        placeholders = ", ".join("?" for _ in targets)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM checks WHERE target IN ({placeholders}) AND checked_at >= ?",
+                                (*targets, since)).fetchone()[0]
+
+    def checks(self, target=None, since=None, limit=20):
+        clauses, args = [], []
+        if target:
+            clauses.append("target = ?")
+            args.append(target)
+        if since:
+            clauses.append("checked_at >= ?")
+            args.append(since)
+        sql = "SELECT target, checked_at, status, manuscripts, changes FROM checks"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY checked_at DESC LIMIT {int(limit)}"
+        with self._connect() as conn:
+            rows = conn.execute(sql, args).fetchall()
+        return [dict(zip(("target", "checked_at", "status", "manuscripts", "changes"), row)) for row in rows]
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_history():
+    """进程内共享的历史库实例"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = HistoryStore()
+        return _default_store
+
+
+def _format_duration(seconds):
+    days, rest = divmod(int(seconds), 86400)
+    hours, rest = divmod(rest, 3600)
+    return f"{days}天{hours}小时{rest // 60}分" if days else f"{hours}小时{rest // 60}分"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="查询稿件状态历史")
+    parser.add_argument("--db", default=HISTORY_DB, help="历史库路径")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_latest = sub.add_parser("latest", help="每篇稿件的最新状态")
+    p_latest.add_argument("--target")
+
+    p_trans = sub.add_parser("transitions", help="时间范围内的状态变化")
+    p_trans.add_argument("--target")
+    p_trans.add_argument("--manuscript")
+    p_trans.add_argument("--since", type=parse_time, help="起始时间，如 2024-05-01")
+    p_trans.add_argument("--until", type=parse_time, help="截止时间（不含）")
+
+    p_dwell = sub.add_parser("dwell", help="某篇稿件在各状态停留的时长")
+    p_dwell.add_argument("manuscript")
+    p_dwell.add_argument("--target", default="default")
+
+    p_checks = sub.add_parser("checks", help="最近的检查记录")
+    p_checks.add_argument("--target")
+    p_checks.add_argument("--limit", type=int, default=20)
+
+    args = parser.parse_args(argv)
+    store = HistoryStore(args.db)
+
+    if args.command == "latest":
+        for row in store.latest(args.target):
+            print(f"{row['target']}\t{row['manuscript']}\t{row['status']}\t自 {format_time(row['since'])}\t{row['title'] or ''}")
+    elif args.command == "transitions":
+        for row in store.transitions(args.target, args.manuscript, args.since, args.until):
+            print(f"{format_time(row['at'])}\t{row['target']}\t[{row['manuscript']}] {row['old_status'] or '(开始监控)'} -> {row['new_status']}")
+    elif args.command == "dwell":
+        durations = store.time_in_states(args.target, args.manuscript)
+        if not durations:
+            print(f"没有稿件 {args.manuscript} 的历史记录。")
+        for status, seconds in sorted(durations.items(), key=lambda item: -item[1]):
+            print(f"{status}\t{_format_duration(seconds)}")
+    elif args.command == "checks":
+        for row in store.checks(args.target, limit=args.limit):
+            print(f"{format_time(row['checked_at'])}\t{row['target']}\t{row['status']}\t稿件 {row['manuscripts']}，变化 {row['changes']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
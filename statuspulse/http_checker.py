@@ -0,0 +1,232 @@
+import time
+import requests
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from . import extraction
+from . import page_selectors as sel
+from . import status_diff
+from . import menu_fingerprint
+from .browser_manager import DEFAULT_USER_AGENT
+
+
+REQUEST_TIMEOUT = 15
+
+
+class LoginRequired(Exception):
+    """HTTP 快速通道检测到登录页（会话已过期），需要回退到浏览器流程"""
+
+
+class PageStructureError(Exception):
+    """页面结构与预期不符（例如找不到 iframe 或状态表格），需要回退到浏览器流程"""
+
+
+_sessions = {}
+
+
+def get_session(key="default"):
+    """按 key（每个监控目标一个）缓存的 requests.Session，带连接池与 Keep-Alive"""
+    session = _sessions.get(key)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=1)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"User-Agent": DEFAULT_USER_AGENT})
+        _sessions[key] = session
+    return session
+
+
+def load_cookies(session, storage_state):
+    """把 Playwright 的 storage_state 中的 cookies 装入 requests 会话"""
+    session.cookies.clear()
+    for cookie in (storage_state or {}).get("cookies", []):
+        expires = cookie.get("expires")
+        session.cookies.set(
+            cookie["name"], cookie["value"],
+            domain=cookie.get("domain", ""), path=cookie.get("path", "/"),
+            secure=cookie.get("secure", False),
+            expires=int(expires) if expires and expires > 0 else None,
+        )
+
+
+def export_storage_state(session, storage_state):
+    """把服务器在本次请求中刷新的 cookies 合并回 storage_state（保持 Playwright 格式）"""
+    storage_state = dict(storage_state or {})
+    cookies = {(c["name"], c.get("domain"), c.get("path")): dict(c) for c in storage_state.get("cookies", [])}
+    for jar_cookie in session.cookies:
+        key = (jar_cookie.name, jar_cookie.domain, jar_cookie.path)
+        entry = cookies.get(key) or {
+            "name": jar_cookie.name, "domain": jar_cookie.domain, "path": jar_cookie.path,
+            "httpOnly": False, "secure": bool(jar_cookie.secure), "sameSite": "Lax",
+        }
+        entry["value"] = jar_cookie.value
+        entry["expires"] = jar_cookie.expires if jar_cookie.expires else -1
+        cookies[key] = entry
+    storage_state["cookies"] = list(cookies.values())
+    storage_state.setdefault("origins", [])
+    return storage_state
+
+
+def fetch_document(session, url):
+    """GET 一个页面并解析为 BeautifulSoup 文档，返回 (最终URL, 文档)"""
+    response = session.get(url, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.url, BeautifulSoup(response.text, "html5lib")
+
+
+def is_login_page(soup):
+    """页面中出现登录框架或用户名/密码输入框即视为登录页"""
+    return any(soup.select_one(marker) for marker in sel.LOGIN_MARKERS)
+
+
+def follow_iframe(session, base_url, soup, selector):
+    """解析 iframe 的 src 并直接请求其文档，省去浏览器渲染"""
+    iframe = soup.select_one(selector)
+    if iframe is None:
+        if is_login_page(soup):
+            raise LoginRequired(f"未找到 {selector}，页面为登录页")
+        raise PageStructureError(f"页面中未找到 {selector}")
+    src = iframe.get("src")
+    if not src or src.startswith("javascript:") or src == "about:blank":
+        raise PageStructureError(f"{selector} 没有可直接请求的 src")
+    return fetch_document(session, urljoin(base_url, src))
+
+
+def load_content_frame(session, target_url):
+    """依次请求 入口页 -> iframe#content -> iframe[name="content"]，返回核心内容框架的 (URL, 文档)"""
+    url, soup = fetch_document(session, target_url)
+    url, soup = follow_iframe(session, url, soup, sel.MAIN_APP_IFRAME)
+    if soup.select_one(sel.LOGIN_IFRAME) and not soup.select_one(sel.CONTENT_IFRAME):
+        raise LoginRequired("主应用框架中只有登录框架")
+    url, soup = follow_iframe(session, url, soup, sel.CONTENT_IFRAME)
+    if is_login_page(soup):
+        raise LoginRequired("核心内容框架显示为登录页")
+    return url, soup
+
+
+def touch_session(target_url, storage_state, session_key="keepalive"):
+    """
+    保活：用已保存的Cookies请求一次核心内容框架，让服务器刷新会话的空闲计时。
+    返回更新后的 storage_state；会话已失效时抛出 LoginRequired。
+    """
+    if not storage_state or not storage_state.get("cookies"):
+        raise LoginRequired("没有已保存的会话Cookies")
+    session = get_session(session_key)
+    load_cookies(session, storage_state)
+    load_content_frame(session, target_url)
+    return export_storage_state(session, storage_state)
+
+
+def page_snapshot_from_soup(soup):
+    """
+    用 BeautifulSoup 生成与浏览器端 extraction.EXTRACT_JS 相同结构的数据，再转换为 PageSnapshot。
+    静态HTML无法判断CSS可见性，计数 span 一律视为可见。
+    """
+    menu = []
+    for index, item in enumerate(soup.select(sel.MENU_ITEM)):
+        count_span = item.find_next_sibling("span", class_=sel.MENU_COUNT_CLASS)
+        menu.append({
+            "index": index,
+            "label": item.get_text().strip(),
+            "tag": item.name.upper(),
+            "href": item.get("href"),
+            "count_text": count_span.get_text() if count_span else None,
+        })
+    table = soup.select_one(sel.DATATABLE)
+    header_row = next((tr for tr in table.find_all("tr") if tr.find("th")), None) if table else None
+    headers = [th.get_text().strip() for th in header_row.find_all("th")] if header_row else []
+    rows = [
+        {"id": tr.get("id"), "cells": [td.get_text().strip() for td in tr.find_all("td")]}
+        for tr in soup.select(sel.DATATABLE_ROWS)
+    ]
+    return extraction.build_snapshot({"menu": menu, "headers": headers, "rows": rows, "has_table": table is not None})
+
+
+def find_link_by_text(soup, text):
+    """按链接文字查找 <a>，返回其 href"""
+    for link in soup.find_all("a"):
+        if link.get_text().strip() == text and link.get("href"):
+            return link["href"]
+    return None
+
+
+def fetch_detail_page(session, base_url, href):
+    """请求详情页并解析稿件表格；href 不可直接请求或页面中没有表格时抛出 PageStructureError"""
+    if not href or href.startswith("javascript:") or href == "#":
+        raise PageStructureError(f"详情链接 '{href}' 无法直接请求")
+    _, detail_soup = fetch_document(session, urljoin(base_url, href))
+    if is_login_page(detail_soup):
+        raise LoginRequired("详情页跳转到了登录页")
+    detail_page = page_snapshot_from_soup(detail_soup)
+    if not detail_page.has_table:
+        raise PageStructureError("详情页中未找到状态表格")
+    return detail_page
+
+
+def check_menu_status(target_url, storage_state, session_key="default", previous_snapshot=None):
+    """
+    main.py 流程的无浏览器版本：主菜单扫描 / 详情页直达。
+    传入上次的快照时，菜单指纹未变化则不再请求详情页（此时 current_status 为 None，表示沿用上次状态）。
+    返回 (current_status, 更新后的storage_state, 完整状态快照)；会话失效时抛出 LoginRequired。
+    """
+    if not storage_state or not storage_state.get("cookies"):
+        raise LoginRequired("没有已保存的会话Cookies")
+    started = time.perf_counter()
+    session = get_session(session_key)
+    load_cookies(session, storage_state)
+    base_url, soup = load_content_frame(session, target_url)
+
+    page = page_snapshot_from_soup(soup)
+    menu_page, detail_page, fingerprint = None, None, None
+    if page.has_table:
+        detail_page = page
+        current_status = page.first_row_status or ""
+    else:
+        if not page.menu_items:
+            raise PageStructureError("既不是主菜单页也不是详情页")
+        menu_page = page
+        fingerprint = menu_fingerprint.menu_fingerprint(page)
+        if not page.active_items:
+            current_status = "无在处理的投稿"
+        else:
+            first_href = next((item.href for item in page.active_items if item.href), None)
+            if first_href and menu_fingerprint.can_skip_detail(previous_snapshot, fingerprint):
+                status_snapshot = menu_fingerprint.reuse_snapshot(previous_snapshot, page, fingerprint)
+                menu_fingerprint.report(status_snapshot, skipped=True)
+                print(f"  -> [HTTP快速通道] 无需浏览器完成检查，耗时 {time.perf_counter() - started:.2f} 秒。")
+                return None, export_storage_state(session, storage_state), status_snapshot
+            if first_href:
+                detail_page = fetch_detail_page(session, base_url, first_href)
+                current_status = detail_page.first_row_status or ""
+            else:
+                current_status = page.aggregated_status()
+
+    print(f"  -> [HTTP快速通道] 无需浏览器完成检查，耗时 {time.perf_counter() - started:.2f} 秒。")
+    status_snapshot = menu_fingerprint.record_full_check(
+        status_diff.build_status_snapshot(detail_page, menu_page), previous_snapshot, fingerprint)
+    menu_fingerprint.report(status_snapshot, skipped=False)
+    return current_status, export_storage_state(session, storage_state), status_snapshot
+
+
+def check_submissions_status(target_url, storage_state, session_key="default"):
+    """
+    login.py 流程的无浏览器版本：'Submissions Being Processed' 列表。
+    返回 (首行状态, 更新后的storage_state, 完整状态快照)；会话失效时抛出 LoginRequired。
+    """
+    if not storage_state or not storage_state.get("cookies"):
+        raise LoginRequired("没有已保存的会话Cookies")
+    started = time.perf_counter()
+    session = get_session(session_key)
+    load_cookies(session, storage_state)
+    base_url, soup = load_content_frame(session, target_url)
+
+    href = find_link_by_text(soup, sel.SUBMISSIONS_LINK_TEXT)
+    if href is None:
+        raise PageStructureError("未找到 'Submissions Being Processed' 链接")
+    detail_page = fetch_detail_page(session, base_url, href)
+    current_status = detail_page.first_row_status or "无在处理的投稿"
+
+    print(f"  -> [HTTP快速通道] 无需浏览器完成检查，耗时 {time.perf_counter() - started:.2f} 秒。")
+    return current_status, export_storage_state(session, storage_state), status_diff.build_status_snapshot(detail_page)
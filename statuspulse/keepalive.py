@@ -0,0 +1,142 @@
+import os
+import time
+import threading
+import requests
+
+from . import http_checker
+from .session_store import SessionStore
+
+
+KEEPALIVE_FILE = os.getenv("KEEPALIVE_FILE", "keepalive.json")
+# 尚未观察到会话过期时假定的空闲超时（分钟）
+DEFAULT_IDLE_TIMEOUT_MINUTES = float(os.getenv("SESSION_IDLE_TIMEOUT_MINUTES", "30"))
+# 在估计的空闲超时的这一比例处提前保活
+REFRESH_FRACTION = 0.5
+MIN_TOUCH_INTERVAL = 5 * 60
+MAX_TOUCH_INTERVAL = 60 * 60
+# 最多保留的会话过期观测数
+MAX_EXPIRY_SAMPLES = 20
+
+
+class SessionKeeper:
+    """
+    会话保活。在两次定时检查之间用一次轻量的HTTP请求访问核心内容框架，刷新 EMSessionID 的空闲计时，
+    避免下一次检查落入逐字输入的人类速度登录流程。
+    - 记录每次观察到的会话过期（距上次有效使用多久、会话已存活多久），据此估计空闲超时并提前保活；
+    - 保活发现已跳转到登录页时把会话标记为失效（stale），下一次检查跳过HTTP快速通道与页面识别，直接登录；
+    - relogins_avoided：距上次检查的时间已超过估计的空闲超时、但因中间保活过而无需重新登录的次数。
+    """
+
+    def __init__(self, name, target_url, session_store, state_path=KEEPALIVE_FILE):
+        self.name = name
+        self.target_url = target_url
+        self.session_store = session_store
+        self._store = SessionStore(state_path)
+        self._lock = threading.Lock()
+        self.state = self._store.load() or {}
+        self.state.setdefault("stale", False)
+        self.state.setdefault("expiries", [])
+        for counter in ("touches", "touch_failures", "stale_detected", "logins", "relogins_avoided"):
+            self.state.setdefault(counter, 0)
+
+    def _persist(self):
+        try:
+            self._store.save(self.state)
+        except OSError as e:
+            print(f"  -> [错误] 保存保活状态到 {self._store.path} 失败: {e}")
+
+    # ------------------------------------------------------------------
+    # 会话寿命估计
+    # ------------------------------------------------------------------
+    def estimated_idle_timeout(self):
+        """观察到的最短“失效前空闲时长”（会话在这段时间内某一刻过期），没有观测时使用默认值"""
+        idle_gaps = [e["idle"] for e in self.state["expiries"] if e.get("idle")]
+        return min(idle_gaps) if idle_gaps else DEFAULT_IDLE_TIMEOUT_MINUTES * 60
+
+    def next_touch_interval(self):
+        """下一次保活前等待的秒数：在估计的空闲超时之前留出余量"""
+        interval = self.estimated_idle_timeout() * REFRESH_FRACTION
+        return min(max(interval, MIN_TOUCH_INTERVAL), MAX_TOUCH_INTERVAL)
+
+    def is_stale(self):
+        return self.state["stale"]
+
+    # ------------------------------------------------------------------
+    # 事件
+    # ------------------------------------------------------------------
+    def session_started(self):
+        """刚完成一次登录"""
+        now = time.time()
+        with self._lock:
+            self.state.update(stale=False, session_started_at=now, last_valid_at=now, last_check_at=now)
+            self.state["logins"] += 1
+            self._persist()
+
+    def mark_valid(self, source="check"):
+        """会话被确认有效（检查无需登录，或保活成功）"""
+        now = time.time()
+        with self._lock:
+            if source == "check":
+                last_check = self.state.get("last_check_at")
+                touched_since = (self.state.get("last_touch_at") or 0) > (last_check or 0)
+                if last_check and touched_since and now - last_check > self.estimated_idle_timeout():
+                    self.state["relogins_avoided"] += 1
+                    print(f"  -> [会话保活] 距上次检查 {(now - last_check) / 60:.0f} 分钟，超过估计的空闲超时，"
+                          f"但会话仍有效（累计避免 {self.state['relogins_avoided']} 次重新登录）。")
+                self.state["last_check_at"] = now
+            else:
+                self.state["last_touch_at"] = now
+            self.state.update(stale=False, last_valid_at=now)
+            self.state.setdefault("session_started_at", now)
+            self._persist()
+
+    def mark_stale(self, reason):
+        """会话已失效：记录一次过期观测，下一次检查直接登录"""
+        now = time.time()
+        with self._lock:
+            if self.state["stale"]:
+                return
+            last_valid = self.state.get("last_valid_at")
+            if last_valid:
+                started = self.state.get("session_started_at") or last_valid
+                self.state["expiries"].append({"at": now, "idle": round(now - last_valid), "age": round(now - started)})
+                del self.state["expiries"][:-MAX_EXPIRY_SAMPLES]
+            self.state["stale"] = True
+            self.state["stale_detected"] += 1
+            self._persist()
+        print(f"  -> [会话保活] 会话已失效（{reason}），下一次检查将直接登录。")
+
+    # ------------------------------------------------------------------
+    # 保活任务
+    # ------------------------------------------------------------------
+    def touch(self):
+        """调度器中的保活任务"""
+        if self.is_stale():
+            return
+        saved = self.session_store.load()
+        storage_state = (saved or {}).get("storage_state")
+        if not storage_state:
+            return
+        try:
+            refreshed = http_checker.touch_session(self.target_url, storage_state)
+        except http_checker.LoginRequired as e:
+            self.mark_stale(f"保活请求被重定向到登录页：{e}")
+            return
+        except (http_checker.PageStructureError, requests.RequestException) as e:
+            with self._lock:
+                self.state["touch_failures"] += 1
+            print(f"  -> [会话保活] 保活请求失败（{type(e).__name__}: {e}），等待下次保活。")
+            return
+        with self._lock:
+            self.state["touches"] += 1
+        self.mark_valid(source="keepalive")
+        # 保活请求期间检查任务可能已重新登录并保存了新Cookies，此时丢弃保活刷新的旧会话
+        if not self.session_store.replace({"storage_state": refreshed}, saved):
+            print("  -> [会话保活] 会话在保活期间已被检查任务更新，不覆盖。")
+        self.report()
+
+    def report(self):
+        s = self.state
+        print(f"  -> [会话保活] {self.name}：保活 {s['touches']} 次（失败 {s['touch_failures']}），"
+              f"发现失效 {s['stale_detected']} 次，登录 {s['logins']} 次，避免重新登录 {s['relogins_avoided']} 次；"
+              f"估计空闲超时 {self.estimated_idle_timeout() / 60:.0f} 分钟。")
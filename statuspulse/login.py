@@ -0,0 +1,405 @@
+import os
+import time
+import requests
+import random
+import datetime
+import sqlite3
+from pathlib import Path
+from playwright.sync_api import TimeoutError, Error as PlaywrightError
+from dotenv import load_dotenv
+from .browser_manager import BrowserManager
+from .browser_profile import profile_for
+from .resource_policy import ResourcePolicy
+from . import http_checker
+from . import extraction
+from . import page_state
+from . import status_diff
+from . import page_selectors as sel
+from .outbox import get_outbox
+from .diagnostics import get_diagnostics
+from .history import get_history
+from .session_store import SessionStore
+from .scheduler import Scheduler
+from .adaptive import AdaptivePoller
+from .keepalive import SessionKeeper
+from .metrics import metrics
+from .check_watchdog import CheckWatchdog, reap_zombies
+from . import retry
+from . import proc_stats
+
+
+load_dotenv()
+
+journal_username = os.getenv("JOURNAL_USERNAME")
+journal_password = os.getenv("JOURNAL_PASSWORD")
+target_url = os.getenv("TARGET_URL")
+
+
+# 会话Cookies单独保存在 JSON 文件中；状态、快照与历史保存在 history.db
+STATUS_FILE = Path("journal_data.json")
+TARGET_NAME = "default"
+# 原子写入、内容未变化时跳过写入，并保留一份完好的备份
+session_store = SessionStore(STATUS_FILE)
+# 两次检查之间保持会话活跃；发现会话失效时，下一次检查直接登录
+keeper = SessionKeeper(TARGET_NAME, target_url, session_store)
+MAX_RETRIES = 3
+# 重试退避的基数（秒），按失败类型做指数退避（见 retry.py）
+RETRY_BACKOFF_SECONDS = 30
+# 页面状态识别的最长等待时间（毫秒）
+STATE_DETECT_TIMEOUT = 12000
+# 会话有效时直接用HTTP请求获取状态，只有检测到登录页时才启动浏览器（设为 0 可关闭）
+HTTP_FAST_PATH = os.getenv("HTTP_FAST_PATH", "1") != "0"
+# 调度：每 CHECK_INTERVAL_MINUTES 分钟在第 CHECK_AT_MINUTE 分钟检查一次，开始前随机偏移 CHECK_JITTER 秒；
+# 静默时段（模拟睡觉）内不检查；单次检查超过 CHECK_TIMEOUT 秒视为超时
+CHECK_INTERVAL_MINUTES = int(os.getenv("CHECK_INTERVAL_MINUTES", "60"))
+CHECK_AT_MINUTE = 54
+CHECK_JITTER = (1, 15)
+QUIET_HOURS = (2, 6)
+CHECK_TIMEOUT = 15 * 60
+# 自适应轮询：根据历史停留时长决定检查间隔（上下限与每日预算见 adaptive.py），设为 0 则固定在第 CHECK_AT_MINUTE 分钟检查
+ADAPTIVE_POLLING = os.getenv("ADAPTIVE_POLLING", "1") != "0"
+
+# 进程内长驻的浏览器，跨调度周期复用，避免每次检查都冷启动 Chromium；BROWSER_PROFILE=1 时使用持久化配置目录保留HTTP缓存
+browser_manager = BrowserManager(headless=True, profile=profile_for(TARGET_NAME))
+# 拦截图片/字体/统计脚本等与状态无关的资源；最后一次重试时全部放行，便于截图排查
+resource_policy = ResourcePolicy.from_env()
+# 检查超过 CHECK_TIMEOUT 时由看门狗结束浏览器进程树，检查线程随之退出
+watchdog = CheckWatchdog(TARGET_NAME, browser_manager)
+# 站点连续失败（网络不通、导航超时、维护页）后熔断一段时间，期间跳过检查
+breaker = retry.get_breaker(target_url or "default")
+# 状态变化先写入持久化发件箱，由后台线程发送，失败自动重试
+outbox = get_outbox()
+# 失败现场（DOM + 视口截图）压缩后写入大小受限的诊断目录，写盘在后台线程完成
+diagnostics = get_diagnostics()
+# 每次检查与每次稿件状态变化都追加记录到历史库
+history = get_history()
+
+
+def type_like_human(locator, text_to_type):
+    """模拟真人逐字输入，并带有随机间隔"""
+    locator.hover()
+    time.sleep(random.uniform(0.5, 1.0))
+    for char in text_to_type:
+        locator.press(char)
+        time.sleep(random.uniform(0.08, 0.25))
+ 
+def load_session():
+    """读取会话Cookies（主文件损坏时自动使用备份）；旧版文件中的状态与快照一次性迁移到历史库"""
+    data = session_store.load()
+    if data is None:
+        return None
+    if "last_status" in data and history.load_target(TARGET_NAME) is None:
+        print(f"  -> [信息] 将 {STATUS_FILE} 中的上次状态迁移到历史库 {history.path}。")
+        history.record_check(TARGET_NAME, data["last_status"], data.get("snapshot"), baseline=bool(data.get("snapshot")))
+    return data.get("storage_state")
+ 
+def get_saved_data():
+    """从历史库读取上次的状态与逐稿件快照（按主键读取，不扫描历史），并读取会话Cookies"""
+    storage_state = None
+    try:
+        storage_state = load_session()
+        saved = history.load_target(TARGET_NAME)
+    except sqlite3.Error as e:
+        print(f"  -> [警告] 读取历史库 {history.path} 失败：{e}。将以首次运行模式启动。")
+        return {"last_status": "文件读取错误", "storage_state": storage_state, "snapshot": None}
+    if saved is None:
+        return {"last_status": "首次运行", "storage_state": storage_state, "snapshot": None}
+    return {"last_status": saved["last_status"], "storage_state": storage_state, "snapshot": saved["snapshot"],
+            "version": saved["version"]}
+ 
+def save_data(status, storage_state, snapshot=None, changes=(), baseline=False):
+    """最新状态、快照与变化追加到历史库；会话Cookies单独保存到本地JSON文件"""
+    history.record_check(TARGET_NAME, status, snapshot, changes, baseline)
+    try:
+        if session_store.save({"storage_state": storage_state}):
+            print(f"  -> 最新状态 '{status}' 已记录到 {history.path}，会话Cookies已保存至 {STATUS_FILE}")
+        else:
+            print(f"  -> 最新状态 '{status}' 已记录到 {history.path}，会话Cookies无变化，跳过写入。")
+    except OSError as e:
+        print(f"  -> [错误] 保存会话到 {STATUS_FILE} 失败: {e}")
+ 
+def handle_status_result(current_status, latest_storage_state, saved_data, status_snapshot=None):
+    """状态比对与通知：浏览器流程与HTTP快速通道共用。有上次快照时逐稿件比对，否则按首行状态比对"""
+    last_status = saved_data['last_status']
+    previous_snapshot = saved_data.get('snapshot')
+    print(f"  -> 上一次记录的状态是：'{last_status}'")
+
+    if status_snapshot is not None and previous_snapshot:
+        status_snapshot = status_diff.merge_snapshots(previous_snapshot, status_snapshot)
+        changes = status_diff.diff_snapshots(previous_snapshot, status_snapshot)
+        if not changes:
+            print(f"  -> {len(status_snapshot['manuscripts'])} 篇稿件状态均无变化，无需通知。")
+            save_data(current_status or last_status, latest_storage_state, status_snapshot)
+            return
+        for change in changes:
+            print(f"  -> !!! 稿件状态发生变化 {change.describe()}")
+        if outbox.enqueue_changes(TARGET_NAME, changes, observation=saved_data.get('version')):
+            save_data(current_status, latest_storage_state, status_snapshot, changes)
+        else:
+            print("  -> 通知未能全部入队，本次状态将不会被保存，等待下次重试；仍保存刷新后的会话Cookies。")
+            save_data(last_status, latest_storage_state, previous_snapshot)
+        return
+
+    # 没有上次快照：本次快照作为基线写入历史库
+    baseline = bool(status_snapshot) and not previous_snapshot
+    if current_status and "抓取页面元素时出错" not in current_status and current_status != last_status:
+        print(f"  -> !!! 状态发生变化 ({last_status} -> {current_status})，写入发件箱等待发送微信通知 !!!")
+        if outbox.enqueue(TARGET_NAME, last_status, current_status, observation=saved_data.get('version')):
+            save_data(current_status, latest_storage_state, status_snapshot, baseline=baseline)
+        else:
+            print("  -> 通知未能入队，本次状态将不会被保存，等待下次重试；仍保存刷新后的会话Cookies。")
+            save_data(last_status, latest_storage_state, previous_snapshot)
+    else:
+        if "抓取页面元素时出错" in current_status:
+             print("  -> 由于抓取状态出错，本次不更新状态。")
+        else:
+            print("  -> 状态无变化或为空，无需通知。")
+            save_data(last_status, latest_storage_state, status_snapshot or previous_snapshot, baseline=baseline)
+
+
+def try_http_fast_path(saved_data):
+    """尝试用已保存的Cookies直接请求页面完成检查，成功返回 True；检测到登录页等情况返回 False 以回退到浏览器"""
+    if not HTTP_FAST_PATH or keeper.is_stale():
+        return False
+    try:
+        current_status, latest_storage_state, status_snapshot = http_checker.check_submissions_status(target_url, saved_data.get('storage_state'))
+    except http_checker.LoginRequired as e:
+        print(f"  -> [HTTP快速通道] 会话无效（{e}），回退到浏览器登录流程。")
+        if saved_data.get('storage_state'):
+            keeper.mark_stale(f"HTTP快速通道检测到登录页：{e}")
+        return False
+    except (http_checker.PageStructureError, requests.RequestException) as e:
+        print(f"  -> [HTTP快速通道] 无法完成（{type(e).__name__}: {e}），回退到浏览器流程。")
+        failure = retry.classify(e)
+        if failure.site_fault:
+            breaker.record_failure(failure.kind)
+        return False
+
+    keeper.mark_valid()
+    breaker.record_success()
+    print(f"  -> 成功抓取到当前状态：'{current_status}'")
+    handle_status_result(current_status, latest_storage_state, saved_data, status_snapshot)
+    print("--- 本次期刊状态检查任务完成 ---\n")
+    return True
+
+# ==============================================================================
+#                        【核心任务函数 - 最终修正版】
+# ==============================================================================
+ 
+def check_journal_status():
+    """期刊状态检查任务的完整流程（各阶段耗时记录到 metrics）"""
+    watchdog.begin()
+    with metrics.check(TARGET_NAME) as record:
+        record["outcome"] = _check_journal_status()
+
+
+def _check_journal_status():
+    """返回本次检查的结果：http / browser / failed / timeout / circuit_open"""
+    print(f"\n【{time.strftime('%Y-%m-%d %H:%M:%S')}】 任务已触发。")
+    
+    print(f"--- 开始执行期刊状态检查 ---")
+    
+    if not breaker.allow():
+        print(f"  -> [熔断] {breaker.describe()}，本次跳过。")
+        return "circuit_open"
+
+    with metrics.span("load_state"):
+        saved_data = get_saved_data()
+    with metrics.span("http_fast_path"):
+        fast_path_done = try_http_fast_path(saved_data)
+    if fast_path_done:
+        return "http"
+
+    page = None
+
+    with retry.BrowserScope(browser_manager) as scope:
+        for attempt in range(MAX_RETRIES):
+            if breaker.is_open():
+                print(f"  -> [熔断] {breaker.describe()}，本次跳过。")
+                return "circuit_open"
+            try:
+                # 复用长驻的 Chromium；按上次失败的恢复方式复用原页面、新建 BrowserContext 或重启浏览器
+                policy = resource_policy.as_diagnostic() if attempt == MAX_RETRIES - 1 else resource_policy
+                # 保活任务已确认会话失效时，不再带上过期的Cookies，也不做页面识别，直接登录
+                stale = keeper.is_stale()
+                storage_state = None if stale else saved_data.get('storage_state')
+                context, page = scope.acquire(storage_state=storage_state, resource_policy=policy)
+                diagnostics.begin(context)
+
+                print(f"  -> 正在导航至网站入口: {target_url}...")
+                with metrics.span("goto"):
+                    page.goto(f"{target_url}", wait_until="domcontentloaded")
+
+                main_app_iframe_locator = page.locator(sel.MAIN_APP_IFRAME)
+                main_app_iframe_locator.wait_for(state="attached", timeout=20000)
+                # *** 修正点: `content_frame` 是属性，不是方法 ***
+                main_app_frame_object = main_app_iframe_locator.content_frame
+                if not main_app_frame_object:
+                    raise retry.FrameMissing("无法获取主应用程序框架 (#content) 的内容帧。")
+                print("  -> 已成功定位到主应用程序框架的内容帧。")
+
+                # 并行识别页面状态：登录页可立即识别，无需等待“已登录”特征超时；会话已知失效时跳过识别
+                if stale:
+                    state = page_state.LOGIN_PAGE
+                else:
+                    with metrics.span("detect"):
+                        state = page_state.detect_page_state(page, timeout=STATE_DETECT_TIMEOUT).state
+                if state == page_state.MAINTENANCE:
+                    raise page_state.SiteMaintenance("站点处于维护或错误页面，稍后重试。")
+
+                current_content_frame_object = None
+
+                try:
+                    if state == page_state.LOGIN_PAGE:
+                        raise TimeoutError("会话已被标记为失效" if stale else "页面识别结果为登录页")
+                    # 检测是否已登录
+                    logged_in_content_iframe_locator = main_app_frame_object.locator(sel.CONTENT_IFRAME)
+                    logged_in_content_iframe_locator.wait_for(state="attached", timeout=10000)
+                    # *** 修正点 ***
+                    current_content_frame_object = logged_in_content_iframe_locator.content_frame
+                    if not current_content_frame_object:
+                        raise retry.FrameMissing("无法获取登录后内容框架 (iframe[name=\"content\"]) 的内容帧。")
+                    
+                    current_content_frame_object.get_by_text(sel.SUBMISSIONS_LINK_TEXT, exact=True).wait_for(state="visible", timeout=10000)
+                    print("  -> 检测到有效会话，页面已显示投稿处理信息。")
+                    keeper.mark_valid()
+
+                except TimeoutError:
+                    print("  -> Session已过期或未登录，执行登录操作。")
+                    if storage_state:
+                        keeper.mark_stale("检查时发现会话已过期")
+                    
+                    login_iframe_locator = main_app_frame_object.locator(sel.LOGIN_IFRAME)
+                    login_iframe_locator.wait_for(state="attached", timeout=15000)
+                    # *** 修正点 ***
+                    login_form_frame_object = login_iframe_locator.content_frame
+                    if not login_form_frame_object:
+                        raise retry.FrameMissing("无法获取登录框架 (iframe[name=\"login\"]) 的内容帧。")
+                    print("  -> 已定位到登录iframe的内容框架。")
+
+                    username_input = login_form_frame_object.locator(sel.USERNAME_INPUT)
+                    username_input.wait_for(state="visible", timeout=15000)
+                    type_like_human(username_input, journal_username)
+                    print("  -> 输入好了用户名。")
+
+                    password_input = login_form_frame_object.locator(sel.PASSWORD_INPUT)
+                    password_input.wait_for(state="visible", timeout=15000)
+                    type_like_human(password_input, journal_password)
+                    print("  -> 输入好了密码。")
+
+                    login_button = login_form_frame_object.locator(sel.LOGIN_BUTTON)
+                    login_button.click()
+                    print("  -> 登录按钮已点击，正在等待登录后页面加载...")
+                    submissions_after_login = main_app_frame_object.frame_locator(sel.CONTENT_IFRAME).get_by_text(
+                        sel.SUBMISSIONS_LINK_TEXT)
+                    if page_state.login_rejected(submissions_after_login, username_input):
+                        raise retry.LoginRejected("提交登录后仍停留在登录页，请检查账号密码")
+
+                    logged_in_content_iframe_locator = main_app_frame_object.locator(sel.CONTENT_IFRAME)
+                    logged_in_content_iframe_locator.wait_for(state="attached", timeout=45000)
+                    # *** 修正点 ***
+                    current_content_frame_object = logged_in_content_iframe_locator.content_frame
+                    if not current_content_frame_object:
+                         raise retry.FrameMissing("登录后无法获取内容框架的内容帧。")
+                    
+                    current_content_frame_object.get_by_text(sel.SUBMISSIONS_LINK_TEXT).wait_for(state="visible", timeout=15000)
+                    print("  -> 登录成功，且已检测到'Submissions Being Processed'链接。")
+                    keeper.session_started()
+                    metrics.inc("relogins_total", help="执行登录的次数", target=TARGET_NAME)
+
+                if not current_content_frame_object:
+                    raise retry.FrameMissing("无法获取到有效的当前内容框架，任务中断。")
+
+                print("  -> 尝试点击 'Submissions Being Processed' 查看列表...")
+                with metrics.span("submissions_list"):
+                    submissions_link = current_content_frame_object.get_by_text(sel.SUBMISSIONS_LINK_TEXT)
+                    submissions_link.click()
+                    # 等待点击操作触发的导航完成
+                    current_content_frame_object.page.wait_for_load_state("load", timeout=30000)
+                print("  -> 'Submissions Being Processed' 链接已点击，列表页面加载完成。")
+
+                print("  -> 正在抓取页面状态...")
+                status_snapshot = None
+                try:
+                    with metrics.span("detail_page"):
+                        first_row = current_content_frame_object.locator(sel.DETAIL_FIRST_ROW)
+                        first_row.wait_for(state="visible", timeout=20000)
+                        # 一次读取整张表格，每篇稿件按稿件号单独比对
+                        detail_page = extraction.extract_snapshot(current_content_frame_object)
+                    current_status = detail_page.first_row_status or ""
+                    status_snapshot = status_diff.build_status_snapshot(detail_page)
+                    print(f"  -> 成功抓取到 {len(status_snapshot['manuscripts'])} 篇稿件，首行状态：'{current_status}'")
+                except TimeoutError:
+                    current_status = "无在处理的投稿"
+                    status_snapshot = status_diff.build_status_snapshot()
+                    print("  -> 未发现正在处理的投稿，或加载超时。")
+                except Exception as e:
+                    current_status = f"抓取页面元素时出错: {type(e).__name__} - {e}"
+                    print(f"  -> [错误] 定位状态元素时失败: {e}")
+ 
+                with metrics.span("storage_state"):
+                    latest_storage_state = context.storage_state()
+                with metrics.span("persist_and_notify"):
+                    handle_status_result(current_status, latest_storage_state, saved_data, status_snapshot)
+ 
+                print("--- 本次期刊状态检查任务完成 ---\n")
+                breaker.record_success()
+                return "browser" # 成功，退出函数
+ 
+            except (PlaywrightError, Exception) as e:
+                failure = retry.classify(e)
+                print(f"  -> [严重错误] 第 {attempt + 1}/{MAX_RETRIES} 次尝试失败（{failure.kind}）: {type(e).__name__} - {e}")
+                diagnostics.capture(page, TARGET_NAME, failure.kind, error=e, attempt=attempt + 1)
+
+                metrics.inc("check_failures_total", help="按类型统计的检查失败次数", target=TARGET_NAME, kind=failure.kind)
+                breaker.record_failure(failure.kind, failure.site_fault)
+
+                if watchdog.cancelled():
+                    print("  -> [看门狗] 本次检查已超过硬时限被终止，不再重试。")
+                    return "timeout"
+                if failure.recovery == retry.GIVE_UP:
+                    print(f"  -> [重试] 失败类型 {failure.kind} 重试无益，本轮放弃，等待下一个调度周期。")
+                    return "failed"
+                if attempt < MAX_RETRIES - 1:
+                    sleep_time = failure.delay(attempt, RETRY_BACKOFF_SECONDS)
+                    scope.recover(failure.recovery)
+                    metrics.inc("retries_total", help="浏览器流程的重试次数", target=TARGET_NAME, recovery=failure.recovery)
+                    print(f"  -> [重试] 恢复方式：{failure.label}，将在 {sleep_time:.0f} 秒后重试...")
+                    time.sleep(sleep_time)
+                else:
+                    print("  -> 已达到最大重试次数，任务中断。等待下一个调度周期。")
+    return "failed"
+
+
+def heartbeat():
+    print(f"[{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 服务心跳：正常运行中，等待下一个任务...")
+    # 兜底回收被结束的浏览器留下的僵尸进程，长期运行也不会累积
+    reaped = reap_zombies()
+    if reaped:
+        print(f"  -> [看门狗] 回收了 {reaped} 个僵尸进程。")
+    metrics.set("zombie_processes", len(proc_stats.zombie_children()), help="未回收的僵尸子进程数")
+
+
+if __name__ == '__main__':
+    print("脚本启动成功！服务已初始化。")
+    outbox.start()
+    scheduler = Scheduler()
+    if ADAPTIVE_POLLING:
+        poller = AdaptivePoller(history, base_minutes=CHECK_INTERVAL_MINUTES)
+        scheduler.add_job("check_journal_status", check_journal_status, interval_minutes=CHECK_INTERVAL_MINUTES,
+                          jitter=CHECK_JITTER, timeout=CHECK_TIMEOUT, quiet_hours=QUIET_HOURS, on_timeout=watchdog.on_timeout,
+                          interval_func=lambda: poller.next_interval(TARGET_NAME))
+    else:
+        scheduler.add_job("check_journal_status", check_journal_status, interval_minutes=CHECK_INTERVAL_MINUTES,
+                          jitter=CHECK_JITTER, timeout=CHECK_TIMEOUT, quiet_hours=QUIET_HOURS, at_minute=CHECK_AT_MINUTE,
+                          on_timeout=watchdog.on_timeout)
+    scheduler.add_job("session_keepalive", keeper.touch, interval_minutes=keeper.next_touch_interval() / 60,
+                      jitter=(0, 60), timeout=120, quiet_hours=QUIET_HOURS, interval_func=keeper.next_touch_interval)
+    scheduler.add_job("heartbeat", heartbeat, interval_minutes=10)
+    cadence = "按稿件状态自适应调整间隔" if ADAPTIVE_POLLING else f"每 {CHECK_INTERVAL_MINUTES} 分钟在第{CHECK_AT_MINUTE}分钟附近执行一次"
+    print(f"任务 'check_journal_status' {cadence}，{QUIET_HOURS[0]}点到{QUIET_HOURS[1]}点不执行。")
+
+    # 立即执行一次用于测试
+    # check_journal_status()
+
+    scheduler.run_forever()
@@ -0,0 +1,51 @@
+import os
+import hashlib
+
+
+# 菜单指纹连续命中这么多次后，强制做一次完整的详情页检查（安全校验）
+FULL_CHECK_EVERY = int(os.getenv("FINGERPRINT_FULL_CHECK_EVERY", "6"))
+
+
+def menu_fingerprint(menu_page):
+    """主菜单的廉价指纹：所有文件夹名称 + 计数，与菜单项顺序无关"""
+    parts = sorted(f"{item.label}={item.count}" for item in menu_page.menu_items)
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def _record(previous_snapshot):
+    return dict((previous_snapshot or {}).get("fingerprint") or {})
+
+
+def can_skip_detail(previous_snapshot, fingerprint, full_check_every=FULL_CHECK_EVERY):
+    """菜单指纹与上次完整检查时相同、且未到安全校验轮次时，可以跳过详情页导航"""
+    record = _record(previous_snapshot)
+    if not fingerprint or record.get("value") != fingerprint:
+        return False
+    if not (previous_snapshot or {}).get("manuscripts"):
+        return False
+    return record.get("skipped_in_row", 0) + 1 < full_check_every
+
+
+def reuse_snapshot(previous_snapshot, menu_page, fingerprint):
+    """跳过详情页时：沿用上次的逐稿件状态，只更新文件夹计数和跳过统计"""
+    record = _record(previous_snapshot)
+    record.update(value=fingerprint, skipped_in_row=record.get("skipped_in_row", 0) + 1,
+                  navigations_saved=record.get("navigations_saved", 0) + 1)
+    folders = {item.label: item.count for item in menu_page.active_items}
+    return dict(previous_snapshot, folders=folders, fingerprint=record)
+
+
+def record_full_check(status_snapshot, previous_snapshot, fingerprint):
+    """完整检查之后记录本次指纹（没看到主菜单时为 None，下次不会跳过），并清零连续跳过计数"""
+    record = _record(previous_snapshot)
+    record.update(value=fingerprint, skipped_in_row=0, full_checks=record.get("full_checks", 0) + 1)
+    return dict(status_snapshot, fingerprint=record)
+
+
+def report(status_snapshot, skipped):
+    record = (status_snapshot or {}).get("fingerprint") or {}
+    saved, full = record.get("navigations_saved", 0), record.get("full_checks", 0)
+    total = saved + full
+    ratio = f"{saved / total:.0%}" if total else "-"
+    action = "菜单未变化，跳过详情页导航" if skipped else "已执行完整检查"
+    print(f"  -> [菜单指纹] {action}（累计节省 {saved} 次导航 / 完整检查 {full} 次，节省率 {ratio}）。")
@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import bisect
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from . import proc_stats
+
+
+METRICS_PROM_FILE = os.getenv("METRICS_PROM_FILE", "metrics.prom")
+METRICS_JSONL_FILE = os.getenv("METRICS_JSONL_FILE", "metrics.jsonl")
+METRIC_PREFIX = "journal_checker_"
+# 直方图的桶边界（秒）：从毫秒级的 evaluate 到分钟级的登录导航
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    进程内的轻量指标：计数器、仪表盘、直方图，加上按检查记录各阶段耗时的 span。
+    每次检查结束时追加一行 JSON 到 METRICS_JSONL_FILE，并重写 Prometheus 文本文件
+    （供 node_exporter 的 textfile collector 采集）。每个 span 只是两次 perf_counter 加一次加锁累加。
+    """
+
+    def __init__(self, prom_file=METRICS_PROM_FILE, jsonl_file=METRICS_JSONL_FILE):
+        self.prom_file = prom_file
+        self.jsonl_file = jsonl_file
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._help = {}
+        self._local = threading.local()
+        self._started = time.perf_counter()
+        self.startup = {}
+
+    # ------------------------------------------------------------------
+    # 基础指标
+    # ------------------------------------------------------------------
+    def inc(self, name, value=1, help=None, **labels):
+        with self._lock:
+            key = (name, _label_key(labels))
+            self._counters[key] = self._counters.get(key, 0) + value
+            if help:
+                self._help.setdefault(name, help)
+        record = self._current()
+        if record is not None:
+            record["counters"][name] = record["counters"].get(name, 0) + value
+
+    def set(self, name, value, help=None, **labels):
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+            if help:
+                self._help.setdefault(name, help)
+        record = self._current()
+        if record is not None:
+            record["gauges"][name] = value
+
+    def observe(self, name, value, help=None, **labels):
+        with self._lock:
+            key = (name, _label_key(labels))
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+            if help:
+                self._help.setdefault(name, help)
+
+    # ------------------------------------------------------------------
+    # 按检查记录的阶段耗时
+    # ------------------------------------------------------------------
+    def _current(self):
+        return getattr(self._local, "record", None)
+
+    @contextmanager
+    def span(self, phase, **labels):
+        """记录一个阶段的耗时：with metrics.span("goto"): ...；异常时同样记录，并打上 outcome=error"""
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe("phase_duration_seconds", elapsed, help="各阶段耗时（秒）", phase=phase, outcome=outcome, **labels)
+            record = self._current()
+            if record is not None:
+                record["phases"][phase] = round(record["phases"].get(phase, 0.0) + elapsed, 4)
+
+    def timed(self, phase):
+        """装饰器版本的 span"""
+        def decorator(func):
+            def wrapper(*args, **kwargs):
+                with self.span(phase):
+                    return func(*args, **kwargs)
+            wrapper.__name__, wrapper.__doc__ = func.__name__, func.__doc__
+            return wrapper
+        return decorator
+
+    @contextmanager
+    def check(self, target):
+        """包裹一次完整检查：结束时写一行 JSON 并刷新 Prometheus 文件。可在块内设置 record["outcome"]"""
+        record = {"ts": time.time(), "target": target, "outcome": "ok", "phases": {}, "counters": {}, "gauges": {}}
+        self._local.record = record
+        started = time.perf_counter()
+        try:
+            yield record
+        except BaseException:
+            record["outcome"] = "error"
+            raise
+        finally:
+            record["duration_seconds"] = round(time.perf_counter() - started, 4)
+            self._local.record = None
+            self.observe("check_duration_seconds", record["duration_seconds"], help="单次检查总耗时（秒）",
+                         target=target, outcome=record["outcome"])
+            self.inc("checks_total", help="检查次数", target=target, outcome=record["outcome"])
+            self.flush(record)
+
+    def mark_startup(self, phase):
+        """记录进程启动到某个阶段第一次发生时的耗时（秒），用于衡量一次性模式的冷启动；同一阶段只记录一次"""
+        with self._lock:
+            if phase in self.startup:
+                return
+            age = proc_stats.process_age_seconds()
+            # 读不到 /proc 时退回到从导入本模块起计时
+            self.startup[phase] = round(age if age is not None else time.perf_counter() - self._started, 3)
+        self.set("startup_seconds", self.startup[phase], help="进程启动到各阶段首次发生的耗时（秒）", phase=phase)
+
+    # ------------------------------------------------------------------
+    # 导出
+    # ------------------------------------------------------------------
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            help_texts = dict(self._help)
+
+        def header(name, kind, seen):
+            full = METRIC_PREFIX + name
+            if name not in seen:
+                seen.add(name)
+                if name in help_texts:
+                    lines.append(f"# HELP {full} {help_texts[name]}")
+                lines.append(f"# TYPE {full} {kind}")
+            return full
+
+        seen = set()
+        for (name, key), value in counters:
+            lines.append(f"{header(name, 'counter', seen)}{_format_labels(key)} {value}")
+        for (name, key), value in gauges:
+            lines.append(f"{header(name, 'gauge', seen)}{_format_labels(key)} {value}")
+        for (name, key), histogram in histograms:
+            full = header(name, "histogram", seen)
+            cumulative = 0
+            for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                cumulative += count
+                lines.append(f"{full}_bucket{_format_labels(key, [('le', str(bound))])} {cumulative}")
+            lines.append(f"{full}_sum{_format_labels(key)} {histogram.sum:.6f}")
+            lines.append(f"{full}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self, record=None):
+        """
+        追加一行 JSON（如有），并原子地重写 Prometheus 文本文件；写入失败只打印警告。
+        多个线程会同时 flush：每次写入用 mkstemp 生成自己的临时文件，并在 _flush_lock 下串行写入，
+        避免共用一个 .tmp 文件时互相截断或 os.replace 找不到文件。
+        """
+        with self._flush_lock:
+            try:
+                if record is not None and self.jsonl_file:
+                    with open(self.jsonl_file, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+                if self.prom_file:
+                    self._write_prom()
+            except OSError as e:
+                print(f"  -> [警告] 写入指标文件失败: {e}")
+
+    def _write_prom(self):
+        directory = os.path.dirname(os.path.abspath(self.prom_file))
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.prom_file) + ".", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.render_prometheus())
+            # mkstemp 建的文件权限是 0600，textfile collector 需要能读
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.prom_file)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+
+metrics = Metrics()
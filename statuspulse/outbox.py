@@ -0,0 +1,322 @@
+import os
+import time
+import random
+import sqlite3
+import hashlib
+import datetime
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from . import wechat
+from .metrics import metrics as process_metrics
+
+
+OUTBOX_DB = os.getenv("OUTBOX_DB", "outbox.db")
+# 每次 flush 最多领取的通知数、同时发送的并发数
+BATCH_SIZE = 20
+SEND_CONCURRENCY = 4
+# 失败重试：指数退避（秒），超过最大次数后标记为 dead
+BACKOFF_BASE = 30
+BACKOFF_CAP = 3600
+MAX_ATTEMPTS = 8
+# 同一幂等键（同一次观测到的状态变化）排队中或在该时间窗口内已发送时不再入队（秒）
+DEDUP_WINDOW = 24 * 3600
+# 领取后（state = 'sending'）超过这么久（秒）仍未标记结果的通知视为领取者已退出，放回队列
+CLAIM_TIMEOUT = 300
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idem_key TEXT NOT NULL,
+    target TEXT NOT NULL,
+    to_user TEXT,
+    manuscript TEXT,
+    old_status TEXT,
+    new_status TEXT,
+    check_time TEXT,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    claimed_at REAL,
+    created_at REAL NOT NULL,
+    sent_at REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(state, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_outbox_key ON outbox(idem_key);
+"""
+
+
+class OutboxStats:
+    """发送侧计数器：队列深度在查询时实时统计，其余在进程内累加"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.dead = 0
+        self.coalesced = 0
+        self.latencies = []
+
+    def record_latency(self, seconds):
+        with self.lock:
+            self.latencies.append(seconds)
+            del self.latencies[:-500]
+
+
+def idempotency_key(target, to_user, old_status, new_status, observation=None):
+    """
+    同一目标、同一收信人、同一次观测到的状态变化只通知一次。
+    observation 是变化出发时的状态版本（history 中 targets.version），入队失败后下次检查重新观测到同一变化时不变；
+    状态真的来回变化（A→B→A→B）时版本不同，每次都会通知。
+    """
+    raw = "\x1f".join(str(part) for part in (target, to_user, old_status, new_status, observation))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class Outbox:
+    """
+    持久化的通知发件箱（SQLite）。
+    检查任务只负责 enqueue()，由后台 worker 负责发送、重试与批量合并，
+    微信接口变慢或失败不会拖住浏览器，也不会丢失通知。
+    """
+
+    def __init__(self, path=OUTBOX_DB):
+        self.path = path
+        self.stats = OutboxStats()
+        # 多实例部署时由 coordination.Coordinator 跨实例去重同一状态变化的通知
+        self.dedup = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(outbox)")]
+            if "manuscript" not in columns:
+                conn.execute("ALTER TABLE outbox ADD COLUMN manuscript TEXT")
+            if "claimed_at" not in columns:
+                conn.execute("ALTER TABLE outbox ADD COLUMN claimed_at REAL")
+
+    @contextmanager
+    def _connect(self):
+        """短连接：每次操作一个事务，结束后提交并关闭（可跨线程使用）"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # 生产者
+    # ------------------------------------------------------------------
+    def enqueue(self, target, old_status, new_status, to_user=None, manuscript=None, observation=None):
+        """写入一条待发送通知，返回 True 表示已入队（或同一次观测到的变化已在队列中、已发送、已由其他实例通知）"""
+        to_user = to_user or wechat.openId
+        key = idempotency_key(target, to_user, old_status, new_status, observation)
+        now = time.time()
+        check_time = datetime.datetime.now().strftime("%Y年%m月%d日 %H:%M")
+        claimed = False
+        try:
+            with self._connect() as conn:
+                # 只对重试同一次观测去重；已放弃（dead）的通知允许重新入队
+                duplicate = conn.execute(
+                    "SELECT 1 FROM outbox WHERE idem_key = ?"
+                    " AND (state IN ('pending', 'sending') OR (state = 'sent' AND created_at > ?))",
+                    (key, now - DEDUP_WINDOW)).fetchone()
+                if duplicate:
+                    print(f"  -> [发件箱] 本次状态变化已在队列中或已发送，跳过重复入队。")
+                    return True
+                if self.dedup:
+                    if not self.dedup.claim_notification(target, manuscript, old_status, new_status, observation):
+                        print(f"  -> [发件箱] 相同的状态变化已由其他实例通知，跳过。")
+                        return True
+                    claimed = True
+                conn.execute(
+                    "INSERT INTO outbox (idem_key, target, to_user, manuscript, old_status, new_status, check_time,"
+                    " next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, target, to_user, manuscript, old_status, new_status, check_time, now, now))
+        except sqlite3.Error as e:
+            print(f"  -> [错误] 通知写入发件箱 {self.path} 失败: {e}")
+            if claimed:
+                self.dedup.forget_notification(target, manuscript, old_status, new_status, observation)
+            return False
+        print(f"  -> [发件箱] 通知已入队（{old_status} -> {new_status}），将由后台发送。")
+        self._wake.set()
+        return True
+
+    def enqueue_changes(self, target, changes, to_user=None, observation=None):
+        """每条稿件变化各入队一条通知（模板中的旧/新状态带上稿件号），全部入队成功返回 True"""
+        results = [self.enqueue(target, f"[{c.key}] {c.old}", f"[{c.key}] {c.new}", to_user, manuscript=c.key,
+                                observation=observation)
+                   for c in changes]
+        return all(results)
+
+    # ------------------------------------------------------------------
+    # 消费者
+    # ------------------------------------------------------------------
+    def _claim_due(self):
+        """
+        原子地领取一批到期通知（标记为 sending），后台线程、drain() 以及共用 OUTBOX_DB 的其他进程不会领到同一条；
+        领取者中途退出留下的 sending 通知在 CLAIM_TIMEOUT 后放回队列
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("UPDATE outbox SET state = 'pending' WHERE state = 'sending' AND claimed_at < ?",
+                         (now - CLAIM_TIMEOUT,))
+            rows = conn.execute(
+                "UPDATE outbox SET state = 'sending', claimed_at = ? WHERE id IN ("
+                "SELECT id FROM outbox WHERE state = 'pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?)"
+                " RETURNING id, target, to_user, old_status, new_status, check_time, attempts, manuscript",
+                (now, now, BATCH_SIZE)).fetchall()
+        # RETURNING 不保证顺序，合并时依赖按 id 排序
+        return sorted(rows)
+
+    @staticmethod
+    def _coalesce(rows):
+        """
+        同一目标、同一收信人、同一稿件（或文件夹）的多条待发通知合并为一条（最早的旧状态 -> 最新的新状态）；
+        不同稿件的变化各自发送。没有稿件号的整体状态通知按目标合并
+        """
+        groups = {}
+        for row in rows:
+            groups.setdefault((row[1], row[2], row[7]), []).append(row)
+        return list(groups.values())
+
+    def _send_group(self, group):
+        first, last = group[0], group[-1]
+        started = time.perf_counter()
+        ok = wechat.send_status_update(None, first[3], last[4], to_user=first[2], check_time=last[5])
+        self.stats.record_latency(time.perf_counter() - started)
+        return group, ok
+
+    def _mark(self, group, ok, error=None):
+        ids = [row[0] for row in group]
+        now = time.time()
+        with self._connect() as conn:
+            if ok:
+                conn.executemany("UPDATE outbox SET state = 'sent', sent_at = ?, attempts = attempts + 1 WHERE id = ?",
+                                 [(now, i) for i in ids])
+                return
+            attempts = max(row[6] for row in group) + 1
+            if attempts >= MAX_ATTEMPTS:
+                conn.executemany("UPDATE outbox SET state = 'dead', attempts = ?, last_error = ? WHERE id = ?",
+                                 [(attempts, error, i) for i in ids])
+                with self.stats.lock:
+                    self.stats.dead += len(ids)
+                print(f"  -> [发件箱] 通知连续失败 {attempts} 次，已放弃（id={ids}）。")
+                return
+            delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_CAP) * random.uniform(0.8, 1.2)
+            conn.executemany("UPDATE outbox SET state = 'pending', attempts = ?, next_attempt_at = ?, last_error = ?"
+                             " WHERE id = ? AND state = 'sending'",
+                             [(attempts, now + delay, error, i) for i in ids])
+
+    def flush(self):
+        """发送一批到期的通知，返回本批处理的消息数"""
+        rows = self._claim_due()
+        if not rows:
+            return 0
+        groups = self._coalesce(rows)
+        with self.stats.lock:
+            self.stats.coalesced += len(rows) - len(groups)
+        # 先取一次 token，批内所有消息复用
+        if not wechat.get_access_token():
+            for group in groups:
+                self._mark(group, False, "获取access_token失败")
+            with self.stats.lock:
+                self.stats.failed += len(groups)
+            return len(groups)
+
+        with ThreadPoolExecutor(max_workers=SEND_CONCURRENCY) as pool:
+            for group, ok in pool.map(self._send_group, groups):
+                self._mark(group, ok, None if ok else "发送失败")
+                with self.stats.lock:
+                    if ok:
+                        self.stats.sent += 1
+                    else:
+                        self.stats.failed += 1
+        self.report()
+        for state, count in self.depth().items():
+            process_metrics.set("outbox_messages", count, help="发件箱中各状态的通知数", state=state)
+        # 发送发生在检查之外的线程，批次结束后单独刷新一次 Prometheus 文件
+        process_metrics.flush()
+        return len(groups)
+
+    def _next_due_in(self):
+        with self._connect() as conn:
+            row = conn.execute("SELECT MIN(next_attempt_at) FROM outbox WHERE state = 'pending'").fetchone()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                while self.flush():
+                    pass
+                wait = self._next_due_in()
+            except Exception as e:
+                # 任何异常（数据库、微信配置、指标写入等）都不能让后台线程退出，否则通知会无声地积压
+                print(f"  -> [错误] 发件箱处理失败（{type(e).__name__}: {e}），{BACKOFF_BASE} 秒后重试。")
+                wait = BACKOFF_BASE
+            self._wake.wait(timeout=wait if wait is not None else None)
+            self._wake.clear()
+
+    def start(self):
+        """启动后台发送线程（重复调用无副作用）"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def drain(self, timeout=30):
+        """一次性模式退出前调用：在超时内尽量把到期通知发完"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and self.flush():
+            pass
+
+    # ------------------------------------------------------------------
+    # 可观测性
+    # ------------------------------------------------------------------
+    def depth(self):
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT state, COUNT(*) FROM outbox GROUP BY state").fetchall())
+
+    def metrics(self):
+        with self.stats.lock:
+            latencies = sorted(self.stats.latencies)
+            snapshot = {
+                "sent": self.stats.sent, "failed": self.stats.failed,
+                "dead": self.stats.dead, "coalesced": self.stats.coalesced,
+            }
+        snapshot["queue"] = self.depth()
+        if latencies:
+            snapshot["send_latency_p50"] = round(latencies[len(latencies) // 2], 3)
+            snapshot["send_latency_p95"] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3)
+        return snapshot
+
+    def report(self):
+        m = self.metrics()
+        print(f"  -> [发件箱] 待发送 {m['queue'].get('pending', 0)}，已发送 {m['sent']}，失败 {m['failed']}，"
+              f"放弃 {m['dead']}，合并 {m['coalesced']}，发送耗时 p50={m.get('send_latency_p50', '-')}s。")
+
+
+_default_outbox = None
+_default_lock = threading.Lock()
+
+
+def get_outbox():
+    """进程内共享的发件箱实例"""
+    global _default_outbox
+    with _default_lock:
+        if _default_outbox is None:
+            _default_outbox = Outbox()
+        return _default_outbox
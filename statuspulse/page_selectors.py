@@ -0,0 +1,44 @@
+# ==============================================================================
+#          【Editorial Manager 页面选择器 - 统一配置，页面改版时只需修改这里】
+# ==============================================================================
+
+# 框架层级：入口页 -> iframe#content(主应用) -> iframe[name="content"](核心内容) / iframe[name="login"](登录)
+MAIN_APP_IFRAME = 'iframe#content'
+CONTENT_IFRAME = 'iframe[name="content"]'
+LOGIN_IFRAME = 'iframe[name="login"]'
+CONTENT_FRAME_NAME = "content"
+
+# 登录表单
+USERNAME_INPUT = "#username"
+PASSWORD_INPUT = "#passwordTextbox"
+LOGIN_BUTTON = '#emLoginButtonsDiv > input[type=button]:nth-child(1)'
+LOGIN_MARKERS = (LOGIN_IFRAME, USERNAME_INPUT, PASSWORD_INPUT, "#emLoginButtonsDiv")
+
+# 主菜单：每个文件夹是一个 main_menu_item_2（有投稿时为 <a>，否则为 <span>），后面紧跟 span.count "(N)"
+MENU_ITEM = "a[cssclass='main_menu_item_2'], span[cssclass='main_menu_item_2']"
+MENU_COUNT_CLASS = "count"
+MENU_SIGNATURE_TEXT = "New Submissions"
+SUBMISSIONS_LINK_TEXT = "Submissions Being Processed"
+
+# 详情页：稿件列表表格
+DATATABLE = "table#datatable"
+DATATABLE_ROWS = "table#datatable tr[id^='row']"
+DETAIL_FIRST_ROW = "table#datatable tr#row1"
+DETAIL_SIGNATURE_TEXT = "Manuscript Number"
+STATUS_COLUMN_INDEX = 5
+# 表头可用时按表头文字定位列，否则使用默认列序号
+MANUSCRIPT_NUMBER_HEADER = "Manuscript Number"
+MANUSCRIPT_NUMBER_COLUMN_INDEX = 1
+TITLE_HEADER = "Title"
+TITLE_COLUMN_INDEX = 2
+STATUS_HEADER = "Current Status"
+
+
+def extraction_config():
+    """传给页面内提取脚本的选择器参数"""
+    return {
+        "menuItem": MENU_ITEM,
+        "countClass": MENU_COUNT_CLASS,
+        "table": DATATABLE,
+        "rows": DATATABLE_ROWS,
+    }
@@ -0,0 +1,153 @@
+import time
+from dataclasses import dataclass, field
+
+from . import page_selectors as sel
+
+
+class SiteMaintenance(Exception):
+    """站点处于维护或错误页面"""
+
+
+# 页面状态
+MAIN_MENU = "main_menu"
+DETAIL_PAGE = "detail_page"
+LOGIN_PAGE = "login_page"
+MAINTENANCE = "maintenance"
+UNKNOWN = "unknown"
+
+
+@dataclass
+class StateSignature:
+    """
+    一种页面状态的特征。任意一个（同源）框架中满足以下任一条件即视为匹配：
+    texts: 某个可见元素的文字与之完全相同；selectors: 所有选择器均命中可见元素；patterns: 正文包含该正则。
+    priority 越小越优先（多个状态同时匹配时使用）。
+    """
+    name: str
+    texts: list = field(default_factory=list)
+    selectors: list = field(default_factory=list)
+    patterns: list = field(default_factory=list)
+    priority: int = 100
+
+    def as_arg(self):
+        return {"name": self.name, "texts": self.texts, "selectors": self.selectors,
+                "patterns": self.patterns, "priority": self.priority}
+
+
+SIGNATURES = [
+    StateSignature(MAINTENANCE, patterns=[r"down for (scheduled )?maintenance", r"Service (Temporarily )?Unavailable",
+                                          r"Server Error in '/", r"temporarily unavailable"], priority=0),
+    StateSignature(MAIN_MENU, texts=[sel.MENU_SIGNATURE_TEXT], priority=10),
+    StateSignature(DETAIL_PAGE, texts=[sel.DETAIL_SIGNATURE_TEXT], priority=20),
+    StateSignature(LOGIN_PAGE, selectors=[sel.USERNAME_INPUT, sel.PASSWORD_INPUT], priority=30),
+]
+
+
+def register_state(signature, replace=True):
+    """注册新的页面状态（或替换同名状态），例如站点新增的公告页、验证码页"""
+    if replace:
+        SIGNATURES[:] = [s for s in SIGNATURES if s.name != signature.name]
+    SIGNATURES.append(signature)
+    SIGNATURES.sort(key=lambda s: s.priority)
+
+
+# 在页面内同时检查所有特征，遍历顶层文档及所有同源 iframe；任一特征命中即返回
+DETECT_JS = r"""
+(signatures) => {
+    const docs = [];
+    const collect = (doc) => {
+        if (!doc) return;
+        docs.push(doc);
+        doc.querySelectorAll('iframe, frame').forEach(f => {
+            try { collect(f.contentDocument); } catch (e) { /* 跨域框架跳过 */ }
+        });
+    };
+    collect(document);
+
+    const visible = (el) => !!el && !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    const hasExactText = (doc, text) => {
+        if (!doc.body) return false;
+        const walker = doc.createTreeWalker(doc.body, NodeFilter.SHOW_TEXT);
+        for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+            if (node.nodeValue.trim() === text && visible(node.parentElement)) return true;
+        }
+        return false;
+    };
+    const matches = (sig, doc) => {
+        if (sig.texts.some(t => hasExactText(doc, t))) return true;
+        if (sig.selectors.length && sig.selectors.every(s => visible(doc.querySelector(s)))) return true;
+        const body = doc.body ? doc.body.innerText || '' : '';
+        return sig.patterns.some(p => new RegExp(p, 'i').test(body));
+    };
+    for (const sig of signatures) {
+        if (docs.some(doc => matches(sig, doc))) return sig.name;
+    }
+    return null;
+}
+"""
+
+
+@dataclass
+class Detection:
+    state: str
+    elapsed: float
+
+
+# 进程内的检测统计：各状态命中次数与最近一次检测耗时
+detection_stats = {"counts": {}, "last": None}
+
+
+def _record(state, started):
+    detection = Detection(state=state, elapsed=time.perf_counter() - started)
+    detection_stats["counts"][state] = detection_stats["counts"].get(state, 0) + 1
+    detection_stats["last"] = {"state": state, "elapsed_seconds": round(detection.elapsed, 3)}
+    print(f"  -> [页面识别] 判定为 '{state}'，耗时 {detection.elapsed:.2f} 秒。")
+    return detection
+
+
+def _signature_args():
+    return [s.as_arg() for s in sorted(SIGNATURES, key=lambda s: s.priority)]
+
+
+def detect_page_state(page, timeout=15000, polling=100):
+    """同步API：同时等待所有已知状态特征，返回最先命中的状态；超时返回 UNKNOWN"""
+    from playwright.sync_api import TimeoutError as SyncTimeoutError
+    started = time.perf_counter()
+    try:
+        handle = page.wait_for_function(DETECT_JS, arg=_signature_args(), polling=polling, timeout=timeout)
+        state = handle.json_value()
+    except SyncTimeoutError:
+        state = UNKNOWN
+    return _record(state, started)
+
+
+def login_rejected(success, login_form, timeout=45000, settle=8000, polling=0.25):
+    """
+    同步API：提交登录后，在登录后页面的标志（success 定位器出现）与登录表单仍然可见之间竞速。
+    表单在 settle 毫秒后仍然可见、success 也没有出现时返回 True（账号密码错误或账号被锁定），不必等满超时；
+    success 出现或超时时返回 False，由调用方继续等待（超时仍按导航超时处理）。
+    """
+    from playwright.sync_api import Error as PlaywrightError
+    started = time.monotonic()
+    while (elapsed := (time.monotonic() - started) * 1000) < timeout:
+        try:
+            if success.count():
+                return False
+            if elapsed >= settle and login_form.is_visible():
+                return True
+        except PlaywrightError:
+            pass  # 登录框架正在跳转或已脱离文档
+        time.sleep(polling)
+    return False
+
+
+async def detect_page_state_async(page, timeout=15000, polling=100):
+    """异步API版本"""
+    from playwright.async_api import TimeoutError as AsyncTimeoutError
+    started = time.perf_counter()
+    try:
+        handle = await page.wait_for_function(DETECT_JS, arg=_signature_args(), polling=polling, timeout=timeout)
+        state = await handle.json_value()
+    except AsyncTimeoutError:
+        state = UNKNOWN
+    return _record(state, started)
@@ -0,0 +1,187 @@
+import os
+import threading
+from pathlib import Path
+
+
+PROC_ROOT = Path("/proc")
+try:
+    CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+    PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    CLOCK_TICKS = 100
+    PAGE_SIZE = 4096
+
+
+def _read_stat(pid):
+    """读取 /proc/<pid>/stat，返回 comm 之后的字段列表（读取失败返回 None）"""
+    try:
+        raw = (PROC_ROOT / str(pid) / "stat").read_text()
+    except OSError:
+        return None
+    # comm 字段可能包含空格和括号，以最后一个 ')' 作为分界
+    return raw[raw.rfind(")") + 2:].split()
+
+
+def children_map():
+    """扫描 /proc，构建 {父进程pid: [子进程pid, ...]} 映射"""
+    mapping = {}
+    if not PROC_ROOT.exists():
+        return mapping
+    for entry in PROC_ROOT.iterdir():
+        if not entry.name.isdigit():
+            continue
+        fields = _read_stat(entry.name)
+        if not fields:
+            continue
+        mapping.setdefault(int(fields[1]), []).append(int(entry.name))
+    return mapping
+
+
+def children(pid=None):
+    """pid（默认当前进程）的直接子进程"""
+    return children_map().get(pid or os.getpid(), [])
+
+
+def descendant_pids(root_pid=None):
+    """返回 root_pid（默认当前进程）的全部后代进程pid（不含自身）"""
+    root_pid = root_pid or os.getpid()
+    mapping = children_map()
+    result, stack = [], list(mapping.get(root_pid, []))
+    while stack:
+        pid = stack.pop()
+        result.append(pid)
+        stack.extend(mapping.get(pid, []))
+    return result
+
+
+def tree_pids(roots):
+    """roots 中仍存在的进程及其全部后代进程的pid"""
+    mapping = children_map()
+    result, stack = [], [pid for pid in roots if process_state(pid) is not None]
+    while stack:
+        pid = stack.pop()
+        result.append(pid)
+        stack.extend(mapping.get(pid, []))
+    return result
+
+
+def process_rss_bytes(pid):
+    """单个进程的常驻内存（字节），进程已退出时返回 0"""
+    try:
+        with open(PROC_ROOT / str(pid) / "statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def process_cpu_seconds(pid):
+    """单个进程累计消耗的 CPU 时间（用户态 + 内核态，秒）"""
+    fields = _read_stat(pid)
+    if not fields:
+        return 0.0
+    # utime、stime 在 comm 之后分别位于第 12、13 个字段
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def tree_rss_bytes(root_pid=None, include_self=False):
+    """统计进程树（默认为当前进程拉起的 Playwright 驱动与 Chromium）的 RSS 总和"""
+    pids = descendant_pids(root_pid)
+    if include_self:
+        pids.append(root_pid or os.getpid())
+    return sum(process_rss_bytes(pid) for pid in pids)
+
+
+def tree_cpu_seconds(root_pid=None, include_self=True):
+    """统计进程树（默认含自身）当前累计的 CPU 时间，用于计算单次检查的 CPU 消耗"""
+    pids = descendant_pids(root_pid)
+    if include_self:
+        pids.append(root_pid or os.getpid())
+    return sum(process_cpu_seconds(pid) for pid in pids)
+
+
+def process_age_seconds(pid=None):
+    """进程自启动以来经过的时间（秒），包括解释器启动与模块导入；无法读取 /proc 时返回 None"""
+    fields = _read_stat(pid or os.getpid())
+    try:
+        with open(PROC_ROOT / "uptime") as f:
+            uptime = float(f.read().split()[0])
+        # starttime 在 comm 之后位于第 20 个字段，单位为时钟周期（自系统启动起）
+        return max(0.0, uptime - int(fields[19]) / CLOCK_TICKS)
+    except (OSError, ValueError, IndexError, TypeError):
+        return None
+
+
+def process_state(pid):
+    """进程状态（R/S/D/Z 等），进程不存在时返回 None"""
+    fields = _read_stat(pid)
+    return fields[0] if fields else None
+
+
+def zombie_children(root_pid=None):
+    """root_pid（默认当前进程）的已退出但尚未被回收的直接子进程"""
+    root_pid = root_pid or os.getpid()
+    return [pid for pid in children_map().get(root_pid, []) if process_state(pid) == "Z"]
+
+
+class RssSampler:
+    """
+    后台线程按 interval 秒采样进程树的常驻内存，记录峰值与平均值（字节）。
+    传入 pids（返回pid列表的函数）时每次采样只统计这些进程，例如某个浏览器实例自己的进程树；
+    否则统计 root_pid（默认当前进程）的全部后代。
+    on_sample(rss_bytes) 在采样线程中调用，只能做与线程无关的操作（例如结束进程）。
+    用法：with RssSampler() as sampler: ...，之后读取 sampler.peak_bytes / sampler.mean_bytes
+    """
+
+    def __init__(self, interval=0.25, root_pid=None, include_self=False, on_sample=None, pids=None):
+        self.interval = interval
+        self.pids = pids
+        self.root_pid = root_pid
+        self.include_self = include_self
+        self.on_sample = on_sample
+        self.peak_bytes = 0
+        self.samples = 0
+        self._total = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def mean_bytes(self):
+        return self._total / self.samples if self.samples else 0
+
+    def sample(self):
+        if self.pids:
+            rss = sum(process_rss_bytes(pid) for pid in self.pids())
+        else:
+            rss = tree_rss_bytes(self.root_pid, include_self=self.include_self)
+        self.peak_bytes = max(self.peak_bytes, rss)
+        self._total += rss
+        self.samples += 1
+        if self.on_sample:
+            self.on_sample(rss)
+        return rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self.sample()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止采样并补采最后一次，返回自身"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+            self.sample()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,164 @@
+import os
+import re
+import fnmatch
+
+
+# 默认只拦截图片、媒体和字体：它们与状态文字无关，拦截后不影响登录表单与可见性判断。
+# 样式表默认放行——菜单计数是否可见依赖 CSS，拦截它会改变 is_visible() 的结果。
+DEFAULT_BLOCKED_TYPES = {"image", "media", "font"}
+# 常见的统计/广告脚本，与登录和状态页面无关
+DEFAULT_DENY_PATTERNS = [
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*hotjar.com*", "*facebook.net*", "*clarity.ms*", "*newrelic.com*", "*nr-data.net*",
+]
+
+# 被拦截请求的“节省字节数”按最近一次放行时看到的 Content-Length 估算
+_known_sizes = {}
+
+
+def _split_env(name):
+    value = os.getenv(name)
+    if value is None:
+        return None
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+class ResourceStats:
+    """单次检查中被拦截/放行的请求统计"""
+
+    def __init__(self):
+        self.allowed_requests = 0
+        self.blocked_requests = 0
+        self.blocked_by_type = {}
+        self.transferred_bytes = 0
+        self.saved_bytes = 0
+        self._detach = []
+
+    def detach(self):
+        """移除安装在上下文上的监听与拦截（持久化上下文跨检查复用时调用）"""
+        for undo in self._detach:
+            try:
+                undo()
+            except Exception:
+                pass
+        self._detach = []
+
+    def as_dict(self):
+        return {
+            "allowed_requests": self.allowed_requests,
+            "blocked_requests": self.blocked_requests,
+            "blocked_by_type": dict(self.blocked_by_type),
+            "transferred_bytes": self.transferred_bytes,
+            "saved_bytes_estimate": self.saved_bytes,
+        }
+
+    def report(self):
+        by_type = "，".join(f"{k} {v}" for k, v in sorted(self.blocked_by_type.items())) or "无"
+        print(f"  -> [资源拦截] 放行 {self.allowed_requests} 个请求（约 {self.transferred_bytes / 1024:.0f} KB），"
+              f"拦截 {self.blocked_requests} 个（{by_type}），估计节省 {self.saved_bytes / 1024:.0f} KB。")
+
+
+class ResourcePolicy:
+    """
+    BrowserContext 级别的请求拦截策略。
+    放行规则优先于拦截规则；diagnostic=True 时全部放行（需要完整截图排查问题时使用）。
+    """
+
+    def __init__(self, blocked_types=None, deny_patterns=None, allow_patterns=None, diagnostic=False):
+        self.blocked_types = set(DEFAULT_BLOCKED_TYPES if blocked_types is None else blocked_types)
+        self.deny_patterns = list(DEFAULT_DENY_PATTERNS if deny_patterns is None else deny_patterns)
+        self.allow_patterns = list(allow_patterns or [])
+        self.diagnostic = diagnostic
+
+    @classmethod
+    def from_env(cls):
+        """
+        从环境变量读取策略：
+        BLOCK_RESOURCE_TYPES=image,media,font   BLOCK_URL_PATTERNS=*ads*,...   ALLOW_URL_PATTERNS=*captcha*
+        RESOURCE_POLICY=diagnostic（全部放行） / off（同 diagnostic）
+        """
+        mode = os.getenv("RESOURCE_POLICY", "default").lower()
+        return cls(
+            blocked_types=_split_env("BLOCK_RESOURCE_TYPES"),
+            deny_patterns=_split_env("BLOCK_URL_PATTERNS"),
+            allow_patterns=_split_env("ALLOW_URL_PATTERNS"),
+            diagnostic=mode in ("diagnostic", "off"),
+        )
+
+    def as_diagnostic(self):
+        """返回同配置的诊断版本（全部放行）"""
+        return ResourcePolicy(self.blocked_types, self.deny_patterns, self.allow_patterns, diagnostic=True)
+
+    def should_block(self, resource_type, url):
+        if self.diagnostic:
+            return False
+        if any(fnmatch.fnmatch(url, pattern) for pattern in self.allow_patterns):
+            return False
+        if resource_type in self.blocked_types:
+            return True
+        return any(fnmatch.fnmatch(url, pattern) for pattern in self.deny_patterns)
+
+    # ------------------------------------------------------------------
+    # 安装到 BrowserContext
+    # ------------------------------------------------------------------
+    def _on_response(self, stats, response):
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            size = int(length)
+            stats.transferred_bytes += size
+            _known_sizes[_strip_query(response.url)] = size
+
+    def _decide(self, stats, request, intercept=True):
+        if intercept and self.should_block(request.resource_type, request.url):
+            stats.blocked_requests += 1
+            stats.blocked_by_type[request.resource_type] = stats.blocked_by_type.get(request.resource_type, 0) + 1
+            stats.saved_bytes += _known_sizes.get(_strip_query(request.url), 0)
+            return True
+        stats.allowed_requests += 1
+        return False
+
+    def install(self, context, intercept=True):
+        """
+        为同步API的 BrowserContext 安装拦截器，返回本次检查的统计对象。
+        intercept=False 时只统计不拦截：启用 route 后 Chromium 不再使用 HTTP 缓存，持久化配置目录模式下不拦截。
+        """
+        stats = ResourceStats()
+        on_response = lambda response: self._on_response(stats, response)
+        context.on("response", on_response)
+        stats._detach.append(lambda: context.remove_listener("response", on_response))
+        if self.diagnostic or not intercept:
+            on_request = lambda request: self._decide(stats, request, intercept)
+            context.on("request", on_request)
+            stats._detach.append(lambda: context.remove_listener("request", on_request))
+            return stats
+
+        def handler(route, request):
+            if self._decide(stats, request):
+                route.abort()
+            else:
+                route.continue_()
+
+        context.route("**/*", handler)
+        stats._detach.append(lambda: context.unroute("**/*", handler))
+        return stats
+
+    async def install_async(self, context):
+        """为异步API的 BrowserContext 安装拦截器，返回本次检查的统计对象"""
+        stats = ResourceStats()
+        context.on("response", lambda response: self._on_response(stats, response))
+        if self.diagnostic:
+            context.on("request", lambda request: self._decide(stats, request))
+            return stats
+
+        async def handler(route, request):
+            if self._decide(stats, request):
+                await route.abort()
+            else:
+                await route.continue_()
+
+        await context.route("**/*", handler)
+        return stats
+
+
+def _strip_query(url):
+    return re.sub(r"[?#].*$", "", url)
@@ -0,0 +1,295 @@
+import os
+import re
+import sys
+import time
+import random
+import threading
+import contextlib
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+import requests
+
+from . import page_state
+from .session_store import SessionStore
+
+
+CIRCUIT_FILE = os.getenv("CIRCUIT_FILE", "circuit_breaker.json")
+# 退避上限（秒）；同一上下文内重新导航的退避基数更短
+RETRY_BACKOFF_CAP = 300
+RELOAD_BACKOFF_SECONDS = 3
+# 连续多少次站点侧失败后熔断，熔断时长从 CIRCUIT_COOLDOWN 起，试探失败则翻倍，最长 CIRCUIT_MAX_COOLDOWN（秒）
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_COOLDOWN = 30 * 60
+CIRCUIT_MAX_COOLDOWN = 6 * 3600
+# 半开状态下的试探超过这么久（秒）仍没有结果（例如进程在试探中退出）时，视为试探失败的遗留状态，放行新的试探
+CIRCUIT_PROBE_TIMEOUT = 15 * 60
+
+# 失败类型
+NAVIGATION_TIMEOUT = "navigation_timeout"
+FRAME_MISSING = "frame_missing"
+LOGIN_REJECTED = "login_rejected"
+MAINTENANCE = "maintenance"
+NETWORK = "network"
+BROWSER_CRASHED = "browser_crashed"
+UNKNOWN = "unknown"
+
+# 恢复方式
+RELOAD = "reload"            # 保留上下文与页面，重新导航
+NEW_CONTEXT = "new_context"  # 关闭上下文，新建一个（浏览器继续复用）
+RELAUNCH = "relaunch"        # 重启浏览器
+GIVE_UP = "give_up"          # 本轮不再重试
+
+RECOVERY_LABELS = {RELOAD: "原页面重新导航", NEW_CONTEXT: "新建浏览器上下文", RELAUNCH: "重启浏览器", GIVE_UP: "放弃"}
+
+# 失败类型 -> (恢复方式, 是否计入站点熔断)
+POLICY = {
+    NAVIGATION_TIMEOUT: (RELOAD, True),
+    FRAME_MISSING: (RELOAD, False),
+    NETWORK: (NEW_CONTEXT, True),
+    BROWSER_CRASHED: (RELAUNCH, False),
+    MAINTENANCE: (GIVE_UP, True),
+    # 账号密码错误时反复登录可能导致账号被锁定
+    LOGIN_REJECTED: (GIVE_UP, False),
+    UNKNOWN: (NEW_CONTEXT, False),
+}
+
+_NETWORK_PATTERN = re.compile(r"net::ERR_|ECONNREFUSED|ECONNRESET|ENOTFOUND|EAI_AGAIN|Name or service not known", re.I)
+_CRASH_PATTERN = re.compile(r"(Target|Browser|context).{0,30}(closed|crashed)|Connection closed|has disconnected", re.I)
+
+
+class FrameMissing(Exception):
+    """预期的 iframe 不存在或已脱离文档"""
+
+
+class LoginRejected(Exception):
+    """提交登录后仍停留在登录页（账号密码错误或账号被锁定）"""
+
+
+@dataclass
+class Failure:
+    kind: str
+    recovery: str
+    site_fault: bool
+
+    def delay(self, attempt, base):
+        """指数退避加抖动：第 attempt 次（从 0 起）失败后等待 [d/2, d] 秒，d = min(上限, 基数 × 2^attempt)"""
+        if self.recovery == RELOAD:
+            base = min(base, RELOAD_BACKOFF_SECONDS)
+        delay = min(RETRY_BACKOFF_CAP, base * 2 ** attempt)
+        return random.uniform(delay / 2, delay)
+
+    @property
+    def label(self):
+        return RECOVERY_LABELS[self.recovery]
+
+
+def _is_playwright_timeout(error):
+    # 没有加载 playwright 时不可能是它的超时异常，不为了分类 HTTP 快速通道的错误而导入浏览器驱动
+    if "playwright.sync_api" not in sys.modules and "playwright.async_api" not in sys.modules:
+        return False
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+    return isinstance(error, PlaywrightTimeoutError)
+
+
+def classify(error):
+    """按异常类型与信息判断失败类型，返回 Failure（含恢复方式）"""
+    message = str(error)
+    if isinstance(error, page_state.SiteMaintenance):
+        kind = MAINTENANCE
+    elif isinstance(error, LoginRejected):
+        kind = LOGIN_REJECTED
+    elif isinstance(error, FrameMissing) or "detached" in message.lower():
+        kind = FRAME_MISSING
+    elif isinstance(error, (requests.ConnectionError, requests.Timeout)) or _NETWORK_PATTERN.search(message):
+        kind = NETWORK
+    elif _CRASH_PATTERN.search(message):
+        kind = BROWSER_CRASHED
+    elif _is_playwright_timeout(error):
+        kind = NAVIGATION_TIMEOUT
+    else:
+        kind = UNKNOWN
+    recovery, site_fault = POLICY[kind]
+    return Failure(kind, recovery, site_fault)
+
+
+class BrowserScope:
+    """
+    跨重试保持的浏览器上下文与页面：
+    RELOAD 时下一次尝试复用原页面重新导航，NEW_CONTEXT 关闭上下文，RELAUNCH 同时关闭浏览器；退出时关闭上下文。
+    资源策略变化（例如最后一次重试换用全部放行的诊断策略）时总是新建上下文，拦截规则装在上下文上，复用原页面不会生效。
+    """
+
+    def __init__(self, browser_manager):
+        self.browser_manager = browser_manager
+        self.context = None
+        self.page = None
+        self._policy = None
+        self._stack = None
+
+    def acquire(self, storage_state=None, resource_policy=None):
+        if self.page is not None and not self.page.is_closed() and resource_policy is self._policy:
+            return self.context, self.page
+        self.release()
+        self._stack = contextlib.ExitStack()
+        self.context = self._stack.enter_context(
+            self.browser_manager.new_context(storage_state=storage_state, resource_policy=resource_policy))
+        self._policy = resource_policy
+        self.page = self.context.new_page()
+        return self.context, self.page
+
+    def release(self):
+        stack, self._stack, self.context, self.page, self._policy = self._stack, None, None, None, None
+        if stack:
+            stack.close()
+
+    def recover(self, recovery):
+        if recovery == RELOAD:
+            return
+        self.release()
+        if recovery == RELAUNCH:
+            self.browser_manager.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+# ----------------------------------------------------------------------
+# 按站点熔断
+# ----------------------------------------------------------------------
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    """
+    按站点（域名）熔断：连续 CIRCUIT_FAILURE_THRESHOLD 次站点侧失败（网络不通、导航超时、维护页）后熔断，
+    熔断期间的检查直接跳过，不再请求站点，也不启动浏览器；冷却结束后进入半开状态，只放行一次试探，
+    试探进行中其他检查仍然跳过。试探成功则恢复；试探中的任何失败（不只是站点侧失败）都重新熔断并把冷却时间翻倍。
+    状态持久化，重启后仍然有效。
+    """
+
+    def __init__(self, site, registry):
+        self.site = site
+        self._registry = registry
+        self.state = registry.data.setdefault(site, {})
+        self.state.setdefault("state", CLOSED)
+        self.state.setdefault("failures", 0)
+        self.state.setdefault("cooldown", CIRCUIT_COOLDOWN)
+        self.state.setdefault("trips", 0)
+
+    def remaining(self, now=None):
+        """距离允许试探还有多少秒（未熔断时为 0）"""
+        if self.state["state"] != OPEN:
+            return 0.0
+        return max(0.0, self.state["opened_at"] + self.state["cooldown"] - (now or time.time()))
+
+    def describe(self):
+        if self.state["state"] == HALF_OPEN:
+            return f"站点 {self.site} 熔断后的试探正在进行（最近一次失败：{self.state.get('last_failure')}）"
+        return f"站点 {self.site} 熔断中（最近一次失败：{self.state.get('last_failure')}），约 {self.remaining() / 60:.0f} 分钟后试探"
+
+    def is_open(self):
+        """是否处于熔断中（不放行试探）；同一次检查内的后续尝试用它判断，不会占用试探名额"""
+        return self.state["state"] == OPEN
+
+    def allow(self, now=None):
+        """本次检查是否允许访问站点；冷却结束后只有第一个调用者获得试探名额"""
+        now = now or time.time()
+        with self._registry.lock:
+            if self.state["state"] == CLOSED:
+                return True
+            if self.state["state"] == OPEN and self.remaining(now) > 0:
+                return False
+            if self.state["state"] == HALF_OPEN and now - self.state.get("probe_started", 0) < CIRCUIT_PROBE_TIMEOUT:
+                return False
+            self.state.update(state=HALF_OPEN, probe_started=now)
+            self._registry.persist()
+        print(f"  -> [熔断] 站点 {self.site} 冷却结束，放行一次试探。")
+        return True
+
+    def record_success(self):
+        with self._registry.lock:
+            if self.state["state"] == CLOSED and not self.state["failures"]:
+                return
+            recovered = self.state["state"] != CLOSED
+            self.state.update(state=CLOSED, failures=0, cooldown=CIRCUIT_COOLDOWN)
+            self._registry.persist()
+        if recovered:
+            print(f"  -> [熔断] 站点 {self.site} 已恢复。")
+
+    def record_failure(self, kind, site_fault=True):
+        """记录一次失败；非站点侧失败（site_fault=False）只在试探期间生效，使试探失败并重新熔断"""
+        now = time.time()
+        with self._registry.lock:
+            if not site_fault and self.state["state"] != HALF_OPEN:
+                return
+            self.state["failures"] += 1
+            self.state["last_failure"] = kind
+            if self.state["state"] == HALF_OPEN:
+                cooldown = min(self.state["cooldown"] * 2, CIRCUIT_MAX_COOLDOWN)
+            elif self.state["state"] == CLOSED and self.state["failures"] >= CIRCUIT_FAILURE_THRESHOLD:
+                cooldown = self.state["cooldown"]
+            else:
+                self._registry.persist()
+                return
+            self.state.update(state=OPEN, opened_at=now, cooldown=cooldown)
+            self.state["trips"] += 1
+            self._registry.persist()
+        print(f"  -> [熔断] 站点 {self.site} 连续失败（最近一次：{kind}），暂停访问 {cooldown / 60:.0f} 分钟"
+              f"（累计熔断 {self.state['trips']} 次）。")
+
+
+class _BreakerRegistry:
+    """同一进程内的所有站点熔断器共用一个状态文件"""
+
+    def __init__(self, path):
+        self.lock = threading.RLock()
+        # 演练模式下熔断状态只在本进程内生效，不写回状态文件
+        self.read_only = False
+        self._store = SessionStore(path)
+        self.data = self._store.load() or {}
+        self.breakers = {}
+
+    def persist(self):
+        if self.read_only:
+            return
+        try:
+            self._store.save(self.data)
+        except OSError as e:
+            print(f"  -> [错误] 保存熔断状态到 {self._store.path} 失败: {e}")
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def site_of(url):
+    return urlparse(url or "").hostname or "default"
+
+
+def _get_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = _BreakerRegistry(CIRCUIT_FILE)
+        return _registry
+
+
+def set_read_only(read_only=True):
+    """演练（--dry-run）时调用：熔断器照常判断，但不把状态写回 CIRCUIT_FILE"""
+    _get_registry().read_only = read_only
+
+
+def get_breaker(site):
+    """进程内共享的站点熔断器；site 可以是域名或完整URL"""
+    if "/" in site:
+        site = site_of(site)
+    registry = _get_registry()
+    with _registry_lock:
+        breaker = registry.breakers.get(site)
+        if breaker is None:
+            breaker = registry.breakers[site] = CircuitBreaker(site, registry)
+        return breaker
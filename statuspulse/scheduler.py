@@ -0,0 +1,243 @@
+import time
+import random
+import datetime
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+
+
+# 没有任何任务到期时的最长等待时间（秒），仅用于兜底系统时间被调整的情况
+MAX_IDLE_WAIT = 3600
+# 超时且 on_timeout 处理后仍未结束的任务，再过这么多秒放弃其工作线程（秒）
+ABANDON_AFTER = 120
+
+
+@dataclass
+class QuietHours:
+    """静默时段 [start, end)（小时），跨午夜时 start > end，例如 (23, 6)"""
+    start: int
+    end: int
+
+    def contains(self, moment):
+        hour = moment.hour + moment.minute / 60
+        if self.start < self.end:
+            return self.start <= hour < self.end
+        return hour >= self.start or hour < self.end
+
+    def next_end(self, moment):
+        """静默时段结束的时刻（moment 之后第一个 end 点）"""
+        end = moment.replace(hour=self.end, minute=0, second=0, microsecond=0)
+        if end <= moment:
+            end += datetime.timedelta(days=1)
+        return end
+
+    def describe(self):
+        return f"{self.start:02d}:00-{self.end:02d}:00"
+
+
+@dataclass
+class Job:
+    """一个周期任务。jitter 为每次运行前的随机偏移区间（秒），at_minute 固定在每小时的第几分钟运行"""
+    name: str
+    func: object
+    interval: float
+    jitter: tuple = (0, 0)
+    timeout: float = None
+    quiet_hours: QuietHours = None
+    at_minute: int = None
+    # 动态周期：返回下一次运行前的间隔（秒），例如自适应轮询；为 None 时使用固定的 interval
+    interval_func: object = None
+    # 超时回调 on_timeout(job)，在单独的线程中调用，用于结束卡住的浏览器等
+    on_timeout: object = None
+    next_run: float = None
+    running: bool = False
+    started_at: float = None
+    timed_out: bool = False
+    runs: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    abandoned: int = 0
+    # 每放弃一次工作线程加一，旧线程迟到的完成回调据此忽略
+    generation: int = 0
+    last_duration: float = None
+    executor: ThreadPoolExecutor = field(default=None, repr=False)
+
+
+class Scheduler:
+    """
+    事件驱动的调度器：算出所有任务中最近的到期时间，一直睡到那一刻（或被 wake() 唤醒），
+    不再每秒轮询。每个任务在自己的工作线程中执行（同一任务始终是同一个线程，
+    因此任务内可以安全地使用 Playwright 同步API），慢任务不会拖住其他任务；同一任务不会重叠执行。
+    随机延迟与静默时段在计算下一次运行时间时处理，任务本身不再 sleep。
+    超过 timeout 的任务先调用其 on_timeout（例如结束浏览器进程树让任务自行退出），
+    再过 abandon_after 秒仍未结束则放弃该工作线程、换一个新线程继续调度（Python 无法强制结束线程）。
+    """
+
+    def __init__(self, abandon_after=ABANDON_AFTER):
+        self.jobs = []
+        self.abandon_after = abandon_after
+        self._cond = threading.Condition()
+        self._stopped = False
+
+    @staticmethod
+    def _new_executor(name):
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"job-{name}")
+
+    def add_job(self, name, func, interval_minutes=60, jitter=(0, 0), timeout=None, quiet_hours=None, at_minute=None,
+                interval_func=None, on_timeout=None):
+        """注册任务；不指定 at_minute 的同周期任务会在周期内均匀错开"""
+        job = Job(name=name, func=func, interval=interval_minutes * 60, jitter=tuple(jitter), timeout=timeout,
+                  quiet_hours=QuietHours(*quiet_hours) if quiet_hours else None, at_minute=at_minute,
+                  interval_func=interval_func, on_timeout=on_timeout, executor=self._new_executor(name))
+        with self._cond:
+            self.jobs.append(job)
+            self._spread(job.interval)
+            self._cond.notify()
+        return job
+
+    # ------------------------------------------------------------------
+    # 计算下一次运行时间
+    # ------------------------------------------------------------------
+    def _spread(self, interval, now=None):
+        """同一周期、未固定分钟的任务在周期内等距排开首次运行时间"""
+        now = now or time.time()
+        group = [j for j in self.jobs if j.interval == interval and j.at_minute is None and j.runs == 0]
+        for index, job in enumerate(group):
+            job.next_run = self._apply_constraints(job, now + interval * index / len(group))
+        for job in self.jobs:
+            if job.next_run is None:
+                job.next_run = self._apply_constraints(job, self._aligned(job, now))
+
+    @staticmethod
+    def _aligned(job, after):
+        """at_minute 任务：after 之后第一个“整点 + at_minute 分”且落在周期网格上的时刻"""
+        moment = datetime.datetime.fromtimestamp(after)
+        base = moment.replace(hour=0, minute=job.at_minute, second=0, microsecond=0).timestamp()
+        steps = max(0, int((after - base) // job.interval) + 1)
+        return base + steps * job.interval
+
+    @staticmethod
+    def _apply_constraints(job, when):
+        when += random.uniform(*job.jitter)
+        if job.quiet_hours:
+            moment = datetime.datetime.fromtimestamp(when)
+            if job.quiet_hours.contains(moment):
+                when = job.quiet_hours.next_end(moment).timestamp() + random.uniform(*job.jitter)
+        return when
+
+    def _interval(self, job):
+        if job.interval_func is None:
+            return job.interval
+        try:
+            return job.interval_func()
+        except Exception as e:
+            print(f"  -> [调度] 计算任务 '{job.name}' 的动态周期失败（{type(e).__name__}: {e}），使用固定周期。")
+            return job.interval
+
+    def _schedule_next(self, job, finished_at):
+        if job.at_minute is not None:
+            base = self._aligned(job, finished_at)
+        else:
+            interval = self._interval(job)
+            base = job.started_at + interval
+            if base <= finished_at:  # 任务执行时间超过周期时，不补跑错过的轮次
+                base = finished_at + interval
+        job.next_run = self._apply_constraints(job, base)
+
+    # ------------------------------------------------------------------
+    # 执行
+    # ------------------------------------------------------------------
+    def _dispatch(self, job):
+        job.running, job.timed_out = True, False
+        job.started_at = time.time()
+        job.runs += 1
+        future = job.executor.submit(job.func)
+        future.add_done_callback(
+            lambda f, job=job, generation=job.generation, started_at=job.started_at:
+            self._finished(job, f, generation, started_at))
+
+    def _finished(self, job, future, generation, started_at):
+        finished_at = time.time()
+        error = future.exception()
+        with self._cond:
+            if generation != job.generation:
+                print(f"  -> [调度] 已放弃的任务 '{job.name}' 在运行 {finished_at - started_at:.0f} 秒后才结束。")
+                return
+            job.running = False
+            job.last_duration = finished_at - job.started_at
+            if error is not None:
+                job.failures += 1
+                print(f"  -> [调度] 任务 '{job.name}' 异常结束: {type(error).__name__} - {error}")
+            self._schedule_next(job, finished_at)
+            self._cond.notify()
+
+    def _check_timeouts(self, now):
+        for job in self.jobs:
+            if not (job.running and job.timeout):
+                continue
+            if not job.timed_out and now - job.started_at > job.timeout:
+                job.timed_out = True
+                job.timeouts += 1
+                print(f"  -> [调度] 任务 '{job.name}' 已运行 {now - job.started_at:.0f} 秒，超过时限 {job.timeout:.0f} 秒；"
+                      f"在其结束前不会启动新一轮。")
+                if job.on_timeout:
+                    threading.Thread(target=self._handle_timeout, args=(job,), name=f"timeout-{job.name}",
+                                     daemon=True).start()
+            elif job.timed_out and self.abandon_after is not None \
+                    and now - job.started_at > job.timeout + self.abandon_after:
+                self._abandon(job, now)
+
+    @staticmethod
+    def _handle_timeout(job):
+        try:
+            job.on_timeout(job)
+        except Exception as e:
+            print(f"  -> [调度] 任务 '{job.name}' 的超时处理失败: {type(e).__name__} - {e}")
+
+    def _abandon(self, job, now):
+        """放弃卡死的工作线程：旧线程留给 Python 自行结束，后续轮次在新线程中执行"""
+        job.generation += 1
+        job.abandoned += 1
+        job.executor.shutdown(wait=False)
+        job.executor = self._new_executor(job.name)
+        job.running = False
+        print(f"  -> [调度] 任务 '{job.name}' 超时后仍未结束，已放弃其工作线程（累计 {job.abandoned} 次）。")
+        self._schedule_next(job, now)
+
+    def _next_deadline(self):
+        deadlines = [j.next_run for j in self.jobs if not j.running]
+        for j in self.jobs:
+            if j.running and j.timeout:
+                if not j.timed_out:
+                    deadlines.append(j.started_at + j.timeout)
+                elif self.abandon_after is not None:
+                    deadlines.append(j.started_at + j.timeout + self.abandon_after)
+        return min(deadlines) if deadlines else None
+
+    def run_forever(self):
+        """主循环：睡到最近的到期时间，派发到期任务，直到 stop()"""
+        with self._cond:
+            for job in self.jobs:
+                print(f"  -> [调度] 任务 '{job.name}' 下次运行时间："
+                      f"{datetime.datetime.fromtimestamp(job.next_run).strftime('%Y-%m-%d %H:%M:%S')}")
+            while not self._stopped:
+                now = time.time()
+                self._check_timeouts(now)
+                for job in self.jobs:
+                    if not job.running and job.next_run <= now:
+                        self._dispatch(job)
+                deadline = self._next_deadline()
+                wait = MAX_IDLE_WAIT if deadline is None else min(MAX_IDLE_WAIT, max(0.0, deadline - time.time()))
+                self._cond.wait(timeout=wait)
+
+    def wake(self):
+        """立即重新计算到期时间（例如新增任务后）"""
+        with self._cond:
+            self._cond.notify()
+
+    def stop(self, wait=False):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        for job in self.jobs:
+            job.executor.shutdown(wait=wait)
@@ -0,0 +1,124 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+
+
+class SessionStore:
+    """
+    会话状态文件（storage_state 等）的持久化：
+    - 内容与上次写入/读取时相同（按哈希判断）则跳过写入，减少闪存写入次数；
+    - 先写临时文件并 fsync，再原子替换，写到一半崩溃不会留下损坏的文件；
+    - 替换前把当前文件保留为 .bak（最近一次完好的版本），主文件损坏时自动回退读取。
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.backup_path = self.path.with_name(self.path.name + ".bak")
+        self._digest = None
+        # 主文件是否为已验证完好的版本（只有完好的文件才会被保留为备份）
+        self._primary_ok = False
+        self.writes = 0
+        self.skipped = 0
+        self.recovered = 0
+        # 检查任务与保活任务在不同线程中写同一个文件
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _serialize(data):
+        # 紧凑格式、键排序，保证相同内容序列化结果一致
+        return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+    def _read(self, path):
+        raw = path.read_bytes()
+        data = json.loads(raw)
+        if not isinstance(data, dict):
+            raise ValueError("顶层不是 JSON 对象")
+        return data
+
+    def load(self):
+        """读取会话文件；主文件缺失或损坏时读取 .bak，都不可用时返回 None"""
+        with self._lock:
+            return self._load()
+
+    def _load(self):
+        for path in (self.path, self.backup_path):
+            if not path.exists():
+                continue
+            try:
+                data = self._read(path)
+            except (ValueError, OSError) as e:
+                print(f"  -> [警告] 会话文件 {path} 无法读取（{e}），尝试使用备份。")
+                continue
+            self._primary_ok = path == self.path
+            if path == self.backup_path:
+                self.recovered += 1
+                print(f"  -> [会话] 已从备份 {path} 恢复会话状态。")
+            self._digest = hashlib.sha256(self._serialize(data)).hexdigest()
+            return data
+        if not self.path.exists():
+            print(f"  -> [信息] 会话文件 {self.path} 不存在，将以首次运行模式启动。")
+        return None
+
+    def save(self, data):
+        """内容未变化时跳过写入，返回 True 表示实际写入了磁盘"""
+        with self._lock:
+            return self._save(data)
+
+    def replace(self, data, expected):
+        """
+        仅当文件内容仍是 expected（此前 load() 的结果）时保存 data（内容相同时照常跳过写盘）；
+        返回 False 表示文件已被其他写入者更新，本次没有保存。
+        用于“读取 -> 网络请求 -> 写回”的场景：期间其他线程或进程写入的新内容不会被旧数据覆盖。
+        """
+        with self._lock:
+            if self._load() != expected:
+                return False
+            self._save(data)
+            return True
+
+    def _save(self, data):
+        payload = self._serialize(data)
+        digest = hashlib.sha256(payload).hexdigest()
+        if digest == self._digest:
+            self.skipped += 1
+            return False
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=self.path.name + ".", suffix=".tmp", dir=self.path.parent)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o600)
+            if self._primary_ok and self.path.exists():
+                # 当前文件是上次成功读写的版本，保留为备份
+                os.replace(self.path, self.backup_path)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self._fsync_dir()
+        self._digest = digest
+        self._primary_ok = True
+        self.writes += 1
+        return True
+
+    def _fsync_dir(self):
+        try:
+            fd = os.open(self.path.parent, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def stats(self):
+        return {"writes": self.writes, "skipped": self.skipped, "recovered": self.recovered}
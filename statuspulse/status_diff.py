@@ -0,0 +1,113 @@
+from dataclasses import dataclass
+
+from . import page_selectors as sel
+
+
+NOT_LISTED = "(已不在列表中)"
+
+
+@dataclass
+class Change:
+    """一条稿件（或菜单文件夹）的状态变化"""
+    key: str
+    old: str
+    new: str
+    kind: str  # changed / added / removed / folder
+
+    def describe(self):
+        return f"[{self.key}] {self.old} -> {self.new}"
+
+
+def _column(headers, header_text, default_index):
+    for index, header in enumerate(headers):
+        if header.strip().lower() == header_text.lower():
+            return index
+    return default_index
+
+
+def manuscripts_from_page(page_snapshot):
+    """把稿件表格的每一行转换为 {稿件号: {"title", "status", "row"}}，行顺序变化不影响结果"""
+    headers = page_snapshot.headers or []
+    number_col = _column(headers, sel.MANUSCRIPT_NUMBER_HEADER, sel.MANUSCRIPT_NUMBER_COLUMN_INDEX)
+    title_col = _column(headers, sel.TITLE_HEADER, sel.TITLE_COLUMN_INDEX)
+    status_col = _column(headers, sel.STATUS_HEADER, sel.STATUS_COLUMN_INDEX)
+
+    manuscripts = {}
+    for row in page_snapshot.rows:
+        cells = row["cells"]
+        if len(cells) <= status_col:
+            continue
+        number = cells[number_col] if len(cells) > number_col else ""
+        title = cells[title_col] if len(cells) > title_col else ""
+        # 尚未分配稿件号（如未完成的投稿）时退回到标题作为键
+        key = number or title or row["id"]
+        manuscripts[key] = {"title": title, "status": cells[status_col], "row": row["id"]}
+    return manuscripts
+
+
+def folders_from_page(page_snapshot):
+    """主菜单中计数大于 0 的文件夹 {名称: 数量}"""
+    return {item.label: item.count for item in page_snapshot.active_items}
+
+
+def build_status_snapshot(detail_page=None, menu_page=None):
+    """
+    组合一次检查的完整快照。folders 为 None 表示本次没有看到主菜单（例如直接落在详情页），
+    此时不对文件夹做比对。
+    """
+    return {
+        "manuscripts": manuscripts_from_page(detail_page) if detail_page else {},
+        "folders": folders_from_page(menu_page) if menu_page else None,
+    }
+
+
+def diff_snapshots(old, new):
+    """逐稿件比对两次快照，返回变化列表；old 为 None 时返回空列表（首次建立基线）"""
+    if not old:
+        return []
+    changes = []
+    old_ms, new_ms = old.get("manuscripts") or {}, new.get("manuscripts") or {}
+    for key, entry in new_ms.items():
+        previous = old_ms.get(key)
+        if previous is None:
+            changes.append(Change(key, NOT_LISTED, entry["status"], "added"))
+        elif previous["status"] != entry["status"]:
+            changes.append(Change(key, previous["status"], entry["status"], "changed"))
+    # 表格为空而菜单显示仍有投稿时，多半是详情页没加载全，不报“移除”
+    if new_ms or not new.get("folders"):
+        for key, previous in old_ms.items():
+            if key not in new_ms:
+                changes.append(Change(key, previous["status"], NOT_LISTED, "removed"))
+
+    old_folders, new_folders = old.get("folders"), new.get("folders")
+    if old_folders is not None and new_folders is not None:
+        for name in sorted(set(old_folders) | set(new_folders)):
+            before, after = old_folders.get(name, 0), new_folders.get(name, 0)
+            if before != after:
+                changes.append(Change(name, f"{before} 篇", f"{after} 篇", "folder"))
+    return changes
+
+
+def merge_snapshots(old, new):
+    """
+    比对前把上一次快照中本次看不到的信息带入本次快照：
+    - 本次没看到主菜单时沿用上一次的文件夹计数；
+    - 每次只读取一个文件夹的表格，稿件移到其他文件夹后就不在表格中了。文件夹计数显示表格之外还有稿件时，
+      离开表格的稿件沿用上一次的状态（标记 elsewhere），不报“移除”；文件夹计数的变化照常通知，
+      稿件回到表格时再与沿用的状态比对。表格之外的稿件数不足以容纳时，多出的才算真正移除。
+    """
+    if not old:
+        return new
+    if new.get("folders") is None:
+        new = dict(new, folders=old.get("folders"))
+    folders = new["folders"]
+    if folders is None:
+        return new
+    old_ms, new_ms = old.get("manuscripts") or {}, new.get("manuscripts") or {}
+    outside = sum(folders.values()) - len(new_ms)
+    # 刚离开表格的稿件优先沿用，其次是之前就已不在表格中的
+    missing = sorted((key for key in old_ms if key not in new_ms), key=lambda key: bool(old_ms[key].get("elsewhere")))
+    carried = {key: dict(old_ms[key], elsewhere=True) for key in missing[:max(0, outside)]}
+    if not carried:
+        return new
+    return dict(new, manuscripts={**new_ms, **carried})
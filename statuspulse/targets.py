@@ -0,0 +1,124 @@
+import os
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+TARGETS_FILE = Path(os.getenv("TARGETS_FILE", "targets.json"))
+STATE_DIR = Path(os.getenv("STATE_DIR", "state"))
+# 兼容旧版单账号部署：未提供 targets.json 时沿用 journal_data.json
+LEGACY_STATUS_FILE = Path("journal_data.json")
+
+
+@dataclass
+class Target:
+    """一个监控目标：某个期刊站点上的某个账号，以及对应的通知收信人"""
+    name: str
+    target_url: str
+    username: str
+    password: str
+    openid: str = None
+    state_file: Path = None
+    interval_minutes: int = 60
+    # 常驻调度模式下每次检查前的随机偏移区间（秒），未设置时使用全局 initial_delay
+    jitter: tuple = None
+
+    def __post_init__(self):
+        if self.state_file is None:
+            self.state_file = STATE_DIR / f"{self.name}.json"
+        self.state_file = Path(self.state_file)
+
+    @property
+    def domain(self):
+        """站点域名，用于按站点限流"""
+        return urlparse(self.target_url).netloc
+
+
+@dataclass
+class EngineConfig:
+    """并发检查引擎的配置"""
+    targets: list = field(default_factory=list)
+    # 全局同时进行的检查数
+    concurrency: int = 4
+    # 同一站点同时进行的检查数
+    per_domain_limit: int = 2
+    # 同一站点两次检查开始之间的最小间隔（秒）
+    per_domain_interval: float = 5.0
+    # 每个目标开始前的随机延迟区间（秒）
+    initial_delay: tuple = (1, 15)
+    # 常驻调度模式：静默时段（小时，[start, end)）与单个目标检查的超时（秒）
+    quiet_hours: tuple = (1, 6)
+    check_timeout: float = 900
+    # 自适应轮询：以各目标的 interval_minutes 为基准周期，在上下限之间调整；daily_budget 为每个站点每天的检查次数上限
+    adaptive: bool = True
+    poll_floor_minutes: float = 15
+    poll_ceiling_minutes: float = 720
+    daily_budget: int = 48
+    # 只检查与比对，不写入状态、不发送通知（一次性模式的 --dry-run）
+    dry_run: bool = False
+
+
+def _resolve(entry, key):
+    """配置项既可直接写值，也可用 <key>_env 指向环境变量（推荐用于密码）"""
+    if entry.get(f"{key}_env"):
+        return os.getenv(entry[f"{key}_env"])
+    return entry.get(key)
+
+
+def target_from_dict(entry):
+    """把 targets.json 中的一项转换为 Target"""
+    return Target(
+        name=entry["name"],
+        target_url=_resolve(entry, "target_url"),
+        username=_resolve(entry, "username"),
+        password=_resolve(entry, "password"),
+        openid=_resolve(entry, "openid"),
+        state_file=entry.get("state_file"),
+        interval_minutes=entry.get("interval_minutes", 60),
+        jitter=tuple(entry["jitter"]) if entry.get("jitter") else None,
+    )
+
+
+def legacy_target():
+    """由 .env 中的 JOURNAL_USERNAME / JOURNAL_PASSWORD / TARGET_URL / OPENID 构造单个目标"""
+    return Target(
+        name="default",
+        target_url=os.getenv("TARGET_URL"),
+        username=os.getenv("JOURNAL_USERNAME"),
+        password=os.getenv("JOURNAL_PASSWORD"),
+        openid=os.getenv("OPENID"),
+        state_file=LEGACY_STATUS_FILE,
+    )
+
+
+def load_config(path=None):
+    """读取 targets.json；文件不存在时退回到 .env 中的单账号配置"""
+    path = Path(path) if path else TARGETS_FILE
+    if not path.exists():
+        print(f"  -> [信息] 未找到目标配置 {path}，使用 .env 中的单账号配置。")
+        return EngineConfig(targets=[legacy_target()])
+
+    with open(path, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+    quiet_hours = raw.get("quiet_hours", [1, 6])  # 设为 null 表示不设静默时段
+    config = EngineConfig(
+        targets=[target_from_dict(entry) for entry in raw.get("targets", [])],
+        concurrency=raw.get("concurrency", 4),
+        per_domain_limit=raw.get("per_domain_limit", 2),
+        per_domain_interval=raw.get("per_domain_interval", 5.0),
+        initial_delay=tuple(raw.get("initial_delay", (1, 15))),
+        quiet_hours=tuple(quiet_hours) if quiet_hours else None,
+        check_timeout=raw.get("check_timeout", 900),
+        adaptive=raw.get("adaptive", True),
+        poll_floor_minutes=raw.get("poll_floor_minutes", 15),
+        poll_ceiling_minutes=raw.get("poll_ceiling_minutes", 720),
+        daily_budget=raw.get("daily_budget", 48),
+    )
+    names = [t.name for t in config.targets]
+    if len(names) != len(set(names)):
+        raise ValueError(f"{path} 中存在重复的目标名称: {names}")
+    return config
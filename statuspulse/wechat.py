@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import datetime
+import threading
+import requests
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from .metrics import metrics
+
+
+load_dotenv()
+
+# 从测试号信息获取
+appID = os.getenv("APPID")
+appSecret = os.getenv("APPSECRET")
+#收信人ID即 用户列表中的微信号，见上文
+openId = os.getenv("OPENID")
+# 审稿状态变更通知模板ID
+status_template_id = os.getenv("STATUS_TEMPLATE_ID")
+
+# 微信接口地址；基准测试时可指向本地替身服务器（benchmarks/mock_wechat_server.py）
+WECHAT_API_BASE = os.getenv("WECHAT_API_BASE", "https://api.weixin.qq.com").rstrip("/")
+TOKEN_CACHE_FILE = Path(os.getenv("WECHAT_TOKEN_FILE", "wechat_token.json"))
+# 距离过期不足该秒数时提前刷新（微信 token 有效期 7200 秒）
+TOKEN_REFRESH_MARGIN = 300
+# 40001: token 无效；40014: token 不合法；42001: token 已过期
+TOKEN_INVALID_ERRCODES = {40001, 40014, 42001}
+# 45009: 接口调用超过频率限制，交给发件箱按退避重试
+RATE_LIMIT_ERRCODES = {45009}
+
+# 所有微信接口调用共用一个 Keep-Alive 会话，避免每条消息都重新握手
+http = requests.Session()
+http.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=16))
+http.mount("http://", HTTPAdapter(pool_connections=2, pool_maxsize=16))
+
+
+class TokenManager:
+    """
+    access_token 管理：内存 + 磁盘缓存，过期前提前刷新。
+    多个发送方同时发现 token 过期时只会有一个去请求 cgi-bin/token（单飞刷新），其余等待并复用结果。
+    """
+
+    def __init__(self, cache_file=TOKEN_CACHE_FILE, refresh_margin=TOKEN_REFRESH_MARGIN):
+        self.cache_file = Path(cache_file)
+        self.refresh_margin = refresh_margin
+        self._token = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self.fetch_count = 0
+        self._load_from_disk()
+
+    def _is_fresh(self):
+        return self._token and time.time() < self._expires_at - self.refresh_margin
+
+    def _load_from_disk(self):
+        try:
+            with open(self.cache_file, 'r') as f:
+                data = json.load(f)
+            if data.get("appid") == (appID or "").strip():
+                self._token, self._expires_at = data.get("access_token"), float(data.get("expires_at", 0))
+        except (OSError, ValueError):
+            pass
+
+    def _save_to_disk(self):
+        tmp_path = self.cache_file.with_suffix(self.cache_file.suffix + ".tmp")
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump({"appid": (appID or "").strip(), "access_token": self._token, "expires_at": self._expires_at}, f)
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            print(f"  -> [警告] 缓存access_token到 {self.cache_file} 失败: {e}")
+
+    def _fetch(self):
+        """请求 cgi-bin/token（调用方需持有锁）"""
+        try:
+            if not (appID or "").strip() or not (appSecret or "").strip():
+                raise ValueError("未配置 APPID / APPSECRET")
+            self.fetch_count += 1
+            url = f'{WECHAT_API_BASE}/cgi-bin/token?grant_type=client_credential&appid={appID.strip()}&secret={appSecret.strip()}'
+            with metrics.span("wechat_token"):
+                response = http.get(url, timeout=10).json()
+        except (requests.RequestException, ValueError) as e:
+            print(f"  -> [错误] 获取access_token失败: {e}")
+            return None
+        access_token = response.get('access_token')
+        if not access_token:
+            print(f"  -> [错误] 从微信API获取access_token失败: {response.get('errmsg', '未知错误')}")
+            return None
+        self._token = access_token
+        self._expires_at = time.time() + int(response.get("expires_in", 7200))
+        self._save_to_disk()
+        return access_token
+
+    def get(self):
+        """返回有效的 access_token，失败时返回 None"""
+        if self._is_fresh():
+            return self._token
+        with self._lock:
+            # 等锁期间可能已被其他线程刷新
+            if self._is_fresh():
+                return self._token
+            # 其他进程（或上次运行）可能已刷新并写入磁盘
+            self._load_from_disk()
+            if self._is_fresh():
+                return self._token
+            return self._fetch()
+
+    def invalidate(self, bad_token):
+        """微信返回 token 无效/过期时调用；只作废与 bad_token 相同的缓存，避免重复刷新"""
+        with self._lock:
+            if self._token == bad_token:
+                self._token, self._expires_at = None, 0.0
+
+
+token_manager = TokenManager()
+
+
+def get_access_token():
+    """获取微信 access token（带缓存）"""
+    return token_manager.get()
+
+
+def send_status_update(access_token, last_status, current_status, to_user=None, check_time=None):
+    """
+    发送微信模板消息，to_user 为空时发送给默认收信人 OPENID，check_time 为空时取当前时间。
+    access_token 可传 None（自动从缓存获取）；token 失效（40001/42001）时作废缓存并重试一次。
+    返回是否发送成功。
+    """
+    check_time_str = check_time or datetime.datetime.now().strftime("%Y年%m月%d日 %H:%M")
+
+    payload = {
+        "touser": to_user or openId,
+        "template_id": status_template_id,
+        "data": {
+            "title": {"value": "您的期刊投稿状态有新的变化！", "color": "#FF0000"},
+            "check_time": {"value": f" {check_time_str}"},
+            "old_status": {"value": f" {last_status}"},
+            "new_status": {"value": f" {current_status}"}
+        }
+    }
+    for attempt in range(2):
+        access_token = access_token or token_manager.get()
+        if not access_token:
+            return False
+        url = f"{WECHAT_API_BASE}/cgi-bin/message/template/send?access_token={access_token}"
+        try:
+            with metrics.span("wechat_send"):
+                response = http.post(url, json=payload, timeout=15)
+                response.raise_for_status()
+                result = response.json()
+        except (requests.RequestException, ValueError) as e:
+            print(f"  -> [错误] 发送微信通知时网络异常: {e}")
+            metrics.inc("wechat_send_total", help="微信模板消息发送次数", result="network_error")
+            return False
+        if result.get("errcode") == 0:
+            print("  -> 微信通知发送成功！")
+            metrics.inc("wechat_send_total", help="微信模板消息发送次数", result="ok")
+            return True
+        if result.get("errcode") in TOKEN_INVALID_ERRCODES and attempt == 0:
+            print(f"  -> [信息] access_token 已失效（errcode {result.get('errcode')}），刷新后重试。")
+            token_manager.invalidate(access_token)
+            access_token = None
+            continue
+        print(f"  -> [错误] 微信通知发送失败: {result.get('errmsg')}, 详细: {result}")
+        outcome = "rate_limited" if result.get("errcode") in RATE_LIMIT_ERRCODES else "api_error"
+        metrics.inc("wechat_send_total", help="微信模板消息发送次数", result=outcome)
+        return False
+    return False
@@ -0,0 +1,187 @@
+import asyncio
+
+import playwright.async_api
+import pytest
+
+from statuspulse import async_engine
+from statuspulse import http_checker
+from statuspulse import retry
+from statuspulse.targets import EngineConfig, Target
+
+
+class FakeStats:
+    transferred_bytes = 0
+
+    def report(self):
+        pass
+
+
+class FakePolicy:
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    def as_diagnostic(self):
+        return self
+
+    async def install_async(self, context):
+        if self.fail:
+            self.fail = False
+            raise RuntimeError("route 安装失败")
+        return FakeStats()
+
+
+class FakeContext:
+    def __init__(self, contexts):
+        self.closed = False
+        contexts.append(self)
+
+    async def close(self):
+        self.closed = True
+
+    async def storage_state(self):
+        return {"cookies": []}
+
+
+class FailingBrowser:
+    """按 failures 依次让 get() 失败（模拟浏览器已被结束），之后正常返回"""
+
+    def __init__(self, failures):
+        self.failures = list(failures)
+        self.contexts = []
+
+    async def get(self):
+        failure = self.failures.pop(0) if self.failures else None
+        if failure == "launch":
+            raise Exception("Browser has been closed")
+        return self
+
+    async def new_context(self, **options):
+        return FakeContext(self.contexts)
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    def no_http(*args):
+        raise http_checker.LoginRequired("需要登录")
+
+    async def scrape_status(target, context, saved):
+        return "Under Review", None
+
+    async def notify_if_changed(*args):
+        pass
+
+    breaker = retry.CircuitBreaker("example.com", retry._BreakerRegistry(str(tmp_path / "circuit.json")))
+    monkeypatch.setattr(http_checker, "check_menu_status", no_http)
+    monkeypatch.setattr(async_engine, "scrape_status", scrape_status)
+    monkeypatch.setattr(async_engine, "notify_if_changed", notify_if_changed)
+    monkeypatch.setattr(async_engine, "load_state", lambda target, dry_run=False: {"last_status": "", "snapshot": None})
+    monkeypatch.setattr(async_engine.retry, "get_breaker", lambda site: breaker)
+    monkeypatch.setattr(retry.Failure, "delay", lambda self, attempt, base: 0)
+    return Target("journal", "https://example.com", "user", "secret", state_file=tmp_path / "journal.json")
+
+
+def check(target, browser):
+    config = EngineConfig(targets=[target], initial_delay=(0, 0))
+    limiter = async_engine.DomainLimiter(1, 0)
+    return asyncio.run(async_engine.check_target(target, browser, config, asyncio.Semaphore(1), limiter))
+
+
+def test_browser_launch_failure_is_classified_and_retried(engine, monkeypatch):
+    monkeypatch.setattr(async_engine, "resource_policy", FakePolicy())
+    browser = FailingBrowser(["launch"])
+    assert check(engine, browser) == "Under Review"
+    assert async_engine.check_results["journal"]["outcome"] == "browser"
+
+
+def test_context_is_closed_when_installing_the_policy_fails(engine, monkeypatch):
+    monkeypatch.setattr(async_engine, "resource_policy", FakePolicy(fail=True))
+    browser = FailingBrowser([])
+    assert check(engine, browser) == "Under Review"
+    assert len(browser.contexts) == 2
+    assert all(context.closed for context in browser.contexts)
+
+
+class FakeSharedBrowser:
+    def __init__(self):
+        self.contexts = []
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    async def close(self):
+        self.connected = False
+
+
+class FakePlaywright:
+    def __init__(self, launched):
+        self.chromium = self
+        self.launched = launched
+
+    async def start(self):
+        return self
+
+    async def launch(self, **kwargs):
+        browser = FakeSharedBrowser()
+        self.launched.append(browser)
+        return browser
+
+    async def stop(self):
+        pass
+
+
+def test_shared_browser_is_reused_until_it_disconnects(monkeypatch):
+    launched = []
+    monkeypatch.setattr(playwright.async_api, "async_playwright", lambda: FakePlaywright(launched))
+
+    async def scenario():
+        browser = async_engine.LazyBrowser(max_uses=3)
+        first = await browser.get()
+        assert await browser.get() is first
+        first.connected = False
+        assert await browser.get() is not first
+        await browser.close()
+
+    asyncio.run(scenario())
+    assert len(launched) == 2
+
+
+def test_killed_shared_browser_is_relaunched(monkeypatch):
+    launched = []
+    monkeypatch.setattr(playwright.async_api, "async_playwright", lambda: FakePlaywright(launched))
+
+    async def scenario():
+        browser = async_engine.LazyBrowser()
+        first = await browser.get()
+        # 看门狗在其他线程中结束进程树，只设置标志、不调用 Playwright API
+        assert browser.kill() == 0
+        assert await browser.get() is not first
+        await browser.close()
+
+    asyncio.run(scenario())
+    assert len(launched) == 2
+
+
+def test_domain_limiter_returns_the_slot_when_cancelled_while_waiting():
+    async def scenario():
+        limiter = async_engine.DomainLimiter(limit=1, interval=60)
+        await limiter.acquire("example.org")
+        limiter.release("example.org")
+        # 第二次需要等满间隔；等待期间被取消，名额必须归还
+        waiting = asyncio.create_task(limiter.acquire("example.org"))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        return limiter._semaphores["example.org"].locked()
+
+    assert asyncio.run(scenario()) is False
+
+
+def test_check_records_phase_spans(engine, monkeypatch):
+    phases = []
+    monkeypatch.setattr(async_engine.metrics, "observe",
+                        lambda name, value, help=None, **labels: phases.append(labels.get("phase")))
+    monkeypatch.setattr(async_engine, "resource_policy", FakePolicy())
+    assert check(engine, FailingBrowser([])) == "Under Review"
+    assert {"load_state", "http_fast_path", "storage_state", "persist_and_notify"} <= set(phases)
@@ -0,0 +1,34 @@
+import threading
+
+from statuspulse import browser_manager
+from statuspulse.browser_manager import BrowserManager
+
+
+class ForeignThreadBrowser:
+    """在其他线程中创建的 Playwright 对象：任何调用都说明违反了线程亲和性"""
+
+    def __getattr__(self, name):
+        raise AssertionError(f"在其他线程中调用了 Playwright API：{name}")
+
+
+def launched_on_another_thread(manager):
+    thread = threading.Thread(target=lambda: setattr(manager, "_owner_thread", threading.get_ident()))
+    thread.start()
+    thread.join()
+    manager._browser = ForeignThreadBrowser()
+    manager._playwright = ForeignThreadBrowser()
+    manager._driver_pids = {123}
+
+
+def test_new_worker_thread_rebuilds_the_browser_without_touching_old_objects(monkeypatch):
+    killed = []
+    monkeypatch.setattr(browser_manager, "kill_process_tree", lambda pids: killed.append(pids) or len(pids))
+    monkeypatch.setattr(browser_manager.proc_stats, "tree_pids", lambda roots: sorted(roots))
+    manager = BrowserManager()
+    launched_on_another_thread(manager)
+
+    assert manager._recycle_reason().startswith("工作线程已更换")
+    manager.close()
+    assert killed == [[123]]
+    assert manager._browser is None and manager._playwright is None
+    assert manager._recycle_reason() == "首次启动"
@@ -0,0 +1,42 @@
+import subprocess
+import time
+
+from statuspulse import check_watchdog
+from statuspulse import proc_stats
+
+
+def spawn_tree():
+    """sh 作为直接子进程，sleep 作为它的子进程（模拟驱动 + Chromium）"""
+    shell = subprocess.Popen(["sh", "-c", "sleep 30 & wait"])
+    deadline = time.time() + 5
+    while not proc_stats.children(shell.pid) and time.time() < deadline:
+        time.sleep(0.02)
+    return shell
+
+
+def test_tree_pids_starts_from_the_given_roots():
+    shell, other = spawn_tree(), subprocess.Popen(["sleep", "30"])
+    try:
+        pids = proc_stats.tree_pids([shell.pid])
+        assert shell.pid in pids
+        assert set(proc_stats.children(shell.pid)) <= set(pids)
+        assert other.pid not in pids
+    finally:
+        for proc in (shell, other):
+            proc.kill()
+            proc.wait()
+
+
+def test_kill_leaves_other_children_and_direct_children_to_their_owner():
+    shell, other = spawn_tree(), subprocess.Popen(["sleep", "30"])
+    try:
+        killed = check_watchdog.kill_process_tree(proc_stats.tree_pids([shell.pid]), grace=2)
+        assert killed == 2
+        assert other.poll() is None
+        # 直接子进程不由 reap_zombies 回收，Popen.wait 仍能拿到退出码
+        check_watchdog.reap_zombies()
+        assert shell.wait(timeout=5) is not None
+        assert shell.pid not in check_watchdog._reapable
+    finally:
+        other.kill()
+        other.wait()
@@ -0,0 +1,49 @@
+import argparse
+import json
+
+import pytest
+
+from statuspulse import async_engine
+from statuspulse import cli
+from statuspulse import retry
+from statuspulse.history import HistoryStore
+from statuspulse.targets import EngineConfig, Target
+
+
+@pytest.fixture
+def sweep(monkeypatch):
+    outcomes = {}
+
+    async def run_sweep(config):
+        async_engine.check_results.clear()
+        async_engine.check_results.update({name: {"outcome": o, "seconds": 0.0} for name, o in outcomes.items()})
+        return {name: None for name in outcomes}
+
+    monkeypatch.setattr(async_engine, "run_sweep", run_sweep)
+    monkeypatch.setattr(retry, "set_read_only", lambda read_only=True: None)
+    return outcomes
+
+
+def run(dry_run=True):
+    return cli.run_once(argparse.Namespace(dry_run=dry_run), EngineConfig(targets=[]))[1]
+
+
+def test_circuit_open_is_not_a_failure(sweep):
+    sweep.update(a="http", b="circuit_open")
+    assert run() == 0
+    sweep.update(c="failed")
+    assert run() == 1
+
+
+def test_dry_run_does_not_migrate_legacy_state(tmp_path, monkeypatch):
+    monkeypatch.setattr(async_engine, "history", HistoryStore(str(tmp_path / "history.db")))
+    monkeypatch.setattr(async_engine, "get_coordinator", lambda: None)
+    state_file = tmp_path / "journal.json"
+    state_file.write_text(json.dumps({"last_status": "Under Review", "storage_state": {"cookies": []}}))
+    target = Target("journal-dry-run", "https://example.com", "user", "secret", state_file=state_file)
+
+    saved = async_engine.load_state(target, dry_run=True)
+    assert saved["last_status"] == "Under Review"
+    assert async_engine.history.load_target(target.name) is None
+    assert async_engine.load_state(target)["last_status"] == "Under Review"
+    assert async_engine.history.load_target(target.name) is not None
@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+from statuspulse.coordination import Coordinator, INSTANCE_TTL, SqliteLeaseBackend, rendezvous_owner
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return SqliteLeaseBackend(str(tmp_path / "coord.db"))
+
+
+def join(backend, *names):
+    coordinators = [Coordinator(backend, instance_id=name) for name in names]
+    for coordinator in coordinators:
+        coordinator.beat()
+    return coordinators
+
+
+def test_rendezvous_sharding_only_moves_targets_of_the_leaving_instance():
+    targets = [f"journal-{i}" for i in range(200)]
+    before = {t: rendezvous_owner(t, ["a", "b", "c"]) for t in targets}
+    after = {t: rendezvous_owner(t, ["a", "b"]) for t in targets}
+    assert set(before.values()) == {"a", "b", "c"}
+    assert all(after[t] == owner for t, owner in before.items() if owner != "c")
+
+
+def test_each_target_is_owned_by_exactly_one_live_instance(backend):
+    a, b = join(backend, "a", "b")
+    for name in (f"journal-{i}" for i in range(20)):
+        assert a.owns(name) != b.owns(name)
+
+
+def test_lease_conflict_and_failover(backend):
+    a, b = join(backend, "a", "b")
+    target = next(f"journal-{i}" for i in range(100) if a.owns(f"journal-{i}"))
+    assert a.acquire(target, ttl=60)
+    # 分片视图不一致时另一个实例拿不到仍有效的租约
+    assert backend.try_acquire(target, "b", 60, time.time()) == (False, "a")
+    # a 停止心跳后 b 接管它的目标与租约
+    backend.heartbeat("a", time.time() - INSTANCE_TTL - 1)
+    b.beat()
+    assert b.owns(target)
+    assert b.acquire(target, ttl=60)
+
+
+def test_shared_state_is_handed_over_and_stale_owner_cannot_overwrite(backend):
+    a, b = join(backend, "a", "b")
+    snapshot = {"manuscripts": {"M-1": {"status": "Under Review"}}}
+    assert backend.try_acquire("journal", "a", 60, time.time())[0]
+    assert a.save_state("journal", "Under Review", snapshot, {"cookies": []}, version=None, changed=True)
+    backend.release("journal", "a")
+
+    assert backend.try_acquire("journal", "b", 60, time.time())[0]
+    state = b.load_state("journal")
+    assert state["snapshot"] == snapshot and state["last_status"] == "Under Review"
+    # a 的租约已被 b 接管，a 迟到的结果不能覆盖共享状态
+    assert not a.save_state("journal", "Submitted", None, None, version=state["version"])
+    assert b.save_state("journal", "Accepted", snapshot, None, version=state["version"], changed=True)
+    assert b.load_state("journal")["version"] == state["version"] + 1
+    assert b.save_state("journal", "Accepted", snapshot, None, version=state["version"] + 1)
+    assert b.load_state("journal")["version"] == state["version"] + 1
+
+
+def test_notification_claimed_once_per_observation(backend):
+    a, b = join(backend, "a", "b")
+    assert a.claim_notification("journal", "M-1", "Under Review", "Accepted", observation=3)
+    assert not b.claim_notification("journal", "M-1", "Under Review", "Accepted", observation=3)
+    assert b.claim_notification("journal", "M-1", "Under Review", "Accepted", observation=4)
+    a.forget_notification("journal", "M-1", "Under Review", "Accepted", observation=3)
+    assert b.claim_notification("journal", "M-1", "Under Review", "Accepted", observation=3)
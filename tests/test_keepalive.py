@@ -0,0 +1,30 @@
+import pytest
+
+from statuspulse import http_checker
+from statuspulse.keepalive import SessionKeeper
+from statuspulse.session_store import SessionStore
+
+
+@pytest.fixture
+def keeper(tmp_path):
+    store = SessionStore(tmp_path / "session.json")
+    store.save({"storage_state": {"cookies": ["old"]}})
+    return SessionKeeper("journal", "https://example.com", store, state_path=tmp_path / "keepalive.json")
+
+
+def test_touch_saves_the_refreshed_session(keeper, monkeypatch):
+    monkeypatch.setattr(http_checker, "touch_session", lambda url, state: {"cookies": ["refreshed"]})
+    keeper.touch()
+    assert keeper.session_store.load() == {"storage_state": {"cookies": ["refreshed"]}}
+    assert keeper.state["touches"] == 1
+
+
+def test_touch_does_not_overwrite_a_login_saved_meanwhile(keeper, tmp_path, monkeypatch):
+    def touch_session(url, state):
+        # 保活请求进行中，检查任务（另一个线程或进程）登录并保存了新会话
+        SessionStore(tmp_path / "session.json").save({"storage_state": {"cookies": ["new-login"]}})
+        return {"cookies": ["refreshed-old"]}
+
+    monkeypatch.setattr(http_checker, "touch_session", touch_session)
+    keeper.touch()
+    assert keeper.session_store.load() == {"storage_state": {"cookies": ["new-login"]}}
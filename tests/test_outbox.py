@@ -0,0 +1,136 @@
+import sqlite3
+
+import pytest
+
+from statuspulse import outbox as outbox_module
+from statuspulse import status_diff
+from statuspulse import wechat
+from statuspulse.outbox import Outbox
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """替换微信接口，记录每条发出的 (旧状态, 新状态)"""
+    messages = []
+
+    def send_status_update(_token, old_status, new_status, to_user=None, check_time=None):
+        messages.append((old_status, new_status))
+        return True
+
+    monkeypatch.setattr(wechat, "get_access_token", lambda: "token")
+    monkeypatch.setattr(wechat, "send_status_update", send_status_update)
+    return messages
+
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+    # flush() 会刷新 metrics 文件，放到临时目录中
+    monkeypatch.chdir(tmp_path)
+    return Outbox(str(tmp_path / "outbox.db"))
+
+
+def rows(outbox):
+    with sqlite3.connect(outbox.path) as conn:
+        return conn.execute("SELECT old_status, new_status, state FROM outbox ORDER BY id").fetchall()
+
+
+def test_retry_of_same_observation_is_enqueued_once(outbox):
+    assert outbox.enqueue("t", "A", "B", to_user="u", observation=1)
+    assert outbox.enqueue("t", "A", "B", to_user="u", observation=1)
+    assert len(rows(outbox)) == 1
+
+
+def test_repeated_transition_from_a_new_observation_is_enqueued(outbox, sent):
+    for observation, (old, new) in enumerate([("A", "B"), ("B", "A"), ("A", "B")]):
+        assert outbox.enqueue("t", old, new, to_user="u", observation=observation)
+        outbox.flush()
+    assert sent == [("A", "B"), ("B", "A"), ("A", "B")]
+
+
+def test_dead_notification_does_not_block_requeue(outbox):
+    outbox.enqueue("t", "A", "B", to_user="u", observation=1)
+    with sqlite3.connect(outbox.path) as conn:
+        conn.execute("UPDATE outbox SET state = 'dead'")
+    outbox.enqueue("t", "A", "B", to_user="u", observation=1)
+    assert [r[2] for r in rows(outbox)] == ["dead", "pending"]
+
+
+def test_failed_send_is_retried_with_backoff(outbox, monkeypatch):
+    monkeypatch.setattr(wechat, "get_access_token", lambda: "token")
+    monkeypatch.setattr(wechat, "send_status_update", lambda *a, **k: False)
+    outbox.enqueue("t", "A", "B", to_user="u", observation=1)
+    assert outbox.flush() == 1
+    # 退避期间不再领取
+    assert outbox.flush() == 0
+    with sqlite3.connect(outbox.path) as conn:
+        attempts, next_attempt_at, created_at = conn.execute(
+            "SELECT attempts, next_attempt_at, created_at FROM outbox").fetchone()
+    assert attempts == 1
+    assert next_attempt_at - created_at >= outbox_module.BACKOFF_BASE * 0.8
+
+
+def test_changes_to_different_manuscripts_are_sent_separately(outbox, sent):
+    changes = [
+        status_diff.Change("M1", "With Editor", "Under Review", "changed"),
+        status_diff.Change("M2", "Under Review", "Required Reviews Complete", "changed"),
+        status_diff.Change("Submissions Being Processed", "1 篇", "2 篇", "folder"),
+    ]
+    assert outbox.enqueue_changes("t", changes, to_user="u", observation=1)
+    assert outbox.flush() == 3
+    assert sorted(sent) == sorted([
+        ("[M1] With Editor", "[M1] Under Review"),
+        ("[M2] Under Review", "[M2] Required Reviews Complete"),
+        ("[Submissions Being Processed] 1 篇", "[Submissions Being Processed] 2 篇"),
+    ])
+
+
+def test_pending_changes_to_the_same_manuscript_are_coalesced(outbox, sent):
+    outbox.enqueue("t", "[M1] A", "[M1] B", to_user="u", manuscript="M1", observation=1)
+    outbox.enqueue("t", "[M1] B", "[M1] C", to_user="u", manuscript="M1", observation=2)
+    outbox.enqueue("t", "[M2] A", "[M2] B", to_user="u", manuscript="M2", observation=2)
+    assert outbox.flush() == 2
+    assert sorted(sent) == [("[M1] A", "[M1] C"), ("[M2] A", "[M2] B")]
+    assert outbox.stats.coalesced == 1
+
+
+def test_claimed_rows_are_not_picked_up_twice(outbox):
+    outbox.enqueue("t", "A", "B", to_user="u", observation=1)
+    first = outbox._claim_due()
+    assert len(first) == 1
+    # 另一个线程（或共用 OUTBOX_DB 的进程）同时 flush 时领不到同一条
+    assert Outbox(outbox.path)._claim_due() == []
+    assert [r[2] for r in rows(outbox)] == ["sending"]
+    # 同一观测在发送中也不重复入队
+    assert outbox.enqueue("t", "A", "B", to_user="u", observation=1)
+    assert len(rows(outbox)) == 1
+
+
+def test_stale_claims_return_to_the_queue(outbox, monkeypatch):
+    outbox.enqueue("t", "A", "B", to_user="u", observation=1)
+    assert outbox._claim_due()
+    monkeypatch.setattr(outbox_module, "CLAIM_TIMEOUT", -1)
+    assert len(outbox._claim_due()) == 1
+
+
+def test_worker_survives_unexpected_errors(outbox, monkeypatch):
+    calls = []
+
+    def broken_flush():
+        calls.append(1)
+        if len(calls) == 1:
+            raise AttributeError("'NoneType' object has no attribute 'strip'")
+        outbox._stop.set()
+        outbox._wake.set()
+        return 0
+
+    monkeypatch.setattr(outbox, "flush", broken_flush)
+    monkeypatch.setattr(outbox_module, "BACKOFF_BASE", 0.01)
+    outbox.start()
+    outbox._thread.join(5)
+    assert len(calls) == 2
+
+
+def test_missing_credentials_do_not_raise(monkeypatch, tmp_path):
+    monkeypatch.setattr(wechat, "appID", None)
+    monkeypatch.setattr(wechat, "appSecret", None)
+    assert wechat.TokenManager(cache_file=tmp_path / "token.json")._fetch() is None
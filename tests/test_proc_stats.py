@@ -0,0 +1,16 @@
+import subprocess
+
+from statuspulse import proc_stats
+
+
+def test_sampler_only_counts_the_given_pids():
+    browser, other = subprocess.Popen(["sleep", "30"]), subprocess.Popen(["sleep", "30"])
+    try:
+        sampler = proc_stats.RssSampler(pids=lambda: [browser.pid])
+        assert sampler.sample() == proc_stats.process_rss_bytes(browser.pid) > 0
+        assert proc_stats.RssSampler(pids=lambda: []).sample() == 0
+        assert proc_stats.RssSampler().sample() >= sampler.peak_bytes + proc_stats.process_rss_bytes(other.pid)
+    finally:
+        for proc in (browser, other):
+            proc.kill()
+            proc.wait()
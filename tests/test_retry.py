@@ -0,0 +1,141 @@
+import contextlib
+
+import pytest
+import requests
+
+from statuspulse import page_state
+from statuspulse import retry
+
+
+@pytest.mark.parametrize("error, kind, recovery, site_fault", [
+    (page_state.SiteMaintenance("维护中"), retry.MAINTENANCE, retry.GIVE_UP, True),
+    (retry.LoginRejected("仍在登录页"), retry.LOGIN_REJECTED, retry.GIVE_UP, False),
+    (retry.FrameMissing("没有框架"), retry.FRAME_MISSING, retry.RELOAD, False),
+    (Exception("Frame was detached"), retry.FRAME_MISSING, retry.RELOAD, False),
+    (requests.ConnectionError("refused"), retry.NETWORK, retry.NEW_CONTEXT, True),
+    (Exception("page.goto: net::ERR_NAME_NOT_RESOLVED"), retry.NETWORK, retry.NEW_CONTEXT, True),
+    (Exception("Target page, context or browser has been closed"), retry.BROWSER_CRASHED, retry.RELAUNCH, False),
+    (ValueError("意外"), retry.UNKNOWN, retry.NEW_CONTEXT, False),
+])
+def test_classify(error, kind, recovery, site_fault):
+    assert retry.classify(error) == retry.Failure(kind, recovery, site_fault)
+
+
+@pytest.fixture
+def breaker(tmp_path):
+    return retry.CircuitBreaker("example.com", retry._BreakerRegistry(str(tmp_path / "circuit.json")))
+
+
+def trip(breaker):
+    for _ in range(retry.CIRCUIT_FAILURE_THRESHOLD):
+        breaker.record_failure(retry.NETWORK)
+    assert breaker.is_open()
+
+
+def test_breaker_opens_after_consecutive_site_faults_only(breaker):
+    for _ in range(retry.CIRCUIT_FAILURE_THRESHOLD):
+        breaker.record_failure(retry.UNKNOWN, site_fault=False)
+    assert breaker.allow()
+    trip(breaker)
+    assert not breaker.allow()
+
+
+def test_half_open_allows_exactly_one_probe(breaker):
+    trip(breaker)
+    after_cooldown = breaker.state["opened_at"] + retry.CIRCUIT_COOLDOWN + 1
+    assert breaker.allow(after_cooldown)
+    assert not breaker.is_open()
+    assert not breaker.allow(after_cooldown + 1)
+    # 试探迟迟没有结果时放行新的试探
+    assert breaker.allow(after_cooldown + retry.CIRCUIT_PROBE_TIMEOUT + 1)
+    breaker.record_success()
+    assert breaker.state["state"] == retry.CLOSED
+    assert breaker.allow()
+
+
+def test_any_failed_probe_reopens_with_doubled_cooldown(breaker):
+    trip(breaker)
+    assert breaker.allow(breaker.state["opened_at"] + retry.CIRCUIT_COOLDOWN + 1)
+    breaker.record_failure(retry.LOGIN_REJECTED, site_fault=False)
+    assert breaker.is_open()
+    assert breaker.state["cooldown"] == retry.CIRCUIT_COOLDOWN * 2
+    assert not breaker.allow()
+
+
+def test_breaker_state_survives_restart(tmp_path, breaker):
+    trip(breaker)
+    reloaded = retry.CircuitBreaker("example.com", retry._BreakerRegistry(str(tmp_path / "circuit.json")))
+    assert reloaded.is_open()
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+
+class FakeManager:
+    def __init__(self):
+        self.contexts = []
+        self.closed = 0
+
+    @contextlib.contextmanager
+    def new_context(self, storage_state=None, resource_policy=None):
+        context = type("Context", (), {"new_page": lambda self: FakePage()})()
+        self.contexts.append(resource_policy)
+        yield context
+
+    def close(self):
+        self.closed += 1
+
+
+def test_browser_scope_reuses_the_page_only_for_reload_with_the_same_policy():
+    manager, policy, diagnostic = FakeManager(), object(), object()
+    with retry.BrowserScope(manager) as scope:
+        _, page = scope.acquire(resource_policy=policy)
+        scope.recover(retry.RELOAD)
+        assert scope.acquire(resource_policy=policy)[1] is page
+        scope.recover(retry.RELOAD)
+        assert scope.acquire(resource_policy=diagnostic)[1] is not page
+        scope.recover(retry.RELAUNCH)
+        scope.acquire(resource_policy=diagnostic)
+    assert manager.contexts == [policy, diagnostic, diagnostic]
+    assert manager.closed == 1
+
+
+def test_read_only_breaker_does_not_write_state(tmp_path):
+    registry = retry._BreakerRegistry(str(tmp_path / "circuit.json"))
+    registry.read_only = True
+    breaker = retry.CircuitBreaker("example.com", registry)
+    trip(breaker)
+    assert not breaker.allow()
+    assert not (tmp_path / "circuit.json").exists()
+
+
+class FakeLocator:
+    def __init__(self, appears_after=None, visible=True):
+        self.appears_after = appears_after
+        self.visible = visible
+        self.polls = 0
+
+    def count(self):
+        self.polls += 1
+        return int(self.appears_after is not None and self.polls > self.appears_after)
+
+    def is_visible(self):
+        return self.visible
+
+
+def test_login_rejected_when_the_form_stays_visible():
+    assert page_state.login_rejected(FakeLocator(), FakeLocator(), timeout=1000, settle=50, polling=0.01)
+    assert retry.classify(retry.LoginRejected("仍在登录页")).recovery == retry.GIVE_UP
+
+
+def test_login_accepted_when_the_logged_in_page_appears():
+    assert not page_state.login_rejected(FakeLocator(appears_after=3), FakeLocator(), timeout=1000, settle=500,
+                                         polling=0.01)
+    # 表单消失但登录后页面迟迟不出现：交给调用方按导航超时处理
+    assert not page_state.login_rejected(FakeLocator(), FakeLocator(visible=False), timeout=100, settle=10,
+                                         polling=0.01)
@@ -0,0 +1,67 @@
+import datetime
+import threading
+import time
+
+from statuspulse.scheduler import Job, QuietHours, Scheduler
+
+
+def at(hour, minute=0):
+    return datetime.datetime(2026, 3, 2, hour, minute).timestamp()
+
+
+def test_at_minute_job_is_aligned_to_the_hour_grid():
+    job = Job("check", None, interval=3600, at_minute=35)
+    assert Scheduler._aligned(job, at(10, 12)) == at(10, 35)
+    assert Scheduler._aligned(job, at(10, 35)) == at(11, 35)
+    two_hourly = Job("check", None, interval=7200, at_minute=35)
+    assert Scheduler._aligned(two_hourly, at(11, 40)) == at(12, 35)
+
+
+def test_quiet_hours_push_the_next_run_to_their_end():
+    quiet = QuietHours(1, 6)
+    assert quiet.contains(datetime.datetime.fromtimestamp(at(3)))
+    assert not quiet.contains(datetime.datetime.fromtimestamp(at(6)))
+    job = Job("check", None, interval=3600, quiet_hours=quiet)
+    assert Scheduler._apply_constraints(job, at(2, 30)) == at(6)
+    assert Scheduler._apply_constraints(job, at(7)) == at(7)
+    assert QuietHours(23, 6).contains(datetime.datetime.fromtimestamp(at(23, 30)))
+
+
+def test_jobs_with_the_same_interval_are_spread_over_the_period():
+    scheduler = Scheduler()
+    jobs = [scheduler.add_job(name, lambda: None, interval_minutes=60) for name in ("a", "b", "c")]
+    starts = sorted(job.next_run for job in jobs)
+    assert abs((starts[1] - starts[0]) - 1200) < 5
+    assert abs((starts[2] - starts[1]) - 1200) < 5
+
+
+def test_slow_run_does_not_trigger_catch_up_runs():
+    scheduler = Scheduler()
+    job = scheduler.add_job("check", lambda: None, interval_minutes=1)
+    job.started_at = 1000.0
+    scheduler._schedule_next(job, finished_at=1000.0 + 150)
+    assert job.next_run == 1000.0 + 150 + 60
+
+
+def test_timeout_calls_on_timeout_and_abandons_a_stuck_worker():
+    release = threading.Event()
+    timed_out = threading.Event()
+    scheduler = Scheduler(abandon_after=0.2)
+    job = scheduler.add_job("stuck", release.wait, interval_minutes=60, timeout=0.2,
+                            on_timeout=lambda _job: timed_out.set())
+    job.next_run = time.time()
+    runner = threading.Thread(target=scheduler.run_forever, daemon=True)
+    runner.start()
+    try:
+        assert timed_out.wait(5)
+        deadline = time.time() + 5
+        while job.abandoned == 0 and time.time() < deadline:
+            time.sleep(0.05)
+        assert job.timeouts == 1
+        assert job.abandoned == 1
+        assert not job.running
+        assert job.next_run > time.time()
+    finally:
+        release.set()
+        scheduler.stop()
+
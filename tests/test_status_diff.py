@@ -0,0 +1,75 @@
+from statuspulse.extraction import MenuItem, PageSnapshot
+from statuspulse.status_diff import NOT_LISTED, build_status_snapshot, diff_snapshots, merge_snapshots
+
+HEADERS = ["Action", "Manuscript Number", "Title", "Initial Date Submitted", "Status Date", "Current Status"]
+
+
+def detail(*rows):
+    return PageSnapshot(headers=HEADERS, has_table=True, rows=[
+        {"id": f"row{i}", "cells": ["", number, f"Title {number}", "", "", status]}
+        for i, (number, status) in enumerate(rows, start=1)
+    ])
+
+
+def snapshot(manuscripts, folders):
+    return {
+        "manuscripts": {key: {"title": f"Title {key}", "status": status, "row": "row1"}
+                        for key, status in manuscripts.items()},
+        "folders": folders,
+    }
+
+
+def compare(old, new):
+    new = merge_snapshots(old, new)
+    return new, [(c.key, c.old, c.new, c.kind) for c in diff_snapshots(old, new)]
+
+
+def test_rows_are_keyed_by_manuscript_number_and_order_does_not_matter():
+    menu = PageSnapshot(menu_items=[MenuItem(0, "Submissions Being Processed", 2, "A")])
+    first = build_status_snapshot(detail(("M1", "With Editor"), ("M2", "Under Review")), menu)
+    second = build_status_snapshot(detail(("M2", "Under Review"), ("M1", "With Editor")), menu)
+    assert set(first["manuscripts"]) == {"M1", "M2"}
+    assert diff_snapshots(first, second) == []
+
+
+def test_each_changed_manuscript_is_reported():
+    old = snapshot({"M1": "With Editor", "M2": "Under Review"}, {"Processing": 2})
+    new = snapshot({"M1": "Under Review", "M2": "Reviews Complete"}, {"Processing": 2})
+    _, changes = compare(old, new)
+    assert changes == [("M1", "With Editor", "Under Review", "changed"),
+                       ("M2", "Under Review", "Reviews Complete", "changed")]
+
+
+def test_manuscript_moved_to_an_unread_folder_is_not_reported_removed():
+    old = snapshot({"M1": "Under Review", "M2": "Under Review"}, {"Processing": 2})
+    new = snapshot({"M2": "Under Review"}, {"Processing": 1, "With Decision": 1})
+    merged, changes = compare(old, new)
+    assert changes == [("Processing", "2 篇", "1 篇", "folder"), ("With Decision", "0 篇", "1 篇", "folder")]
+    assert merged["manuscripts"]["M1"]["elsewhere"]
+    assert merged["manuscripts"]["M1"]["status"] == "Under Review"
+
+
+def test_moved_manuscript_is_compared_again_when_it_returns():
+    old = snapshot({"M1": "Under Review", "M2": "Under Review"}, {"Processing": 2})
+    moved, _ = compare(old, snapshot({"M2": "Under Review"}, {"Processing": 1, "With Decision": 1}))
+    _, changes = compare(moved, snapshot({"M1": "Revise", "M2": "Under Review"}, {"Processing": 2}))
+    assert changes == [("M1", "Under Review", "Revise", "changed"),
+                       ("Processing", "1 篇", "2 篇", "folder"), ("With Decision", "1 篇", "0 篇", "folder")]
+
+
+def test_manuscript_is_removed_when_folder_counts_show_it_is_gone():
+    old = snapshot({"M1": "Under Review", "M2": "Under Review"}, {"Processing": 2})
+    merged, changes = compare(old, snapshot({"M2": "Under Review"}, {"Processing": 1}))
+    assert ("M1", "Under Review", NOT_LISTED, "removed") in changes
+    assert "M1" not in merged["manuscripts"]
+
+
+def test_folder_counts_are_carried_over_when_the_menu_was_not_seen():
+    old = snapshot({"M1": "Under Review"}, {"Processing": 1})
+    merged, changes = compare(old, snapshot({"M1": "Under Review"}, None))
+    assert merged["folders"] == {"Processing": 1}
+    assert changes == []
+
+
+def test_no_changes_on_first_run():
+    assert diff_snapshots(None, snapshot({"M1": "Under Review"}, {"Processing": 1})) == []
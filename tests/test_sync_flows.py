@@ -0,0 +1,31 @@
+import pytest
+
+from statuspulse import login, main
+
+
+@pytest.fixture(params=[main, login], ids=["main", "login"])
+def flow(request, monkeypatch):
+    module = request.param
+    saved = []
+    monkeypatch.setattr(module, "save_data", lambda *args, **kwargs: saved.append(args))
+    monkeypatch.setattr(module.outbox, "enqueue_changes", lambda *args, **kwargs: False)
+    monkeypatch.setattr(module.outbox, "enqueue", lambda *args, **kwargs: False)
+    return module, saved
+
+
+def snapshot(status):
+    return {"manuscripts": {"M1": {"status": status, "folder": "Under Review"}}, "folders": {}}
+
+
+def test_failed_enqueue_keeps_previous_state_but_saves_the_session(flow):
+    module, saved = flow
+    previous = snapshot("With Editor")
+    saved_data = {"last_status": "With Editor", "snapshot": previous, "version": 1}
+    module.handle_status_result("Under Review", {"cookies": ["new"]}, saved_data, snapshot("Under Review"))
+    assert saved == [("With Editor", {"cookies": ["new"]}, previous)]
+
+
+def test_failed_enqueue_without_snapshot_saves_the_session(flow):
+    module, saved = flow
+    module.handle_status_result("Under Review", {"cookies": ["new"]}, {"last_status": "With Editor", "snapshot": None})
+    assert saved == [("With Editor", {"cookies": ["new"]}, None)]